@@ -27,7 +27,9 @@ artifact composite interaction away from Element class
 
 """
 
+import gzip
 import os
+import shutil
 from typing import Dict, Tuple
 
 from ._protos.buildstream.v2.artifact_pb2 import Artifact as ArtifactProto
@@ -126,6 +128,16 @@ class Artifact:
         files_digest = self._get_field_digest("files")
         return CasBasedDirectory(self._cas, digest=files_digest)
 
+    # get_files_digest():
+    #
+    # Get the digest of the artifact files content
+    #
+    # Returns:
+    #    (Digest): The digest of the files directory, or None
+    #
+    def get_files_digest(self):
+        return self._get_field_digest("files")
+
     # get_buildtree():
     #
     # Get a virtual directory for the artifact buildtree content
@@ -283,9 +295,17 @@ class Artifact:
         # Store log file
         log_filename = context.messenger.get_log_filename()
         if log_filename:
-            digest = self._cas.add_object(path=log_filename)
+            log_name = os.path.basename(log_filename)
+            if context.log_compress_artifact_logs:
+                with utils._tempnamedfile_name(dir=self._tmpdir) as tmpname:
+                    with open(log_filename, "rb") as logfile, gzip.open(tmpname, "wb") as compressed:
+                        shutil.copyfileobj(logfile, compressed)
+                    digest = self._cas.add_object(path=tmpname)
+                log_name += ".gz"
+            else:
+                digest = self._cas.add_object(path=log_filename)
             log = artifact.logs.add()
-            log.name = os.path.basename(log_filename)
+            log.name = log_name
             log.digest.CopyFrom(digest)
             size += log.digest.size_bytes
 
@@ -561,9 +581,7 @@ class Artifact:
             return False
 
         # Check whether public data and logs are available
-        logfile_digests = [logfile.digest for logfile in artifact.logs]
-        digests = [artifact.low_diversity_meta, artifact.high_diversity_meta, artifact.public_data] + logfile_digests
-        if not self._cas.contains_files(digests):
+        if not self._cas.contains_files(self._get_metadata_digests(artifact)):
             self._cached = False
             return False
 
@@ -571,6 +589,53 @@ class Artifact:
         self._cached = True
         return True
 
+    # query_caches():
+    #
+    # Check whether several artifacts are available, like calling
+    # query_cache() for each of them, but checking the metadata, public
+    # data and logs of all artifacts in shared FindMissingBlobs requests,
+    # and the file trees of all artifacts concurrently, checking identical
+    # trees only once.
+    #
+    # Args:
+    #     context (Context): The invocation context
+    #     artifacts (list): The Artifacts to query
+    #     executor (Executor): An optional executor to query the cache in concurrently
+    #
+    @staticmethod
+    def query_caches(context, artifacts, *, executor=None):
+        if not artifacts:
+            return
+
+        cas = context.get_cascache()
+
+        if executor:
+            protos = list(executor.map(Artifact._load_proto, artifacts))
+        else:
+            protos = [artifact._load_proto() for artifact in artifacts]
+
+        loaded = [proto for proto in protos if proto]
+        missing_directories = cas.missing_directories(
+            [proto.files for proto in loaded if str(proto.files)], executor=executor
+        )
+        missing_blobs = {
+            digest.hash
+            for digest in cas.missing_blobs(
+                [digest for proto in loaded for digest in Artifact._get_metadata_digests(proto)]
+            )
+        }
+
+        for artifact, proto in zip(artifacts, protos):
+            if (
+                not proto
+                or (str(proto.files) and proto.files.hash in missing_directories)
+                or any(digest.hash in missing_blobs for digest in Artifact._get_metadata_digests(proto))
+            ):
+                artifact._cached = False
+            else:
+                artifact._proto = proto
+                artifact._cached = True
+
     # cached()
     #
     # Return whether the artifact is available in the local cache. This must
@@ -655,6 +720,19 @@ class Artifact:
 
         return artifact
 
+    # _get_metadata_digests()
+    #
+    # Args:
+    #     artifact (ArtifactProto): The artifact proto
+    #
+    # Returns:
+    #     (list): The digests of the metadata, public data and logs of the artifact
+    #
+    @staticmethod
+    def _get_metadata_digests(artifact):
+        logfile_digests = [logfile.digest for logfile in artifact.logs]
+        return [artifact.low_diversity_meta, artifact.high_diversity_meta, artifact.public_data] + logfile_digests
+
     # _get_proto()
     #
     # Returns:
@@ -18,6 +18,8 @@
 #        Tristan Maat <tristan.maat@codethink.co.uk>
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from ._assetcache import AssetCache
 from ._cas.casremote import BlobNotFound
@@ -28,6 +30,17 @@ from . import utils
 
 REMOTE_ASSET_ARTIFACT_URN_TEMPLATE = "urn:fdc:buildstream.build:2020:artifact:{}"
 
+# Artifacts whose blobs are smaller than this in total are uploaded in
+# batches shared with the small artifacts of concurrent push jobs
+_SMALL_ARTIFACT_SIZE = 1024 * 1024
+
+# The total size of the blobs at which a shared batch is uploaded
+# without waiting for further artifacts
+_BATCH_SIZE = 4 * 1024 * 1024
+
+# How long a shared batch waits for the blobs of further artifacts, in seconds
+_BATCH_DELAY = 0.05
+
 
 # An ArtifactCache manages artifacts.
 #
@@ -42,6 +55,10 @@ class ArtifactCache(AssetCache):
         self._basedir = context.artifactdir
         os.makedirs(self._basedir, exist_ok=True)
 
+        # The shared batches of small artifacts, by remote
+        self._upload_batchers = {}
+        self._upload_batchers_lock = threading.Lock()
+
     # preflight():
     #
     # Preflight check.
@@ -93,42 +110,84 @@ class ArtifactCache(AssetCache):
         except AssetCacheError as e:
             raise ArtifactError("{}".format(e)) from e
 
-    # push():
+    # push_blobs():
+    #
+    # Upload the blobs of a committed artifact to the storage remotes, the
+    # first stage of pushing an artifact, see push().
     #
-    # Push committed artifact to remote repository.
+    # Uploads to separate remotes are performed concurrently, and the blobs
+    # of small artifacts are uploaded in batches shared with concurrent jobs.
     #
     # Args:
     #     element (Element): The Element whose artifact is to be pushed
     #     artifact (Artifact): The artifact being pushed
     #
     # Returns:
-    #   (bool): True if any remote was updated, False if no pushes were required
+    #   (bool): True if any remote was updated, False if no uploads were required
     #
     # Raises:
     #   (ArtifactError): if there was an error
     #
-    def push(self, element, artifact):
+    def push_blobs(self, element, artifact):
         project = element._get_project()
         display_key = element._get_display_key()
 
-        index_remotes, storage_remotes = self.get_remotes(project.name, True)
-        artifact_proto = artifact._get_proto()
-        artifact_digest = self.cas.add_object(buffer=artifact_proto.SerializeToString())
+        _, storage_remotes = self.get_remotes(project.name, True)
+        if not storage_remotes:
+            return False
 
-        pushed = False
+        artifact_digest = self.cas.add_object(buffer=artifact._get_proto().SerializeToString())
 
-        # First push our files to all storage remotes, so that they
-        # can perform file checks on their end
         for remote in storage_remotes:
             remote.init()
             element.status("Pushing data from artifact {} -> {}".format(display_key.brief, remote))
 
-            if self._push_artifact_blobs(artifact, artifact_digest, remote):
-                element.info("Pushed data from artifact {} -> {}".format(display_key.brief, remote))
+        stats = [{} for _ in storage_remotes]
+        with ThreadPoolExecutor(max_workers=len(storage_remotes)) as executor:
+            uploads = [
+                executor.submit(self._push_artifact_blobs, artifact, artifact_digest, remote, remote_stats)
+                for remote, remote_stats in zip(storage_remotes, stats)
+            ]
+
+        pushed = False
+        for remote, upload, remote_stats in zip(storage_remotes, uploads, stats):
+            if upload.result():
+                detail = None
+                if remote_stats.get("pruned"):
+                    detail = "Skipped {} subtrees which are already present on the remote".format(
+                        remote_stats["pruned"]
+                    )
+                element.info("Pushed data from artifact {} -> {}".format(display_key.brief, remote), detail=detail)
+                pushed = True
             else:
-                element.info(
-                    "Remote ({}) already has all data of artifact {} cached".format(remote, display_key.brief)
-                )
+                element.info("Remote ({}) already has all data of artifact {} cached".format(remote, display_key.brief))
+
+        return pushed
+
+    # push():
+    #
+    # Push committed artifact to remote repository, by publishing it on the
+    # index remotes. The blobs of the artifact must have been uploaded to
+    # the storage remotes already, see push_blobs().
+    #
+    # Args:
+    #     element (Element): The Element whose artifact is to be pushed
+    #     artifact (Artifact): The artifact being pushed
+    #
+    # Returns:
+    #   (bool): True if any remote was updated, False if no pushes were required
+    #
+    # Raises:
+    #   (ArtifactError): if there was an error
+    #
+    def push(self, element, artifact):
+        project = element._get_project()
+        display_key = element._get_display_key()
+
+        index_remotes, _ = self.get_remotes(project.name, True)
+        artifact_digest = utils._message_digest(artifact._get_proto().SerializeToString())
+
+        pushed = False
 
         for remote in index_remotes:
             remote.init()
@@ -164,27 +223,23 @@ class ArtifactCache(AssetCache):
 
         index_remotes, storage_remotes = self.get_remotes(project.name, False)
 
-        errors = []
         # Start by pulling our artifact proto, so that we know which
-        # blobs to pull
-        for remote in index_remotes:
-            remote.init()
-            try:
-                element.status("Pulling artifact {} <- {}".format(display_key, remote))
-                response = remote.fetch_blob([uri])
-                if response:
-                    artifact_digest = response.blob_digest
-                    break
-
-                element.info("Remote ({}) does not have artifact {} cached".format(remote, display_key))
-            except AssetCacheError as e:
-                element.warn("Could not pull from remote {}: {}".format(remote, e))
-                errors.append(e)
-
-        if errors and not artifact_digest:
+        # blobs to pull, querying the index remotes concurrently
+        if index_remotes:
+            element.status("Pulling artifact {} <- {}".format(display_key, ", ".join(map(str, index_remotes))))
+        result = self._query_index_remotes(index_remotes, lambda remote: remote.fetch_blob([uri]))
+        if result.answer:
+            artifact_digest = result.answer.blob_digest
+
+        for remote in result.misses:
+            element.info("Remote ({}) does not have artifact {} cached".format(remote, display_key))
+        for remote, error in result.errors:
+            element.warn("Could not pull from remote {}: {}".format(remote, error))
+
+        if result.errors and not artifact_digest:
             raise ArtifactError(
                 "Failed to pull artifact {}".format(display_key),
-                detail="\n".join(str(e) for e in errors),
+                detail="\n".join(str(error) for _, error in result.errors),
                 temporary=True,
             )
 
@@ -367,13 +422,64 @@ class ArtifactCache(AssetCache):
     #             Local Private Methods            #
     ################################################
 
+    # _required_artifact_blobs()
+    #
+    # List all the blobs which make up an artifact, such that they can be
+    # uploaded together in shared batches.
+    #
+    # Subtrees which are known to be completely present on the remote,
+    # e.g. because they are unchanged since a previous artifact of the
+    # element was pushed, are skipped.
+    #
+    # Args:
+    #    artifact (Artifact): The artifact whose blobs to list
+    #    artifact_digest (Digest): The digest of the artifact proto
+    #    remote (CASRemote): The remote the blobs are required for
+    #    stats (dict): Optional counters to add the number of "pruned" subtrees to
+    #
+    # Returns:
+    #    (list): The Digests of the artifact's blobs
+    #    (list): The Digests of the directories whose blobs are all included
+    #
+    def _required_artifact_blobs(self, artifact, artifact_digest, remote, stats=None):
+        artifact_proto = artifact._get_proto()
+
+        digests = []
+        directories = []
+        if str(artifact_proto.files):
+            digests.extend(self.cas.required_blobs_for_remote(artifact_proto.files, remote=remote, stats=stats))
+            directories.append(artifact_proto.files)
+
+        if str(artifact_proto.buildtree):
+            try:
+                digests.extend(
+                    self.cas.required_blobs_for_remote(artifact_proto.buildtree, remote=remote, stats=stats)
+                )
+                directories.append(artifact_proto.buildtree)
+            except FileNotFoundError:
+                pass
+
+        digests.extend([artifact_digest, artifact_proto.low_diversity_meta, artifact_proto.high_diversity_meta])
+
+        if str(artifact_proto.public_data):
+            digests.append(artifact_proto.public_data)
+
+        for log_file in artifact_proto.logs:
+            digests.append(log_file.digest)
+
+        return digests, directories
+
     # _push_artifact_blobs()
     #
     # Push the blobs that make up an artifact to the remote server.
     #
+    # This may be called concurrently for separate remotes.
+    #
     # Args:
-    #    artifact (Artifact): The artifact whose blobs to push.
+    #    artifact (Artifact): The artifact whose blobs to push
+    #    artifact_digest (Digest): The digest of the artifact proto
     #    remote (CASRemote): The remote to push the blobs to.
+    #    stats (dict): Optional counters, see _required_artifact_blobs()
     #
     # Returns:
     #    (bool) - True if we uploaded anything, False otherwise.
@@ -382,36 +488,45 @@ class ArtifactCache(AssetCache):
     #    ArtifactError: If we fail to push blobs (*unless* they're
     #    already there or we run out of space on the server).
     #
-    def _push_artifact_blobs(self, artifact, artifact_digest, remote):
-        artifact_proto = artifact._get_proto()
+    def _push_artifact_blobs(self, artifact, artifact_digest, remote, stats=None):
+        required_blobs, directories = self._required_artifact_blobs(artifact, artifact_digest, remote, stats)
 
         try:
-            if str(artifact_proto.files):
-                self.cas._send_directory(remote, artifact_proto.files)
-
-            if str(artifact_proto.buildtree):
-                try:
-                    self.cas._send_directory(remote, artifact_proto.buildtree)
-                except FileNotFoundError:
-                    pass
-
-            digests = [artifact_digest, artifact_proto.low_diversity_meta, artifact_proto.high_diversity_meta]
-
-            if str(artifact_proto.public_data):
-                digests.append(artifact_proto.public_data)
-
-            for log_file in artifact_proto.logs:
-                digests.append(log_file.digest)
-
-            self.cas.send_blobs(remote, digests)
+            # buildbox-casd will call FindMissingBlobs before the actual upload
+            # and skip blobs that already exist on the server.
+            if sum(digest.size_bytes for digest in required_blobs) < _SMALL_ARTIFACT_SIZE:
+                self._get_upload_batcher(remote).upload(required_blobs)
+            else:
+                self.cas.send_blobs(remote, required_blobs)
 
         except CASRemoteError as cas_error:
             if cas_error.reason != "cache-too-full":
                 raise ArtifactError("Failed to push artifact blobs: {}".format(cas_error), temporary=True)
             return False
 
+        # Later artifacts of the element can skip the subtrees they share with this one
+        for directory in directories:
+            self.cas.mark_directory_present(directory, remote=remote)
+
         return True
 
+    # _get_upload_batcher()
+    #
+    # Get the batcher for the small artifacts uploaded to a remote.
+    #
+    # Args:
+    #    remote (CASRemote): The remote
+    #
+    # Returns:
+    #    (_UploadBatcher): The batcher for the remote
+    #
+    def _get_upload_batcher(self, remote):
+        with self._upload_batchers_lock:
+            batcher = self._upload_batchers.get(remote)
+            if batcher is None:
+                batcher = self._upload_batchers[remote] = _UploadBatcher(self.cas, remote)
+            return batcher
+
     # _push_artifact_proto()
     #
     # Pushes the artifact proto to remote.
@@ -520,6 +635,13 @@ class ArtifactCache(AssetCache):
         except CASRemoteError as e:
             raise ArtifactError("{}".format(e), temporary=True) from e
 
+        # All blobs were fetched from the remote, later artifacts of the
+        # element can skip the subtrees they share with this one when pushing
+        if str(artifact.files):
+            self.cas.mark_directory_present(artifact.files, remote=remote)
+        if pull_buildtrees and str(artifact.buildtree):
+            self.cas.mark_directory_present(artifact.buildtree, remote=remote)
+
         return True
 
     # _query_remote()
@@ -539,3 +661,87 @@ class ArtifactCache(AssetCache):
             return bool(response)
         except AssetCacheError as e:
             raise ArtifactError("{}".format(e), temporary=True) from e
+
+
+# A batch of blobs shared by several upload jobs, see _UploadBatcher
+#
+class _UploadBatch:
+    def __init__(self):
+        self.digests = {}  # The Digests of the blobs, by hash
+        self.size = 0  # The total size of the blobs
+        self.full = threading.Event()  # Set once no further blobs are added
+        self.done = threading.Event()  # Set once the upload completed
+        self.error = None  # The exception of a failed upload
+
+
+# _UploadBatcher()
+#
+# Coalesces the blobs of small artifacts, which concurrent jobs push to
+# the same remote, into shared uploads, saving the round trips of
+# separate UploadMissingBlobs requests.
+#
+# The job which starts a batch uploads it once it is full or after a short
+# delay, the jobs which add their blobs to it in the meantime wait for the
+# upload to complete.
+#
+# Args:
+#    cas (CASCache): The CASCache to upload from
+#    remote (CASRemote): The remote to upload to
+#
+class _UploadBatcher:
+    def __init__(self, cas, remote):
+        self._cas = cas
+        self._remote = remote
+        self._lock = threading.Lock()
+        self._batch = None  # The batch which is open for further blobs
+
+    # upload()
+    #
+    # Upload blobs as part of a shared batch.
+    #
+    # Args:
+    #    digests (list): The Digests of the blobs to upload
+    #
+    # Raises:
+    #    CASRemoteError: If the upload of the batch failed
+    #
+    def upload(self, digests):
+        with self._lock:
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                batch = self._batch = _UploadBatch()
+
+            for digest in digests:
+                if digest.hash not in batch.digests:
+                    batch.digests[digest.hash] = digest
+                    batch.size += digest.size_bytes
+
+            if batch.size >= _BATCH_SIZE:
+                self._batch = None
+                batch.full.set()
+
+        if not leader:
+            batch.done.wait()
+            if batch.error is not None:
+                raise CASRemoteError(
+                    "Failed to upload blobs shared with other artifacts: {}".format(batch.error),
+                    reason=getattr(batch.error, "reason", None),
+                    temporary=True,
+                ) from batch.error
+            return
+
+        batch.full.wait(_BATCH_DELAY)
+
+        with self._lock:
+            if self._batch is batch:
+                self._batch = None
+
+        try:
+            self._cas.send_blobs(self._remote, list(batch.digests.values()))
+        except Exception as e:
+            # Fail the other jobs of the batch as well
+            batch.error = e
+            raise
+        finally:
+            batch.done.set()
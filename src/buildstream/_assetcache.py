@@ -17,7 +17,8 @@
 #
 import os
 import re
-from typing import List, Dict, Tuple, Iterable, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, List, Dict, Tuple, Iterable, Optional
 import grpc
 
 from . import utils
@@ -29,6 +30,11 @@ from ._protos.build.bazel.remote.asset.v1 import remote_asset_pb2, remote_asset_
 from ._protos.google.rpc import code_pb2
 
 
+# How long to wait for an answer from an index remote, before also
+# querying the next remote in priority order, in seconds
+INDEX_HEDGE_DELAY = 0.1
+
+
 class AssetRemote(BaseRemote):
     def __init__(self, spec):
         super().__init__(spec)
@@ -281,6 +287,99 @@ class RemotePair:
             self.error = str(e)
 
 
+# IndexQueryResult()
+#
+# The outcome of querying index remotes with query_index_remotes()
+#
+class IndexQueryResult:
+    def __init__(self):
+        self.answer: Any = None  # The first positive answer, or None
+        self.remote: Optional[AssetRemote] = None  # The remote which gave the answer
+        self.misses: List[AssetRemote] = []  # The remotes which do not have the asset
+        self.errors: List[Tuple[AssetRemote, AssetCacheError]] = []  # The remotes which failed to answer
+
+
+# query_index_remotes()
+#
+# Query index remotes for an asset, without paying for the latency of
+# every remote in turn when the asset is missing on some of them.
+#
+# The remotes are queried in priority order, but the next remote is queried
+# as soon as the previous one answered without the asset, failed, or did not
+# answer within `hedge_delay` seconds. The first positive answer is taken,
+# preferring higher priority remotes among answers which arrive together,
+# queries which were not issued yet are cancelled and outstanding queries are
+# abandoned.
+#
+# The queries run in the threads of the executor, so they must not issue
+# messages, the caller reports the outcome instead.
+#
+# Args:
+#    remotes: The initialized index remotes, in priority order
+#    query: Called with a remote, returns the answer or None if the remote does
+#           not have the asset, raises AssetCacheError if the remote failed
+#    executor: The executor to run queries in
+#    hedge_delay: How long to wait for an answer before querying the next remote
+#
+# Returns:
+#    The outcome of the queries
+#
+def query_index_remotes(
+    remotes: List[AssetRemote],
+    query: Callable[[AssetRemote], Any],
+    executor: ThreadPoolExecutor,
+    *,
+    hedge_delay: float = INDEX_HEDGE_DELAY,
+) -> IndexQueryResult:
+    result = IndexQueryResult()
+
+    # A single remote needs no threads
+    if len(remotes) == 1:
+        remote = remotes[0]
+        try:
+            result.answer = query(remote)
+        except AssetCacheError as e:
+            result.errors.append((remote, e))
+            return result
+        if result.answer is None:
+            result.misses.append(remote)
+        else:
+            result.remote = remote
+        return result
+
+    pending = {}
+    issued = 0
+    while issued < len(remotes) or pending:
+        if issued < len(remotes):
+            pending[executor.submit(query, remotes[issued])] = issued
+            issued += 1
+
+        timeout = hedge_delay if issued < len(remotes) else None
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        answers = []
+        for future in done:
+            index = pending.pop(future)
+            try:
+                answer = future.result()
+            except AssetCacheError as e:
+                result.errors.append((remotes[index], e))
+                continue
+            if answer is None:
+                result.misses.append(remotes[index])
+            else:
+                answers.append((index, answer))
+
+        if answers:
+            index, result.answer = min(answers, key=lambda item: item[0])
+            result.remote = remotes[index]
+            for future in pending:
+                future.cancel()
+            break
+
+    return result
+
+
 # Base Asset Cache for Caches to derive from
 #
 class AssetCache:
@@ -299,12 +398,19 @@ class AssetCache:
 
         self._basedir = None
 
+        # Threads to query index remotes concurrently in, these are only
+        # started once needed, see _query_index_remotes()
+        self._index_query_executor = ThreadPoolExecutor(thread_name_prefix="index-query")
+
     # release_resources():
     #
     # Release resources used by AssetCache.
     #
     def release_resources(self):
 
+        # Abandon queries to slow index remotes which are still outstanding
+        self._index_query_executor.shutdown(wait=False)
+
         # Close all remotes and their gRPC channels
         for remote in self._remotes.values():
             if remote.index:
@@ -380,6 +486,23 @@ class AssetCache:
 
         return index_remotes, storage_remotes
 
+    # _query_index_remotes():
+    #
+    # Query index remotes for an asset, see query_index_remotes().
+    #
+    # Args:
+    #     index_remotes: The index remotes, in priority order
+    #     query: Called with a remote, returns the answer or None
+    #
+    # Returns:
+    #     (IndexQueryResult): The outcome of the queries
+    #
+    def _query_index_remotes(self, index_remotes, query):
+        for remote in index_remotes:
+            remote.init()
+
+        return query_index_remotes(index_remotes, query, self._index_query_executor)
+
     # has_fetch_remotes():
     #
     # Check whether any remote repositories are available for fetching.
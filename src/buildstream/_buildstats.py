@@ -0,0 +1,191 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# BuildStats()
+#
+# An append-only store of statistics about the jobs which processed
+# elements, e.g. how long an element took to build and how large its
+# artifact is, such that slow elements and regressions between sessions
+# can be found.
+#
+# Each record is a JSON object on a line of its own, with the members:
+#
+#   o session:  The time at which the recording session started
+#   o time:     The time at which the job completed
+#   o action:   The action name of the job, e.g. 'Build'
+#   o element:  The full name of the element
+#   o key:      The cache key of the element, if known
+#   o status:   The job status, e.g. 'ok'
+#   o duration: The duration of the job in seconds, including retries
+#   o retries:  How often the job had to be retried
+#
+# And optionally, depending on the job:
+#
+#   o size:         The size of the artifact produced by a build, in bytes
+#   o sandbox-time: The time spent executing commands in the sandbox,
+#                   in seconds, as reported by the sandbox
+#   o peak-rss:     The peak memory usage of the sandboxed commands, in bytes
+#   o cpu-time:     The CPU time consumed by the sandboxed commands, in seconds
+#
+# Records are appended to the store as they are recorded, such that the
+# statistics of a session are not lost if the session does not end
+# gracefully.
+#
+# Args:
+#    path (str): The file to store records in
+#
+class BuildStats:
+    def __init__(self, path: str):
+        self._path = path
+        self._session = time.time()
+
+    # record()
+    #
+    # Record the statistics of a job.
+    #
+    # Args:
+    #    action (str): The action name of the job
+    #    element (str): The full name of the element
+    #    key (str): The cache key of the element, or None
+    #    status (str): The job status
+    #    duration (float): The duration of the job in seconds
+    #    retries (int): How often the job had to be retried
+    #    extra (dict): Additional statistics of the job
+    #
+    def record(
+        self,
+        action: str,
+        element: str,
+        key: Optional[str],
+        status: str,
+        duration: float,
+        retries: int,
+        **extra,
+    ) -> None:
+        entry = {
+            "session": self._session,
+            "time": time.time(),
+            "action": action,
+            "element": element,
+            "key": key,
+            "status": status,
+            "duration": round(duration, 3),
+            "retries": retries,
+        }
+        entry.update(extra)
+
+        # Write the whole line at once, such that concurrent sessions
+        # do not interleave their records
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        with open(self._path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, sort_keys=True) + "\n")
+
+    # load()
+    #
+    # Iterate over the saved records, in the order they were recorded.
+    #
+    # Yields:
+    #    (dict): The records
+    #
+    def load(self) -> Iterator[Dict]:
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Ignore records truncated by an interrupted session
+                        continue
+                    if isinstance(entry, dict):
+                        yield entry
+        except FileNotFoundError:
+            pass
+
+
+# slowest()
+#
+# Find the elements with the slowest jobs, considering only the
+# latest successful job of each element and action.
+#
+# Args:
+#    records (Iterable[dict]): The records, see BuildStats.load()
+#    action (str): Only consider jobs with this action name, or None
+#    limit (int): The maximum number of records to return
+#
+# Returns:
+#    (list): The records of the slowest jobs, slowest first
+#
+def slowest(records, *, action: Optional[str] = None, limit: int = 10) -> List[Dict]:
+    latest = {}  # type: Dict[Tuple[str, str], Dict]
+    for entry in _successful(records, action):
+        latest[(entry["action"], entry["element"])] = entry
+
+    return sorted(latest.values(), key=lambda entry: entry["duration"], reverse=True)[:limit]
+
+
+# regressions()
+#
+# Find the jobs which became slower in their latest session, compared
+# to the previous session in which they succeeded.
+#
+# Args:
+#    records (Iterable[dict]): The records, see BuildStats.load()
+#    action (str): Only consider jobs with this action name, or None
+#    threshold (float): The minimum ratio of the latest to the previous duration
+#    min_duration (float): Ignore jobs which took less seconds than this in the latest session
+#
+# Returns:
+#    (list): Tuples of the (previous, latest) records, largest slowdown first
+#
+def regressions(
+    records, *, action: Optional[str] = None, threshold: float = 1.2, min_duration: float = 1.0
+) -> List[Tuple[Dict, Dict]]:
+    # The latest two successful records from distinct sessions, per element and action
+    history = {}  # type: Dict[Tuple[str, str], List[Dict]]
+    for entry in _successful(records, action):
+        entries = history.setdefault((entry["action"], entry["element"]), [])
+        if entries and entries[-1]["session"] == entry["session"]:
+            entries[-1] = entry
+        else:
+            entries.append(entry)
+            del entries[:-2]
+
+    found = []
+    for entries in history.values():
+        if len(entries) < 2:
+            continue
+
+        previous, latest = entries
+        if latest["duration"] < min_duration:
+            continue
+
+        if latest["duration"] >= previous["duration"] * threshold:
+            found.append((previous, latest))
+
+    return sorted(found, key=lambda pair: pair[1]["duration"] - pair[0]["duration"], reverse=True)
+
+
+# Iterate over the successful records with the given action name, if any
+def _successful(records, action):
+    for entry in records:
+        if entry.get("status") != "ok" or "duration" not in entry:
+            continue
+        if action is not None and entry.get("action", "").lower() != action.lower():
+            continue
+        yield entry
@@ -0,0 +1,154 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
+from .. import utils
+
+
+# BlobPresenceCache()
+#
+# Remembers which blobs are known to be present on remote CAS servers,
+# such that repeated FindMissingBlobs requests and uploads for the same
+# blobs (e.g. the blobs of a shared base runtime) can be avoided.
+#
+# Blobs are recorded per remote, identified by a string key, when a
+# FindMissingBlobs response reports them as present or when they were
+# successfully uploaded.
+#
+# Args:
+#    path (str): The file to persist entries in, or None
+#    ttl (int): How long persisted entries remain valid in seconds, 0 for
+#               entries to only be remembered for the current session
+#
+class BlobPresenceCache:
+    def __init__(self, path: Optional[str] = None, *, ttl: int = 0):
+        self._path = path
+        self._ttl = ttl
+        self._lock = threading.Lock()
+
+        # Time at which each blob was last confirmed present, keyed by remote key and hash
+        self._present = {}  # type: Dict[str, Dict[Tuple[str, int], float]]
+
+        # Number of digests which were looked up, and which were known to be present
+        self.lookups = 0
+        self.hits = 0
+
+        if self._path and self._ttl:
+            self._load()
+
+    # filter_missing()
+    #
+    # Filter out the digests which are known to be present on a remote.
+    #
+    # Args:
+    #    remote_key (str): The key identifying the remote
+    #    digests (Iterable[Digest]): The digests to filter
+    #
+    # Returns:
+    #    (List[Digest]): The digests which are not known to be present
+    #
+    def filter_missing(self, remote_key: str, digests: Iterable[remote_execution_pb2.Digest]) -> List:
+        # The digests may be generated while checking the presence of other
+        # digests, e.g. when walking a tree, collect them before locking
+        digests = list(digests)
+
+        unknown = []
+        with self._lock:
+            present = self._present.get(remote_key, {})
+            for digest in digests:
+                self.lookups += 1
+                if (digest.hash, digest.size_bytes) in present:
+                    self.hits += 1
+                else:
+                    unknown.append(digest)
+
+        return unknown
+
+    # is_present()
+    #
+    # Check whether a single digest is known to be present on a remote.
+    #
+    # Args:
+    #    remote_key (str): The key identifying the remote
+    #    digest (Digest): The digest to check
+    #
+    # Returns:
+    #    (bool): Whether the digest is known to be present
+    #
+    def is_present(self, remote_key: str, digest: remote_execution_pb2.Digest) -> bool:
+        with self._lock:
+            self.lookups += 1
+            present = (digest.hash, digest.size_bytes) in self._present.get(remote_key, {})
+            if present:
+                self.hits += 1
+
+        return present
+
+    # mark_present()
+    #
+    # Record digests as being present on a remote.
+    #
+    # Args:
+    #    remote_key (str): The key identifying the remote
+    #    digests (Iterable[Digest]): The digests which are present
+    #
+    def mark_present(self, remote_key: str, digests: Iterable[remote_execution_pb2.Digest]) -> None:
+        now = time.time()
+        digests = list(digests)
+        with self._lock:
+            present = self._present.setdefault(remote_key, {})
+            for digest in digests:
+                present[(digest.hash, digest.size_bytes)] = now
+
+    # save()
+    #
+    # Persist the entries which are still within the configured time to live.
+    #
+    def save(self) -> None:
+        if not self._path or not self._ttl:
+            return
+
+        expiry = time.time() - self._ttl
+        with self._lock, utils.save_file_atomic(self._path, "w", encoding="utf-8") as f:
+            for remote_key, present in self._present.items():
+                for (digest_hash, size_bytes), timestamp in present.items():
+                    if timestamp > expiry:
+                        f.write("{} {} {} {}\n".format(remote_key, digest_hash, size_bytes, timestamp))
+
+    # _load()
+    #
+    # Load the persisted entries which are still within the configured time to live.
+    #
+    def _load(self) -> None:
+        expiry = time.time() - self._ttl
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        remote_key, digest_hash, size_bytes, timestamp = line.split()
+                        if float(timestamp) > expiry:
+                            self._present.setdefault(remote_key, {})[(digest_hash, int(size_bytes))] = float(
+                                timestamp
+                            )
+                    except ValueError:
+                        # Ignore corrupted entries, they will be dropped on save
+                        continue
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # The presence cache is only an optimization, start afresh
+            self._present = {}
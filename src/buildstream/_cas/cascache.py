@@ -19,8 +19,10 @@
 
 import itertools
 import os
+import shutil
 import stat
 import contextlib
+import queue
 import time
 from typing import Optional, List
 import threading
@@ -35,6 +37,8 @@ from .. import utils
 from ..types import FastEnum, SourceRef
 from .._exceptions import CASCacheError
 
+from . import chunking
+from .blobpresencecache import BlobPresenceCache
 from .casdprocessmanager import CASDProcessManager
 from .casremote import CASRemote, _CASBatchRead, _CASBatchUpdate, BlobNotFound
 
@@ -60,6 +64,7 @@ class CASLogLevel(FastEnum):
 #     protect_session_blobs (bool): Disable expiry for blobs used in the current session
 #     log_level (LogLevel): Log level to give to buildbox-casd for logging
 #     log_directory (str): the root of the directory in which to store logs
+#     presence_cache_ttl (int): How long to remember blobs present on remotes across sessions, in seconds
 #
 class CASCache:
     def __init__(
@@ -71,7 +76,9 @@ class CASCache:
         remote_cache_spec=None,
         protect_session_blobs=True,
         log_level=CASLogLevel.WARNING,
-        log_directory=None
+        log_directory=None,
+        presence_cache_ttl=0,
+        chunk_threshold=None
     ):
         self.casdir = os.path.join(path, "cas")
         self.tmpdir = os.path.join(path, "tmp")
@@ -81,6 +88,21 @@ class CASCache:
         self._cache_usage_monitor_forbidden = False
 
         self._remote_cache = bool(remote_cache_spec)
+        self._remote_cache_spec = remote_cache_spec
+
+        self._presence_cache = BlobPresenceCache(os.path.join(path, "remote-blobs"), ttl=presence_cache_ttl)
+
+        # Blobs larger than this are transferred in content defined chunks
+        # with remotes which support splitting and splicing blobs
+        self._chunk_threshold = None
+        if chunk_threshold is not None:
+            self._chunk_threshold = max(chunk_threshold, chunking.MAX_CHUNK_SIZE)
+        self._chunked_transfers_lock = threading.Lock()
+        self._chunked_transfers = [0, 0, 0]  # Number of blobs, bytes transferred and total bytes
+
+        # The request queues and response iterators of the StageTree
+        # streams of directories staged with stage_directory()
+        self._staged_directories = []
 
         self._casd_process_manager = None
         self._casd_channel = None
@@ -137,6 +159,10 @@ class CASCache:
     # Release resources used by CASCache.
     #
     def release_resources(self, messenger=None):
+        self._presence_cache.save()
+
+        self._unstage_directories()
+
         if self._casd_channel:
             self._casd_channel.request_shutdown()
 
@@ -152,6 +178,29 @@ class CASCache:
     def get_default_remote(self):
         return self._default_remote
 
+    # get_presence_cache():
+    #
+    # Get the cache of blobs known to be present on remotes
+    #
+    # Returns:
+    #   (BlobPresenceCache): The presence cache
+    #
+    def get_presence_cache(self):
+        return self._presence_cache
+
+    # get_chunked_transfers():
+    #
+    # Get statistics about the blobs which were transferred in chunks
+    #
+    # Returns:
+    #   (int): The number of blobs
+    #   (int): The number of bytes of the chunks which were transferred
+    #   (int): The total size of the blobs
+    #
+    def get_chunked_transfers(self):
+        with self._chunked_transfers_lock:
+            return tuple(self._chunked_transfers)
+
     # contains_files():
     #
     # Check whether file digests exist in the local CAS cache
@@ -200,6 +249,35 @@ class CASCache:
         missing_blobs = self.missing_blobs_for_directory(digest, remote=self._default_remote)
         return not missing_blobs
 
+    # missing_directories():
+    #
+    # Check which of the specified directories are not completely in the
+    # cache, including their subdirectories and files.
+    #
+    # Like calling contains_directory() for each directory, with a single
+    # `FetchTree` request per distinct tree, identical trees are only
+    # checked once. The requests are issued concurrently if an executor
+    # is given.
+    #
+    # Args:
+    #     digests (Iterable[Digest]): The directory digests to check
+    #     executor (Executor): An optional executor to issue requests in
+    #
+    # Returns: The set of hashes of the directories which are not available
+    #
+    def missing_directories(self, digests, *, executor=None):
+        distinct = {digest.hash: digest for digest in digests}
+
+        def check(digest):
+            return self.contains_directory(digest, with_files=True)
+
+        if executor:
+            results = executor.map(check, distinct.values())
+        else:
+            results = map(check, distinct.values())
+
+        return {directory_hash for directory_hash, present in zip(distinct, results) if not present}
+
     # checkout():
     #
     # Checkout the specified directory digest.
@@ -208,8 +286,12 @@ class CASCache:
     #     dest (str): The destination path
     #     tree (Digest): The directory digest to extract
     #     can_link (bool): Whether we can create hard links in the destination
+    #     result (FileListResult): An optional result to record copy strategies in
     #
-    def checkout(self, dest, tree, *, can_link=False, _fetch=True):
+    # Files which cannot be hard linked are reflinked or copied in kernel
+    # space where the filesystem supports it, see utils.safe_copy().
+    #
+    def checkout(self, dest, tree, *, can_link=False, result=None, _fetch=True):
         if _fetch and self._remote_cache:
             # We need the files in the local cache
             local_cas = self.get_local_cas()
@@ -238,9 +320,9 @@ class CASCache:
                 mtime = None
 
             if can_link and mtime is None:
-                utils.safe_link(self.objpath(filenode.digest), fullpath)
+                utils.safe_link(self.objpath(filenode.digest), fullpath, result=result)
             else:
-                utils.safe_copy(self.objpath(filenode.digest), fullpath, copystat=False)
+                utils.safe_copy(self.objpath(filenode.digest), fullpath, copystat=False, result=result)
                 if mtime is not None:
                     utils._set_file_mtime(fullpath, mtime)
 
@@ -257,13 +339,55 @@ class CASCache:
 
         for dirnode in directory.directories:
             fullpath = os.path.join(dest, dirnode.name)
-            self.checkout(fullpath, dirnode.digest, can_link=can_link, _fetch=False)
+            self.checkout(fullpath, dirnode.digest, can_link=can_link, result=result, _fetch=False)
 
         for symlinknode in directory.symlinks:
             # symlink
             fullpath = os.path.join(dest, symlinknode.name)
             os.symlink(symlinknode.target, fullpath)
 
+    # stage_directory():
+    #
+    # Make a directory tree available for local filesystem access, without
+    # copying it out of the CAS. buildbox-casd stages the tree read-only,
+    # with a userspace filesystem which only reads the files which are
+    # accessed where available, or with hard links otherwise.
+    #
+    # The directory remains staged until the resources of the cache are
+    # released, and must not be modified.
+    #
+    # Args:
+    #     tree (Digest): The directory digest to stage
+    #
+    # Returns:
+    #     (str): The path of the staged directory
+    #
+    # Raises:
+    #     CASCacheError: If buildbox-casd failed to stage the directory
+    #
+    def stage_directory(self, tree):
+        local_cas = self.get_local_cas()
+
+        request = local_cas_pb2.StageTreeRequest()
+        request.root_digest.CopyFrom(tree)
+
+        # The stream is kept open for as long as the directory is staged
+        requests = queue.Queue()
+        requests.put(request)
+        responses = local_cas.StageTree(iter(requests.get, None))
+
+        try:
+            response = next(responses)
+        except grpc.RpcError as e:
+            requests.put(None)
+            raise CASCacheError(
+                "Failed to stage directory tree {}: {}: {}".format(tree.hash, e.code().name, e.details())
+            ) from e
+
+        self._staged_directories.append((requests, responses))
+
+        return response.path
+
     # pull_tree():
     #
     # Pull a single Tree rather than a ref.
@@ -447,15 +571,73 @@ class CASCache:
     #
     # Determine which blobs of a directory tree are missing on the remote.
     #
+    # The tree is walked top-down, subtrees which are known to be completely
+    # present on the remote, see mark_directory_present(), are skipped
+    # without reading their Directory objects or querying their blobs.
+    #
     # Args:
     #     digest (Digest): The directory digest
+    #     remote (CASRemote): The remote to check, or None for the local cache
+    #     stats (dict): Optional counters to add the number of "pruned" subtrees,
+    #                   "queried" digests and FindMissingBlobs "requests" to
     #
     # Returns: List of missing Digest objects
     #
-    def missing_blobs_for_directory(self, digest, *, remote=None):
-        required_blobs = self.required_blobs_for_directory(digest)
+    def missing_blobs_for_directory(self, digest, *, remote=None, stats=None):
+        required_blobs = self.required_blobs_for_remote(digest, remote=remote, stats=stats)
+
+        return self.missing_blobs(required_blobs, remote=remote, stats=stats)
+
+    # required_blobs_for_remote():
+    #
+    # Like required_blobs_for_directory(), but skipping the subtrees which
+    # are known to be completely present on the remote, see
+    # mark_directory_present().
+    #
+    # Args:
+    #     digest (Digest): The directory digest
+    #     remote (CASRemote): The remote, or None for the local cache
+    #     stats (dict): Optional counters to add the number of "pruned" subtrees to
+    #
+    # Returns: Iterator over the Digests of the blobs
+    #
+    def required_blobs_for_remote(self, digest, *, remote, stats=None):
+        tree_key = self._tree_presence_key(remote)
+        if tree_key:
+            self._ensure_directory_protos(digest)
+            return self._required_blobs_pruned(digest, tree_key, stats)
 
-        return self.missing_blobs(required_blobs, remote=remote)
+        return self.required_blobs_for_directory(digest)
+
+    # mark_directory_present():
+    #
+    # Record that a directory tree, including all of its subdirectories and
+    # files, is completely present on the remote, e.g. after all of its missing
+    # blobs were uploaded.
+    #
+    # Args:
+    #     digest (Digest): The directory digest
+    #     remote (CASRemote): The remote which holds the tree
+    #
+    def mark_directory_present(self, digest, *, remote):
+        tree_key = self._tree_presence_key(remote)
+        if not tree_key:
+            return
+
+        directories = []
+        pending = [digest]
+        while pending:
+            directory_digest = pending.pop()
+            if self._presence_cache.is_present(tree_key, directory_digest):
+                continue
+
+            directories.append(directory_digest)
+            directory = remote_execution_pb2.Directory()
+            with open(self.objpath(directory_digest), "rb") as f:
+                directory.ParseFromString(f.read())
+            pending.extend(dirnode.digest for dirnode in directory.directories)
+
+        self._presence_cache.mark_present(tree_key, directories)
 
     # missing_blobs():
     #
@@ -464,9 +646,13 @@ class CASCache:
     # Args:
     #     blobs ([Digest]): List of directory digests to check
     #
+    #     remote (CASRemote): The remote to check, or None for the local cache
+    #     stats (dict): Optional counters to add the number of "queried" digests
+    #                   and FindMissingBlobs "requests" to
+    #
     # Returns: List of missing Digest objects
     #
-    def missing_blobs(self, blobs, *, remote=None):
+    def missing_blobs(self, blobs, *, remote=None, stats=None):
         cas = self.get_cas()
 
         if remote:
@@ -474,7 +660,13 @@ class CASCache:
         else:
             instance_name = ""
 
+        # Skip blobs which are already known to be present on the remote
+        presence_key = self._presence_key(remote)
+        if presence_key:
+            blobs = self._presence_cache.filter_missing(presence_key, blobs)
+
         missing_blobs = {}
+        present_blobs = []
         # Limit size of FindMissingBlobs request
         for required_blobs_group in _grouper(iter(blobs), 512):
             request = remote_execution_pb2.FindMissingBlobsRequest(instance_name=instance_name)
@@ -490,11 +682,21 @@ class CASCache:
                     raise CASCacheError("Unsupported buildbox-casd version: FindMissingBlobs failed") from e
                 raise
 
+            if stats is not None:
+                stats["requests"] = stats.get("requests", 0) + 1
+                stats["queried"] = stats.get("queried", 0) + len(request.blob_digests)
+
             for missing_digest in response.missing_blob_digests:
                 d = remote_execution_pb2.Digest()
                 d.CopyFrom(missing_digest)
                 missing_blobs[d.hash] = d
 
+            if presence_key:
+                present_blobs.extend(digest for digest in request.blob_digests if digest.hash not in missing_blobs)
+
+        if presence_key:
+            self._presence_cache.mark_present(presence_key, present_blobs)
+
         return missing_blobs.values()
 
     # required_blobs_for_directory():
@@ -506,15 +708,8 @@ class CASCache:
         if not excluded_subdirs:
             excluded_subdirs = []
 
-        if self._remote_cache and _fetch_tree:
-            # Ensure we have the directory protos in the local cache
-            local_cas = self.get_local_cas()
-
-            request = local_cas_pb2.FetchTreeRequest()
-            request.root_digest.CopyFrom(directory_digest)
-            request.fetch_file_blobs = False
-
-            local_cas.FetchTree(request)
+        if _fetch_tree:
+            self._ensure_directory_protos(directory_digest)
 
         # parse directory, and recursively add blobs
 
@@ -536,6 +731,69 @@ class CASCache:
     #             Local Private Methods            #
     ################################################
 
+    # _ensure_directory_protos():
+    #
+    # Ensure the Directory objects of a tree are in the local cache, they
+    # may only be available in the remote cache.
+    #
+    # Args:
+    #     directory_digest (Digest): The digest of the root directory
+    #
+    def _ensure_directory_protos(self, directory_digest):
+        if not self._remote_cache:
+            return
+
+        local_cas = self.get_local_cas()
+
+        request = local_cas_pb2.FetchTreeRequest()
+        request.root_digest.CopyFrom(directory_digest)
+        request.fetch_file_blobs = False
+
+        local_cas.FetchTree(request)
+
+    # _required_blobs_pruned():
+    #
+    # Like required_blobs_for_directory(), but skipping the subtrees which
+    # are known to be completely present on a remote.
+    #
+    # Args:
+    #     directory_digest (Digest): The digest of the directory
+    #     tree_key (str): The key of the remote's complete subtrees in the presence cache
+    #     stats (dict): Optional counters to add the number of "pruned" subtrees to
+    #
+    def _required_blobs_pruned(self, directory_digest, tree_key, stats):
+        if self._presence_cache.is_present(tree_key, directory_digest):
+            if stats is not None:
+                stats["pruned"] = stats.get("pruned", 0) + 1
+            return
+
+        yield directory_digest
+
+        directory = remote_execution_pb2.Directory()
+        with open(self.objpath(directory_digest), "rb") as f:
+            directory.ParseFromString(f.read())
+
+        for filenode in directory.files:
+            yield filenode.digest
+
+        for dirnode in directory.directories:
+            yield from self._required_blobs_pruned(dirnode.digest, tree_key, stats)
+
+    # _unstage_directories():
+    #
+    # Clean up all directories staged with stage_directory()
+    #
+    def _unstage_directories(self):
+        for requests, responses in self._staged_directories:
+            # An empty request asks buildbox-casd to clean up the staged
+            # directory, it responds once it is done
+            requests.put(local_cas_pb2.StageTreeRequest())
+            requests.put(None)
+            with contextlib.suppress(grpc.RpcError, StopIteration):
+                next(responses)
+
+        self._staged_directories = []
+
     # _temporary_object():
     #
     # Returns:
@@ -620,6 +878,9 @@ class CASCache:
 
         remote.init()
 
+        if self._chunk_threshold is not None and not self._remote_cache:
+            digests = self._fetch_large_blobs(remote, digests)
+
         batch = _CASBatchRead(remote)
 
         for digest in digests:
@@ -648,6 +909,8 @@ class CASCache:
     #    digests (list): The Digests of Blobs to upload
     #
     def send_blobs(self, remote, digests):
+        digests = list(digests)
+
         if self._remote_cache:
             # First fetch missing blobs from the remote cache as we can't
             # transfer blobs directly from the remote cache to another remote.
@@ -659,13 +922,169 @@ class CASCache:
                 batch.add(digest)
             batch.send()
 
+        # Skip blobs which are already known to be present on the remote
+        presence_key = self._presence_key(remote)
+        if presence_key:
+            digests = self._presence_cache.filter_missing(presence_key, digests)
+
+        remaining_digests = digests
+        if self._chunk_threshold is not None and not self._remote_cache:
+            remaining_digests = self._send_large_blobs(remote, digests)
+
         batch = _CASBatchUpdate(remote)
 
-        for digest in digests:
+        for digest in remaining_digests:
             batch.add(digest)
 
         batch.send()
 
+        if presence_key:
+            self._presence_cache.mark_present(presence_key, digests)
+
+    # _fetch_large_blobs():
+    #
+    # Fetch the blobs larger than the chunk threshold which are missing in
+    # the local cache in chunks, if the remote supports splitting blobs.
+    # Only the chunks which are missing in the local cache are fetched,
+    # e.g. chunks which did not change since a previous version of a blob.
+    #
+    # Args:
+    #    remote (CASRemote): The remote repository to fetch from
+    #    digests (list): The Digests of blobs to fetch
+    #
+    # Returns: The Digests of the blobs which still need to be fetched
+    #
+    def _fetch_large_blobs(self, remote, digests):
+        digests = list(digests)
+
+        large_blobs = [digest for digest in digests if digest.size_bytes > self._chunk_threshold]
+        if not large_blobs or not remote.spec or not remote.split_supported:
+            return digests
+
+        fetched = set()
+        for digest in self.missing_blobs(large_blobs):
+            if self._fetch_blob_chunks(remote, digest):
+                fetched.add(digest.hash)
+
+        return [digest for digest in digests if digest.hash not in fetched]
+
+    # _fetch_blob_chunks():
+    #
+    # Fetch a blob in chunks and splice it in the local cache.
+    #
+    # The fetched chunks are kept in the local cache, such that a later
+    # version of the blob only needs to fetch the chunks which changed.
+    # They take up to the size of the blob again, which counts towards
+    # the cache quota, and are expired by buildbox-casd like other objects.
+    #
+    # Args:
+    #    remote (CASRemote): The remote repository to fetch from
+    #    digest (Digest): The Digest of the blob
+    #
+    # Returns: True if the blob was fetched, False if it needs to be fetched whole
+    #
+    def _fetch_blob_chunks(self, remote, digest):
+        chunk_digests = remote.split_blob(digest)
+        if not chunk_digests:
+            return False
+
+        missing_chunks = _unique_digests(self.missing_blobs(chunk_digests))
+
+        try:
+            for batch in _chunk_batches(missing_chunks):
+                stored_digests = self.add_objects(buffers=remote.download_chunks(batch))
+                if [chunk_digest.hash for chunk_digest in stored_digests] != [chunk.hash for chunk in batch]:
+                    raise CASCacheError("Failed to fetch blob {}: received corrupted chunks".format(digest.hash))
+
+            with self._temporary_object() as f:
+                for chunk_digest in chunk_digests:
+                    with open(self.objpath(chunk_digest), "rb") as chunk:
+                        shutil.copyfileobj(chunk, f, _BUFFER_SIZE)
+                f.flush()
+
+                spliced_digest = self.add_object(path=f.name)
+        except (BlobNotFound, FileNotFoundError):
+            # A chunk is missing on the remote, or expired from the local cache
+            return False
+
+        if spliced_digest.hash != digest.hash:
+            raise CASCacheError("Failed to fetch blob {}: the chunks do not match the blob".format(digest.hash))
+
+        self._record_chunked_transfer(digest, missing_chunks)
+        return True
+
+    # _send_large_blobs():
+    #
+    # Upload the blobs larger than the chunk threshold which are missing on
+    # the remote in chunks, if the remote supports splicing blobs. Only the
+    # chunks which are missing on the remote are uploaded, e.g. chunks which
+    # did not change since a previous version of a blob was uploaded.
+    #
+    # Args:
+    #    remote (CASRemote): The remote repository to upload to
+    #    digests (list): The Digests of blobs to upload
+    #
+    # Returns: The Digests of the blobs which still need to be uploaded
+    #
+    def _send_large_blobs(self, remote, digests):
+        large_blobs = [digest for digest in digests if digest.size_bytes > self._chunk_threshold]
+        if not large_blobs or not remote.spec or not remote.splice_supported:
+            return digests
+
+        remote.init()
+
+        sent = set()
+        for digest in remote.find_missing_blobs(large_blobs):
+            if self._send_blob_chunks(remote, digest):
+                sent.add(digest.hash)
+
+        return [digest for digest in digests if digest.hash not in sent]
+
+    # _send_blob_chunks():
+    #
+    # Split a blob into content defined chunks and upload it in chunks.
+    #
+    # The chunks are not stored in the local cache, only their digests
+    # and offsets are kept, and the missing chunks are read from the blob
+    # again when they are uploaded.
+    #
+    # Args:
+    #    remote (CASRemote): The remote repository to upload to
+    #    digest (Digest): The Digest of the blob
+    #
+    # Returns: True if the blob was uploaded, False if it needs to be uploaded whole
+    #
+    def _send_blob_chunks(self, remote, digest):
+        with open(self.objpath(digest), "rb") as f:
+            chunk_digests = []
+            offsets = {}
+            offset = 0
+            for chunk in chunking.split(f):
+                chunk_digest = utils._message_digest(chunk)
+                chunk_digests.append(chunk_digest)
+                offsets.setdefault(chunk_digest.hash, offset)
+                offset += len(chunk)
+
+            missing_chunks = _unique_digests(remote.find_missing_blobs(chunk_digests))
+            for batch in _chunk_batches(missing_chunks):
+                chunks = []
+                for chunk_digest in batch:
+                    f.seek(offsets[chunk_digest.hash])
+                    chunks.append((chunk_digest, f.read(chunk_digest.size_bytes)))
+                remote.upload_chunks(chunks)
+
+        if not remote.splice_blob(digest, chunk_digests):
+            return False
+
+        self._record_chunked_transfer(digest, missing_chunks)
+        return True
+
+    def _record_chunked_transfer(self, digest, transferred_chunks):
+        with self._chunked_transfers_lock:
+            self._chunked_transfers[0] += 1
+            self._chunked_transfers[1] += sum(chunk_digest.size_bytes for chunk_digest in transferred_chunks)
+            self._chunked_transfers[2] += digest.size_bytes
+
     def _send_directory(self, remote, digest):
         required_blobs = self.required_blobs_for_directory(digest)
 
@@ -674,6 +1093,47 @@ class CASCache:
         # and skip blobs that already exist on the server.
         self.send_blobs(remote, required_blobs)
 
+    # _presence_key():
+    #
+    # Get the key identifying a remote in the presence cache.
+    #
+    # Args:
+    #    remote (CASRemote): The remote, or None for the local cache
+    #
+    # Returns:
+    #    (str): The key, or None if presence should not be cached for the remote
+    #
+    def _presence_key(self, remote):
+        if remote is None:
+            return None
+
+        if remote.spec:
+            spec = remote.spec
+        elif self._remote_cache:
+            # The default instance of buildbox-casd proxies the remote cache
+            spec = self._remote_cache_spec
+        else:
+            # Presence in the local cache is cheap to query and may change with expiry
+            return None
+
+        return "{}/{}".format(spec.url, spec.instance_name or "")
+
+    # _tree_presence_key():
+    #
+    # The key under which directories whose whole tree is present on a
+    # remote are recorded in the presence cache.
+    #
+    # The presence of a Directory object alone does not imply that the
+    # blobs it references are present, so these are kept apart from the
+    # blobs recorded under _presence_key().
+    #
+    def _tree_presence_key(self, remote):
+        presence_key = self._presence_key(remote)
+        if presence_key is None:
+            return None
+
+        return presence_key + "#trees"
+
     # get_cache_usage():
     #
     # Fetches the current usage of the CAS local cache.
@@ -782,3 +1242,38 @@ def _grouper(iterable, n):
         except StopIteration:
             return
         yield itertools.chain([current], itertools.islice(iterable, n - 1))
+
+
+# _unique_digests()
+#
+# Remove duplicate digests, e.g. of chunks which repeat within a blob.
+#
+def _unique_digests(digests):
+    seen = set()
+    unique = []
+    for digest in digests:
+        if digest.hash not in seen:
+            seen.add(digest.hash)
+            unique.append(digest)
+    return unique
+
+
+# _chunk_batches()
+#
+# Group chunks into batches which are transferred in a single request.
+# A chunk is never larger than chunking.MAX_CHUNK_SIZE, and batches are
+# limited to that size, to stay well below the default gRPC message limit.
+#
+def _chunk_batches(chunk_digests):
+    batch = []
+    batch_size = 0
+    for chunk_digest in chunk_digests:
+        if batch and batch_size + chunk_digest.size_bytes > chunking.MAX_CHUNK_SIZE:
+            yield batch
+            batch = []
+            batch_size = 0
+        batch.append(chunk_digest)
+        batch_size += chunk_digest.size_bytes
+
+    if batch:
+        yield batch
@@ -15,8 +15,18 @@
 #
 
 import grpc
+from google.protobuf import descriptor_pb2, descriptor_pool
+
+try:
+    from google.protobuf.message_factory import GetMessageClass
+except ImportError:
+    # Older protobuf versions
+    from google.protobuf.message_factory import MessageFactory
+
+    GetMessageClass = MessageFactory().GetPrototype
 
 from .._protos.google.rpc import code_pb2
+from .._protos.build.bazel.remote.execution.v2 import remote_execution_pb2, remote_execution_pb2_grpc
 from .._protos.build.buildgrid import local_cas_pb2
 
 from .._remote import BaseRemote
@@ -32,6 +42,61 @@ _MAX_PAYLOAD_BYTES = 1024 * 1024
 _MAX_DIGESTS = _MAX_PAYLOAD_BYTES / 80
 
 
+# _split_splice_messages()
+#
+# Define the messages of the SplitBlob and SpliceBlob methods of the
+# ContentAddressableStorage service, which are extensions of the remote
+# execution API newer than the vendored protocol definitions. The messages
+# are compatible on the wire with the upstream definitions.
+#
+# Returns:
+#    (dict): The message classes, by message name
+#
+def _split_splice_messages():
+    field_proto = descriptor_pb2.FieldDescriptorProto
+    file_proto = descriptor_pb2.FileDescriptorProto(
+        name="buildstream/_cas/split_splice.proto", package="build.bazel.remote.execution.v2", syntax="proto3"
+    )
+
+    def add_message(name, *fields):
+        message = file_proto.message_type.add(name=name)
+        for number, field_name, label, field_type in fields:
+            field = message.field.add(name=field_name, number=number, label=label, type=field_type)
+            if field_type == field_proto.TYPE_MESSAGE:
+                field.type_name = ".build.bazel.remote.execution.v2.Digest"
+
+    optional, repeated = field_proto.LABEL_OPTIONAL, field_proto.LABEL_REPEATED
+    add_message(
+        "Digest",
+        (1, "hash", optional, field_proto.TYPE_STRING),
+        (2, "size_bytes", optional, field_proto.TYPE_INT64),
+    )
+    add_message(
+        "SplitBlobRequest",
+        (1, "instance_name", optional, field_proto.TYPE_STRING),
+        (2, "blob_digest", optional, field_proto.TYPE_MESSAGE),
+    )
+    add_message("SplitBlobResponse", (1, "chunk_digests", repeated, field_proto.TYPE_MESSAGE))
+    add_message(
+        "SpliceBlobRequest",
+        (1, "instance_name", optional, field_proto.TYPE_STRING),
+        (2, "blob_digest", optional, field_proto.TYPE_MESSAGE),
+        (3, "chunk_digests", repeated, field_proto.TYPE_MESSAGE),
+    )
+    add_message("SpliceBlobResponse", (1, "blob_digest", optional, field_proto.TYPE_MESSAGE))
+
+    pool = descriptor_pool.DescriptorPool()
+    pool.AddSerializedFile(file_proto.SerializeToString())
+
+    return {
+        message.name: GetMessageClass(pool.FindMessageTypeByName("build.bazel.remote.execution.v2." + message.name))
+        for message in file_proto.message_type
+    }
+
+
+_MESSAGES = _split_splice_messages()
+
+
 class BlobNotFound(CASRemoteError):
     def __init__(self, blob, msg):
         self.blob = blob
@@ -47,6 +112,14 @@ class CASRemote(BaseRemote):
         self.cascache = cascache
         self.local_cas_instance_name = None
 
+        # Whether the remote supports splitting and splicing blobs,
+        # until it responds that it does not
+        self.split_supported = True
+        self.splice_supported = True
+        self._cas = None
+        self._split_blob = None
+        self._splice_blob = None
+
     # check_remote
     # _configure_protocols():
     #
@@ -81,6 +154,213 @@ class CASRemote(BaseRemote):
             raise
         self.local_cas_instance_name = response.instance_name
 
+        # Chunks are transferred directly, as buildbox-casd can only upload
+        # blobs which are stored in the local cache
+        self._cas = remote_execution_pb2_grpc.ContentAddressableStorageStub(self.channel)
+
+        service = "/build.bazel.remote.execution.v2.ContentAddressableStorage/"
+        self._split_blob = self.channel.unary_unary(
+            service + "SplitBlob",
+            request_serializer=_MESSAGES["SplitBlobRequest"].SerializeToString,
+            response_deserializer=_MESSAGES["SplitBlobResponse"].FromString,
+        )
+        self._splice_blob = self.channel.unary_unary(
+            service + "SpliceBlob",
+            request_serializer=_MESSAGES["SpliceBlobRequest"].SerializeToString,
+            response_deserializer=_MESSAGES["SpliceBlobResponse"].FromString,
+        )
+
+    # split_blob():
+    #
+    # Ask the remote for the chunks of a blob, such that only the chunks
+    # which are missing in the local cache need to be downloaded.
+    #
+    # Args:
+    #     digest (Digest): The digest of the blob
+    #
+    # Returns:
+    #     (list): The Digests of the chunks, in order, or None if the remote
+    #             does not support splitting blobs or does not have the blob
+    #
+    # Raises:
+    #     (CASRemoteError): if there was an error
+    #
+    def split_blob(self, digest):
+        self.init()
+
+        if not self._split_blob or not self.split_supported:
+            return None
+
+        request = _MESSAGES["SplitBlobRequest"](instance_name=self.spec.instance_name or "")
+        request.blob_digest.hash = digest.hash
+        request.blob_digest.size_bytes = digest.size_bytes
+
+        try:
+            response = self._split_blob(request)
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                self.split_supported = False
+                return None
+            if e.code() == grpc.StatusCode.NOT_FOUND:
+                return None
+            raise CASRemoteError("Failed to split blob {}: {}".format(digest.hash, e.details())) from e
+
+        return [
+            remote_execution_pb2.Digest(hash=chunk.hash, size_bytes=chunk.size_bytes)
+            for chunk in response.chunk_digests
+        ]
+
+    # splice_blob():
+    #
+    # Ask the remote to create a blob by concatenating chunks, which must
+    # already be present on the remote.
+    #
+    # Args:
+    #     digest (Digest): The digest of the blob
+    #     chunk_digests (list): The Digests of the chunks, in order
+    #
+    # Returns:
+    #     (bool): True if the blob was created, False if the remote does not
+    #             support splicing blobs
+    #
+    # Raises:
+    #     (CASRemoteError): if there was an error
+    #
+    def splice_blob(self, digest, chunk_digests):
+        self.init()
+
+        if not self._splice_blob or not self.splice_supported:
+            return False
+
+        request = _MESSAGES["SpliceBlobRequest"](instance_name=self.spec.instance_name or "")
+        request.blob_digest.hash = digest.hash
+        request.blob_digest.size_bytes = digest.size_bytes
+        for chunk_digest in chunk_digests:
+            request.chunk_digests.add(hash=chunk_digest.hash, size_bytes=chunk_digest.size_bytes)
+
+        try:
+            response = self._splice_blob(request)
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                self.splice_supported = False
+                return False
+            raise CASRemoteError("Failed to splice blob {}: {}".format(digest.hash, e.details())) from e
+
+        if response.blob_digest.hash != digest.hash:
+            raise CASRemoteError(
+                "Failed to splice blob {}: the remote spliced blob {}".format(digest.hash, response.blob_digest.hash)
+            )
+
+        return True
+
+    # find_missing_blobs():
+    #
+    # Determine which of the given blobs are missing on the remote, without
+    # going through buildbox-casd, for the blobs of chunked transfers.
+    #
+    # Args:
+    #     digests (list): The Digests of the blobs
+    #
+    # Returns:
+    #     (list): The Digests of the blobs missing on the remote
+    #
+    # Raises:
+    #     (CASRemoteError): if there was an error
+    #
+    def find_missing_blobs(self, digests):
+        self.init()
+
+        missing_blobs = []
+        for offset in range(0, len(digests), int(_MAX_DIGESTS)):
+            request = remote_execution_pb2.FindMissingBlobsRequest(instance_name=self.spec.instance_name or "")
+            request.blob_digests.extend(digests[offset : offset + int(_MAX_DIGESTS)])
+
+            try:
+                response = self._cas.FindMissingBlobs(request)
+            except grpc.RpcError as e:
+                raise CASRemoteError("Failed to query missing blobs: {}".format(e.details())) from e
+
+            missing_blobs.extend(response.missing_blob_digests)
+
+        return missing_blobs
+
+    # upload_chunks():
+    #
+    # Upload chunks to the remote in a single request.
+    #
+    # Args:
+    #     chunks (list): The Digests and contents of the chunks
+    #
+    # Raises:
+    #     (CASRemoteError): if there was an error
+    #
+    def upload_chunks(self, chunks):
+        self.init()
+
+        request = remote_execution_pb2.BatchUpdateBlobsRequest(instance_name=self.spec.instance_name or "")
+        for chunk_digest, data in chunks:
+            request.requests.add(digest=chunk_digest, data=data)
+
+        try:
+            response = self._cas.BatchUpdateBlobs(request)
+        except grpc.RpcError as e:
+            raise CASRemoteError("Failed to upload chunks: {}".format(e.details())) from e
+
+        for chunk_response in response.responses:
+            if chunk_response.status.code != code_pb2.OK:
+                if chunk_response.status.code == code_pb2.RESOURCE_EXHAUSTED:
+                    reason = "cache-too-full"
+                else:
+                    reason = None
+
+                raise CASRemoteError(
+                    "Failed to upload chunk {}: {}".format(chunk_response.digest.hash, chunk_response.status.code),
+                    reason=reason,
+                )
+
+    # download_chunks():
+    #
+    # Download chunks from the remote in a single request.
+    #
+    # Args:
+    #     chunk_digests (list): The Digests of the chunks
+    #
+    # Returns:
+    #     (list): The contents of the chunks, in order
+    #
+    # Raises:
+    #     (BlobNotFound): if a chunk is missing on the remote
+    #     (CASRemoteError): if there was another error
+    #
+    def download_chunks(self, chunk_digests):
+        self.init()
+
+        request = remote_execution_pb2.BatchReadBlobsRequest(instance_name=self.spec.instance_name or "")
+        request.digests.extend(chunk_digests)
+
+        try:
+            response = self._cas.BatchReadBlobs(request)
+        except grpc.RpcError as e:
+            raise CASRemoteError("Failed to download chunks: {}".format(e.details())) from e
+
+        chunks = {}
+        for chunk_response in response.responses:
+            if chunk_response.status.code == code_pb2.NOT_FOUND:
+                raise BlobNotFound(
+                    chunk_response.digest.hash,
+                    "Failed to download chunk {}: {}".format(chunk_response.digest.hash, chunk_response.status.code),
+                )
+            if chunk_response.status.code != code_pb2.OK:
+                raise CASRemoteError(
+                    "Failed to download chunk {}: {}".format(chunk_response.digest.hash, chunk_response.status.code)
+                )
+            chunks[chunk_response.digest.hash] = chunk_response.data
+
+        try:
+            return [chunks[chunk_digest.hash] for chunk_digest in chunk_digests]
+        except KeyError as e:
+            raise CASRemoteError("Failed to download chunk {}: no response".format(e.args[0])) from e
+
     # push_message():
     #
     # Push the given protobuf message to a remote.
@@ -0,0 +1,91 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import zlib
+from typing import BinaryIO, Iterator
+
+# The bounds of the chunk sizes, the average chunk size is
+# about MIN_CHUNK_SIZE + 256 * (_BOUNDARY_MASK + 1) = 640 KiB
+MIN_CHUNK_SIZE = 128 * 1024
+MAX_CHUNK_SIZE = 2 * 1024 * 1024
+
+# Chunk boundaries are only considered after occurrences of the anchor
+# byte, which are found at native speed, and are chosen based on the
+# checksum of the window of bytes leading up to the anchor, such that
+# boundaries only depend on the content in their close vicinity.
+#
+_ANCHOR = b"\x9e"
+_WINDOW_SIZE = 48
+_BOUNDARY_MASK = 2048 - 1
+
+# Limit the number of checksums per chunk for degenerate content with
+# frequent anchor bytes, e.g. repetitions of the anchor byte. This is
+# large enough to rarely apply to other content.
+_MAX_CHECKS = 8 * (_BOUNDARY_MASK + 1)
+
+_READ_SIZE = 8 * 1024 * 1024
+
+
+# split()
+#
+# Split the content of a file into content defined chunks.
+#
+# Unlike chunks of a fixed size, a change to the content only changes
+# the chunks around the change, even if it inserts or removes bytes, all
+# other chunks are identical to the chunks of the original content.
+#
+# Args:
+#    f (file): The file object to read the content from
+#
+# Yields:
+#    (bytes): The chunks, in order
+#
+def split(f: BinaryIO) -> Iterator[bytes]:
+    data = b""
+    start = 0
+    eof = False
+
+    while True:
+        if not eof and len(data) - start < MAX_CHUNK_SIZE:
+            buffer = f.read(_READ_SIZE)
+            if buffer:
+                data = data[start:] + buffer
+                start = 0
+            else:
+                eof = True
+            continue
+
+        if start == len(data):
+            break
+
+        end = _find_boundary(data, start, min(len(data), start + MAX_CHUNK_SIZE))
+        yield data[start:end]
+        start = end
+
+
+# Find the end of the chunk starting at `start`, which ends at `end` at the latest
+def _find_boundary(data, start, end):
+    position = start + MIN_CHUNK_SIZE
+    checks = 0
+    while position < end and checks < _MAX_CHECKS:
+        position = data.find(_ANCHOR, position, end)
+        if position < 0:
+            break
+
+        if not zlib.crc32(data[position - _WINDOW_SIZE : position + 1]) & _BOUNDARY_MASK:
+            return position + 1
+
+        position += 1
+        checks += 1
+
+    return end
@@ -20,6 +20,9 @@ from typing import TYPE_CHECKING, List, Dict, Set, Optional, Iterable
 
 import os
 import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from grpc import Channel
 from . import utils
 from . import _site
 from . import _yaml
@@ -29,9 +32,12 @@ from ._messenger import Messenger
 from ._profile import Topics, PROFILER
 from ._platform import Platform
 from ._artifactcache import ArtifactCache
+from ._buildstats import BuildStats
 from ._elementsourcescache import ElementSourcesCache
+from ._localactioncache import LocalActionCache
 from ._remotespec import RemoteSpec, RemoteExecutionSpec
 from ._sourcecache import SourceCache
+from ._stagingcache import StagingCache
 from ._cas import CASCache, CASLogLevel
 from .types import _CacheBuildTrees, _PipelineSelection, _SchedulerErrorAction, _SourceUriPolicy
 from ._workspaces import Workspaces, WorkspaceProjectCache
@@ -41,6 +47,7 @@ from .node import Node, MappingNode
 if TYPE_CHECKING:
     # pylint: disable=cyclic-import
     from ._project import Project
+    from ._jobserver import JobServer
 
     # pylint: enable=cyclic-import
 
@@ -147,6 +154,9 @@ class Context:
         # Wether to rate limit the updating of the bst output where applicable
         self.log_throttle_updates: Optional[int] = None
 
+        # Whether to compress build logs stored in artifacts
+        self.log_compress_artifact_logs: Optional[bool] = None
+
         # Maximum number of fetch or refresh tasks
         self.sched_fetchers: Optional[int] = None
 
@@ -156,9 +166,21 @@ class Context:
         # Maximum number of push tasks
         self.sched_pushers: Optional[int] = None
 
+        # Whether to adapt the number of fetch and push tasks at runtime
+        self.sched_adaptive_concurrency: Optional[bool] = None
+
         # Maximum number of retries for network tasks
         self.sched_network_retries: Optional[int] = None
 
+        # Whether to share a jobserver between builds
+        self.sched_jobserver: Optional[bool] = None
+
+        # Whether to offload CPU bound work of jobs to a process pool
+        self.sched_process_pool: Optional[bool] = None
+
+        # File to record a timeline of the scheduler session to, set from the command line
+        self.sched_trace_file: Optional[str] = None
+
         # What to do when a build fails in non interactive mode
         self.sched_error_action: Optional[str] = None
 
@@ -183,6 +205,15 @@ class Context:
         # Remote cache server
         self.remote_cache_spec: Optional[RemoteSpec] = None
 
+        # How long to remember blobs present on remotes across sessions
+        self.remote_presence_ttl: int = 0
+
+        # Whether to cache the results of actions run in local sandboxes
+        self.local_action_cache: bool = False
+
+        # Size in bytes above which blobs are transferred in chunks, if any
+        self.chunked_transfer_threshold: Optional[int] = None
+
         # Whether or not to attempt to pull build trees globally
         self.pull_buildtrees: Optional[bool] = None
 
@@ -219,6 +250,13 @@ class Context:
         self._workspaces: Optional[Workspaces] = None
         self._workspace_project_cache: WorkspaceProjectCache = WorkspaceProjectCache()
         self._cascache: Optional[CASCache] = None
+        self._staging_cache: StagingCache = StagingCache()
+        self._jobserver: Optional["JobServer"] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._build_stats: Optional[BuildStats] = None
+        self._local_action_cache: Optional[LocalActionCache] = None
+        self._remote_channels: Dict[RemoteSpec, Channel] = {}
+        self._remote_channels_lock = threading.Lock()
 
     # __enter__()
     #
@@ -241,6 +279,11 @@ class Context:
         if self._sourcecache:
             self._sourcecache.release_resources()
 
+        with self._remote_channels_lock:
+            for channel in self._remote_channels.values():
+                channel.close()
+            self._remote_channels = {}
+
         if self._cascache:
             self._cascache.release_resources(self.messenger)
 
@@ -353,7 +396,17 @@ class Context:
         # We need to find the first existing directory in the path of our
         # casdir - the casdir may not have been created yet.
         cache = defaults.get_mapping("cache")
-        cache.validate_keys(["quota", "storage-service", "pull-buildtrees", "cache-buildtrees"])
+        cache.validate_keys(
+            [
+                "quota",
+                "storage-service",
+                "pull-buildtrees",
+                "cache-buildtrees",
+                "remote-presence-ttl",
+                "local-action-cache",
+                "chunked-transfer-threshold",
+            ]
+        )
 
         cas_volume = self.casdir
         while not os.path.exists(cas_volume):
@@ -369,6 +422,25 @@ class Context:
                 LoadErrorReason.INVALID_DATA,
             ) from e
 
+        self.remote_presence_ttl = cache.get_int("remote-presence-ttl")
+        if self.remote_presence_ttl < 0:
+            provenance = cache.get_scalar("remote-presence-ttl").get_provenance()
+            raise LoadError(
+                "{}: remote-presence-ttl must not be negative".format(provenance), LoadErrorReason.INVALID_DATA
+            )
+
+        self.local_action_cache = cache.get_bool("local-action-cache")
+
+        chunked_transfer_threshold = cache.get_str("chunked-transfer-threshold")
+        try:
+            self.chunked_transfer_threshold = utils._parse_size(chunked_transfer_threshold, cas_volume)
+        except utils.UtilError as e:
+            raise LoadError(
+                "{}\nPlease specify the value in bytes, or infinity to transfer all blobs whole.\n"
+                "\nValid values are, for example: 64M 1G infinity\n".format(str(e)),
+                LoadErrorReason.INVALID_DATA,
+            ) from e
+
         remote_cache = cache.get_mapping("storage-service", default=None)
         if remote_cache:
             self.remote_cache_spec = RemoteSpec.new_from_node(remote_cache)
@@ -404,6 +476,7 @@ class Context:
                 "element-format",
                 "message-format",
                 "throttle-ui-updates",
+                "compress-artifact-logs",
             ]
         )
         self.log_key_length = logging.get_int("key-length")
@@ -414,15 +487,30 @@ class Context:
         self.log_element_format = logging.get_str("element-format")
         self.log_message_format = logging.get_str("message-format")
         self.log_throttle_updates = logging.get_bool("throttle-ui-updates")
+        self.log_compress_artifact_logs = logging.get_bool("compress-artifact-logs")
 
         # Load scheduler config
         scheduler = defaults.get_mapping("scheduler")
-        scheduler.validate_keys(["on-error", "fetchers", "builders", "pushers", "network-retries"])
+        scheduler.validate_keys(
+            [
+                "on-error",
+                "fetchers",
+                "builders",
+                "pushers",
+                "adaptive-concurrency",
+                "network-retries",
+                "jobserver",
+                "process-pool",
+            ]
+        )
         self.sched_error_action = scheduler.get_enum("on-error", _SchedulerErrorAction)
         self.sched_fetchers = scheduler.get_int("fetchers")
         self.sched_builders = scheduler.get_int("builders")
         self.sched_pushers = scheduler.get_int("pushers")
+        self.sched_adaptive_concurrency = scheduler.get_bool("adaptive-concurrency")
         self.sched_network_retries = scheduler.get_int("network-retries")
+        self.sched_jobserver = scheduler.get_bool("jobserver")
+        self.sched_process_pool = scheduler.get_bool("process-pool")
 
         # Load build config
         build = defaults.get_mapping("build")
@@ -672,6 +760,100 @@ class Context:
         # value which we cache here too.
         return self._strict_build_plan
 
+    # get_staging_cache():
+    #
+    # Return the StagingCache object used for this BuildStream invocation
+    #
+    # Returns:
+    #    The StagingCache object
+    #
+    def get_staging_cache(self) -> StagingCache:
+        return self._staging_cache
+
+    # set_jobserver():
+    #
+    # Set the jobserver shared by builds in the current scheduler session
+    #
+    # Args:
+    #    jobserver: The JobServer, or None
+    #
+    def set_jobserver(self, jobserver: Optional["JobServer"]) -> None:
+        self._jobserver = jobserver
+
+    # get_jobserver():
+    #
+    # Returns:
+    #    The JobServer shared by builds, or None if no jobserver is active
+    #
+    def get_jobserver(self) -> Optional["JobServer"]:
+        return self._jobserver
+
+    # set_process_pool():
+    #
+    # Set the process pool of the current scheduler session
+    #
+    # Args:
+    #    process_pool: The ProcessPoolExecutor, or None
+    #
+    def set_process_pool(self, process_pool: Optional[ProcessPoolExecutor]) -> None:
+        self._process_pool = process_pool
+
+    # get_process_pool():
+    #
+    # The process pool accepts module level functions which take and
+    # return plain picklable data, see _splitrules.py for an example.
+    #
+    # Returns:
+    #    The ProcessPoolExecutor to offload CPU bound work to, or None
+    #
+    def get_process_pool(self) -> Optional[ProcessPoolExecutor]:
+        return self._process_pool
+
+    # get_build_stats():
+    #
+    # Returns:
+    #    The BuildStats store in the cache directory
+    #
+    def get_build_stats(self) -> BuildStats:
+        if self._build_stats is None:
+            assert self.cachedir
+            self._build_stats = BuildStats(os.path.join(self.cachedir, "build-stats"))
+        return self._build_stats
+
+    # get_remote_channel():
+    #
+    # Get a gRPC channel to a remote, which is shared by all threads for
+    # the whole session, such that connections and TLS sessions are reused
+    # across requests. The channel reconnects by itself after connection
+    # loss, and must not be closed by the caller.
+    #
+    # Args:
+    #    spec: The spec of the remote
+    #
+    # Returns:
+    #    The shared channel
+    #
+    def get_remote_channel(self, spec: RemoteSpec) -> Channel:
+        with self._remote_channels_lock:
+            channel = self._remote_channels.get(spec)
+            if channel is None:
+                channel = spec.open_channel()
+                self._remote_channels[spec] = channel
+            return channel
+
+    # get_local_action_cache():
+    #
+    # Returns:
+    #    The LocalActionCache in the cache directory, or None if disabled
+    #
+    def get_local_action_cache(self) -> Optional[LocalActionCache]:
+        if self._local_action_cache is None and self.local_action_cache:
+            assert self.cachedir
+            self._local_action_cache = LocalActionCache(
+                os.path.join(self.cachedir, "action-cache"), self.get_cascache()
+            )
+        return self._local_action_cache
+
     def get_cascache(self) -> CASCache:
         if self._cascache is None:
             if self.log_debug:
@@ -688,6 +870,8 @@ class Context:
                 remote_cache_spec=self.remote_cache_spec,
                 log_level=log_level,
                 log_directory=self.logdir,
+                presence_cache_ttl=self.remote_presence_ttl,
+                chunk_threshold=self.chunked_transfer_threshold,
             )
         return self._cascache
 
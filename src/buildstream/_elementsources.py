@@ -320,6 +320,31 @@ class ElementSources:
         self._cached = True
         return True
 
+    # query_caches():
+    #
+    # Check if the sources of several elements are cached in CAS, like
+    # calling query_cache() for each of them, but checking identical
+    # source trees of different elements only once.
+    #
+    # Args:
+    #    context (Context): The invocation context
+    #    sources_list (list): The ElementSources to query
+    #    executor (Executor): An optional executor to check the trees in concurrently
+    #
+    @staticmethod
+    def query_caches(context, sources_list, *, executor=None):
+        cas = context.get_cascache()
+
+        protos = [(sources, sources._elementsourcescache.load_proto(sources)) for sources in sources_list]
+        missing = cas.missing_directories([proto.files for _, proto in protos if proto], executor=executor)
+
+        for sources, proto in protos:
+            if proto and proto.files.hash not in missing:
+                sources._proto = proto
+                sources._cached = True
+            else:
+                sources._cached = False
+
     # can_query_cache():
     #
     # Returns whether the cache status is available.
@@ -420,22 +445,26 @@ class ElementSources:
         # if the source depends on previous sources.
         assert not source.BST_REQUIRES_PREVIOUS_SOURCES_FETCH and not source.BST_REQUIRES_PREVIOUS_SOURCES_STAGE
 
-        if self._sourcecache.contains(source):
-            # Already cached
-            return
-
-        cached_original = source._is_cached()
-        if not cached_original:
-            if self._sourcecache.has_fetch_remotes() and self._sourcecache.pull(source):
-                # Successfully fetched individual source from remote source cache
+        # Identical sources of other elements share the cached source,
+        # only fetch and commit it once if they are fetched concurrently
+        with self._sourcecache.fetch_lock(source):
+            if self._sourcecache.contains(source):
+                # Already cached
+                self._sourcecache.mark_shared(source)
                 return
 
-            # Unable to fetch source from remote source cache, fall back to
-            # fetching the original source.
-            source._fetch()
+            cached_original = source._is_cached()
+            if not cached_original:
+                if self._sourcecache.has_fetch_remotes() and self._sourcecache.pull(source):
+                    # Successfully fetched individual source from remote source cache
+                    return
+
+                # Unable to fetch source from remote source cache, fall back to
+                # fetching the original source.
+                source._fetch()
 
-        # Stage original source into the local CAS-based source cache
-        self._sourcecache.commit(source)
+            # Stage original source into the local CAS-based source cache
+            self._sourcecache.commit(source)
 
     # _fetch_source():
     #
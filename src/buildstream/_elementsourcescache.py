@@ -84,27 +84,23 @@ class ElementSourcesCache(AssetCache):
         index_remotes, storage_remotes = self.get_remotes(project.name, False)
 
         source_digest = None
-        errors = []
         # Start by pulling our source proto, so that we know which
-        # blobs to pull
-        for remote in index_remotes:
-            remote.init()
-            try:
-                plugin.status("Pulling source {} <- {}".format(display_key, remote))
-                response = remote.fetch_blob([uri])
-                if response:
-                    source_digest = response.blob_digest
-                    break
-
-                plugin.info("Remote ({}) does not have source {} cached".format(remote, display_key))
-            except AssetCacheError as e:
-                plugin.warn("Could not pull from remote {}: {}".format(remote, e))
-                errors.append(e)
-
-        if errors and not source_digest:
+        # blobs to pull, querying the index remotes concurrently
+        if index_remotes:
+            plugin.status("Pulling source {} <- {}".format(display_key, ", ".join(map(str, index_remotes))))
+        result = self._query_index_remotes(index_remotes, lambda remote: remote.fetch_blob([uri]))
+        if result.answer:
+            source_digest = result.answer.blob_digest
+
+        for remote in result.misses:
+            plugin.info("Remote ({}) does not have source {} cached".format(remote, display_key))
+        for remote, error in result.errors:
+            plugin.warn("Could not pull from remote {}: {}".format(remote, error))
+
+        if result.errors and not source_digest:
             raise SourceCacheError(
                 "Failed to pull source {}".format(display_key),
-                detail="\n".join(str(e) for e in errors),
+                detail="\n".join(str(error) for _, error in result.errors),
                 temporary=True,
             )
 
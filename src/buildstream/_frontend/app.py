@@ -19,6 +19,7 @@
 from contextlib import contextmanager
 import os
 import sys
+import threading
 import traceback
 import datetime
 from textwrap import TextWrapper
@@ -38,6 +39,8 @@ from .. import utils
 from ..utils import UtilError
 
 # Import frontend assets
+from .messagebuffer import MessageBuffer
+from .ndjson import NDJSONLog
 from .profile import Profile
 from .status import Status
 from .widget import LogLine
@@ -74,6 +77,7 @@ class App:
         self._session_name = None
         self._main_options = main_options  # Main CLI options, before any command
         self._status = None  # The Status object
+        self._ndjson_log = None  # The NDJSONLog object, with the ndjson log format
         self._fail_messages = {}  # Failure messages by unique plugin id
         self._interactive_failures = None  # Whether to handle failures interactively
         self._started = False  # Whether a session has started
@@ -87,8 +91,8 @@ class App:
         self._error_profile = Profile(fg="red", dim=True)
         self._detail_profile = Profile(dim=True)
 
-        # Cached messages
-        self._message_text = ""
+        # Messages waiting to be rendered
+        self._message_buffer = MessageBuffer()
         self._cache_messages = None
 
         #
@@ -96,8 +100,9 @@ class App:
         #
         is_a_tty = sys.stdout.isatty() and sys.stderr.isatty()
 
-        # Enable interactive mode if we're attached to a tty
-        if main_options["no_interactive"]:
+        # Enable interactive mode if we're attached to a tty, machine
+        # readable logs are never interactive
+        if main_options["no_interactive"] or main_options["log_format"] == "ndjson":
             self.interactive = False
         else:
             self.interactive = is_a_tty
@@ -197,6 +202,7 @@ class App:
                 "pushers": "sched_pushers",
                 "max_jobs": "build_max_jobs",
                 "network_retries": "sched_network_retries",
+                "trace_file": "sched_trace_file",
                 "pull_buildtrees": "pull_buildtrees",
                 "cache_buildtrees": "cache_buildtrees",
             }
@@ -223,6 +229,11 @@ class App:
             # Register callbacks with the State
             self._state.register_task_failed_callback(self._job_failed)
 
+            # Write the main log as JSON events if requested, to the log file or
+            # in place of the human readable messages otherwise
+            if self._main_options["log_format"] == "ndjson":
+                self._ndjson_log = NDJSONLog(self._state, self._main_options["log_file"] or sys.stderr)
+
             # Create the logger right before setting the message handler
             self.logger = LogLine(
                 self.context,
@@ -322,13 +333,13 @@ class App:
                         self._print_summary()
                 else:
                     # Check that any cached messages are printed
-                    self._render(message_text=self._message_text)
+                    self._render(messages=True)
 
                 # Exit with the error
                 self._error_exit(e)
             except RecursionError:
                 # Check that any cached messages are printed
-                self._render(message_text=self._message_text)
+                self._render(messages=True)
                 click.echo(
                     "RecursionError: Dependency depth is too large. Maximum recursion depth exceeded.", err=True
                 )
@@ -344,7 +355,7 @@ class App:
                     self._notify("{} succeeded".format(session_name), "")
                 else:
                     # Check that any cached messages are printed
-                    self._render(message_text=self._message_text)
+                    self._render(messages=True)
 
     # init_project()
     #
@@ -545,14 +556,21 @@ class App:
     # using the simple_task context manager, i.e resolving pipeline elements, that
     # use this as callback should not drive the message printing by default.
     #
-    def _render(self, message_text=None):
+    # Args:
+    #    messages (bool): Whether to also render the buffered messages
+    #
+    def _render(self, *, messages=False):
 
-        if self._status and message_text:
-            self._status.clear()
-            click.echo(message_text, nl=False, err=True)
-            self._message_text = ""
+        if self._status and messages:
+            message_text = self._format_messages()
+            if message_text:
+                self._status.clear()
+                click.echo(message_text, nl=False, err=True)
 
-        # If we're suspended or terminating, then dont render the status area
+        # If we're suspended or terminating, then dont render the status area,
+        # it is never rendered along with machine readable logs
+        if self._ndjson_log:
+            return
         if self._status and self.stream and not (self.stream.suspended or self.stream.terminated):
             self._status.render()
 
@@ -609,7 +627,7 @@ class App:
                     click.echo("\nContinuing\n", err=True)
 
     def _tick(self):
-        self._render(message_text=self._message_text)
+        self._render(messages=True)
 
     # Callback that a job has failed
     #
@@ -645,7 +663,8 @@ class App:
 
             else:
                 # Not an element_job, we don't handle the failure
-                click.echo("\nTerminating all jobs\n", err=True)
+                if self._text_output():
+                    click.echo("\nTerminating all jobs\n", err=True)
                 self.stream.terminate()
 
     def _handle_failure(self, element, task, failure):
@@ -745,19 +764,22 @@ class App:
     #
     def session_start_cb(self):
         self._started = True
-        if self._session_name:
-            self.logger.print_heading(self.project, self.stream, log_file=self._main_options["log_file"])
+        if self._session_name and self._text_output():
+            self.logger.print_heading(self.project, self.stream, log_file=self._text_log_file())
 
     #
     # Print a summary of the queues
     #
     def _print_summary(self):
         # Ensure all status & messages have been processed
-        self._render(message_text=self._message_text)
+        self._render(messages=True)
+        if not self._text_output():
+            return
+
         click.echo("", err=True)
 
         try:
-            self.logger.print_summary(self.stream, self._main_options["log_file"])
+            self.logger.print_summary(self.stream, self._text_log_file())
         except BstError as e:
             self._error_exit(e)
 
@@ -773,7 +795,8 @@ class App:
     #   prefix (str): An optional string to prepend to the error message
     #
     def _error_exit(self, error, prefix=None):
-        click.echo("", err=True)
+        if self._text_output():
+            click.echo("", err=True)
 
         if self.context is None or self.context.log_debug is None:  # Context might not be initialized, default to cmd
             debug = self._main_options["debug"]
@@ -788,6 +811,11 @@ class App:
         if prefix is not None:
             main_error = "{}: {}".format(prefix, main_error)
 
+        if self._ndjson_log:
+            self._ndjson_log.write_error(main_error, error.detail)
+        if not self._text_output():
+            sys.exit(-1)
+
         click.echo(main_error, err=True)
         if error.detail:
             indent = " " * INDENT
@@ -814,17 +842,59 @@ class App:
         if is_silenced and (message.message_type not in unconditional_messages):
             return
 
-        # Format the message & cache it
-        text = self.logger.render(message)
-        self._message_text += text
+        # Buffer the message, it is formatted along with the other messages
+        # of the same batch when the buffer is drained
+        self._message_buffer.push(message)
 
-        # If we're not rate limiting messaging, or the scheduler tick isn't active then render
+        # If we're not rate limiting messaging, or the scheduler tick isn't active then render.
+        # The buffer is only drained from the main thread, messages of jobs are rendered
+        # from the scheduler's loop instead.
         if not self._cache_messages or not self.stream.running:
-            self._render(message_text=self._message_text)
+            if threading.current_thread() is threading.main_thread() or not self.stream.tick_soon():
+                self._render(messages=True)
+
+    # _format_messages()
+    #
+    # Drain and format the buffered messages, see MessageBuffer for
+    # the ordering guarantees.
+    #
+    # Returns:
+    #    (str): The formatted messages
+    #
+    def _format_messages(self):
+        messages = self._message_buffer.drain()
+        if self._ndjson_log:
+            self._ndjson_log.write_messages(messages)
+            if not self._text_output():
+                return ""
+
+        text = "".join([self.logger.render(message) for message in messages])
 
         # Additionally log to a file
-        if self._main_options["log_file"]:
-            click.echo(text, file=self._main_options["log_file"], color=False, nl=False)
+        log_file = self._text_log_file()
+        if text and log_file:
+            click.echo(text, file=log_file, color=False, nl=False)
+
+        return text
+
+    # _text_output()
+    #
+    # Returns:
+    #    (bool): Whether human readable output is written to the terminal, which
+    #            is not the case when the terminal receives machine readable logs
+    #
+    def _text_output(self):
+        return not (self._ndjson_log and self._main_options["log_file"] is None)
+
+    # _text_log_file()
+    #
+    # Returns:
+    #    (file): The file to additionally write the human readable log to, if any
+    #
+    def _text_log_file(self):
+        if self._ndjson_log:
+            return None
+        return self._main_options["log_file"]
 
     @contextmanager
     def _interrupted(self):
@@ -833,7 +903,7 @@ class App:
             with self.stream.suspend():
                 yield
         finally:
-            self._render(message_text=self._message_text)
+            self._render(messages=True)
 
     # Some validation routines for project initialization
     #
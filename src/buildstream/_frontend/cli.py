@@ -316,6 +316,18 @@ def print_version(ctx, param, value):
     type=click.File(mode="w", encoding="UTF-8"),
     help="A file to store the main log (allows storing the main log while in interactive mode)",
 )
+@click.option(
+    "--log-format",
+    type=click.Choice(["text", "ndjson"]),
+    default="text",
+    show_default=True,
+    help="The format of the main log, ndjson writes one JSON event per line to the log file or to stderr",
+)
+@click.option(
+    "--trace-file",
+    type=click.Path(dir_okay=False, writable=True),
+    help="A file to record a timeline of scheduled tasks to, in the Chrome trace event format",
+)
 @click.option("--colors/--no-colors", default=None, help="Force enable/disable ANSI color codes in output")
 @click.option(
     "--strict/--no-strict",
@@ -1539,13 +1551,15 @@ def artifact_push(app, deps, artifact_remotes, ignore_project_artifact_remotes,
 @click.pass_obj
 def artifact_log(app, artifacts, out):
     """Show build logs of artifacts"""
+    from .. import utils
+
     with app.initialized():
         artifact_logs = app.stream.artifact_log(artifacts)
 
         if not out:
             try:
                 for log in list(artifact_logs.values()):
-                    with open(log[0], "r", encoding="utf-8") as f:
+                    with utils._open_log(log[0]) as f:
                         data = f.read()
                     click.echo_via_pager(data)
             except (OSError, FileNotFoundError):
@@ -1559,17 +1573,22 @@ def artifact_log(app, artifacts, out):
                 click.echo("Error: {} already exists".format(out), err=True)
                 sys.exit(1)
 
+            # Logs may be stored compressed in the artifact
+            def copy_log(log, dest):
+                with utils._open_log(log) as src, open(dest, "w", encoding="utf-8") as f:
+                    shutil.copyfileobj(src, f)
+
             for name, log_files in artifact_logs.items():
                 if len(log_files) > 1:
                     os.mkdir(name)
                     for log in log_files:
                         dest = os.path.join(out, name, log)
-                        shutil.copy(log, dest)
+                        copy_log(log, dest)
                     # make a dir and write in log files
                 else:
                     log_name = os.path.splitext(name)[0] + ".log"
                     dest = os.path.join(out, log_name)
-                    shutil.copy(log_files[0], dest)
+                    copy_log(log_files[0], dest)
                     # write a log file
 
 
@@ -1619,3 +1638,66 @@ def artifact_delete(app, artifacts, deps):
     """Remove artifacts from the local cache"""
     with app.initialized():
         app.stream.artifact_delete(artifacts, selection=deps)
+
+
+##################################################################
+#                         Stats Commands                         #
+##################################################################
+@cli.group(short_help="Query recorded build statistics")
+def stats():
+    """Query the statistics recorded for the jobs which processed elements
+
+    Statistics, such as how long elements took to build and how large
+    their artifacts are, are recorded for every session in the local
+    cache directory.
+    """
+
+
+@stats.command(name="slowest", short_help="Show the slowest elements")
+@click.option("--action", "-a", default=None, help="Only consider jobs of this action, e.g. 'build'")
+@click.option(
+    "--limit", "-n", default=10, show_default=True, type=click.IntRange(1), help="Number of elements to show"
+)
+@click.pass_obj
+def stats_slowest(app, action, limit):
+    """Show the elements with the slowest jobs
+
+    Only the latest successful job of each element and action is considered.
+    """
+    from .. import _buildstats
+
+    with app.initialized():
+        records = _buildstats.slowest(app.context.get_build_stats().load(), action=action, limit=limit)
+        click.echo(app.logger.show_build_stats(records), nl=False)
+
+
+@stats.command(name="regressions", short_help="Show jobs which became slower")
+@click.option("--action", "-a", default=None, help="Only consider jobs of this action, e.g. 'build'")
+@click.option(
+    "--threshold",
+    default=1.2,
+    show_default=True,
+    type=click.FloatRange(1.0),
+    help="Minimum ratio of the latest to the previous duration",
+)
+@click.option(
+    "--min-duration",
+    default=1.0,
+    show_default=True,
+    type=click.FloatRange(0.0),
+    help="Ignore jobs which took less seconds than this",
+)
+@click.pass_obj
+def stats_regressions(app, action, threshold, min_duration):
+    """Show jobs which became slower in their latest session
+
+    The latest successful job of each element and action is compared to
+    the successful job in the session before it.
+    """
+    from .. import _buildstats
+
+    with app.initialized():
+        regressions = _buildstats.regressions(
+            app.context.get_build_stats().load(), action=action, threshold=threshold, min_duration=min_duration
+        )
+        click.echo(app.logger.show_build_regressions(regressions), nl=False)
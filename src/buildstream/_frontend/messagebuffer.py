@@ -0,0 +1,109 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import threading
+from typing import List, Optional, Tuple
+
+from .._message import Message, MessageType
+
+
+# MessageBuffer()
+#
+# A thread safe buffer of messages waiting to be rendered by the frontend.
+#
+# Job threads only push messages into the buffer, which is cheap and never
+# blocks on formatting or terminal output, the frontend then drains the
+# buffer from the main thread, once per scheduler tick while the scheduler
+# is running, and formats the whole batch at once.
+#
+# Ordering guarantees:
+#
+#   o Messages are drained in the order in which they were pushed, so
+#     messages from any single thread keep their relative order, and
+#     messages pushed by different threads are ordered by arrival.
+#
+#   o Within a drained batch, a STATUS message from a task is dropped when
+#     the same task pushed a later STATUS message, with no other message
+#     from that task in between. Only the latest status of each task is
+#     rendered per tick, messages of other types are never dropped. Dropped
+#     messages remain recorded in the task log files.
+#
+class MessageBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._messages = []  # type: List[Message]
+
+        # Number of STATUS messages which were dropped in favor of a later one
+        self.coalesced = 0
+
+    # push()
+    #
+    # Add a message to the buffer, this can be called from any thread.
+    #
+    # Args:
+    #    message (Message): The message
+    #
+    def push(self, message: Message) -> None:
+        with self._lock:
+            self._messages.append(message)
+
+    # drain()
+    #
+    # Take all the buffered messages out of the buffer.
+    #
+    # Returns:
+    #    (list): The messages, in order
+    #
+    def drain(self) -> List[Message]:
+        with self._lock:
+            messages, self._messages = self._messages, []
+
+        if not messages:
+            return messages
+
+        # Walk backwards so that the latest STATUS message of each
+        # task is seen first, any earlier STATUS messages of the same
+        # task are superseded until another message of that task is seen.
+        superseded = set()
+        drained = []
+        for message in reversed(messages):
+            task = self._task(message)
+            if task is not None:
+                if message.message_type == MessageType.STATUS:
+                    if task in superseded:
+                        self.coalesced += 1
+                        continue
+                    superseded.add(task)
+                else:
+                    superseded.discard(task)
+
+            drained.append(message)
+
+        drained.reverse()
+        return drained
+
+    # _task()
+    #
+    # The task a message originates from
+    #
+    # Args:
+    #    message (Message): The message
+    #
+    # Returns:
+    #    (tuple): A key identifying the task, or None for messages not
+    #             originating from a task
+    #
+    def _task(self, message: Message) -> Optional[Tuple]:
+        if message.action_name is None:
+            return None
+        return (message.action_name, message.task_element_name, message.element_name)
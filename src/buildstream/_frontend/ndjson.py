@@ -0,0 +1,181 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import datetime
+import json
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from .._message import Message
+
+
+# The version of the event format, this is only ever incremented when
+# members are removed or change their meaning, new members may be added
+# to events without notice.
+#
+SCHEMA_VERSION = 1
+
+
+# NDJSONLog()
+#
+# Writes the main log as newline delimited JSON, one event object per
+# line, for consumption by machines.
+#
+# Every event has the following members:
+#
+#   o version: The SCHEMA_VERSION
+#   o event:   The kind of event, see below
+#   o time:    The time of the event, in ISO 8601 format
+#
+# Message events, with `event` set to "message", serialize a Message:
+#
+#   o type:         The message type, e.g. "info" or "failure"
+#   o text:         The message text
+#   o detail:       The additional detail text, or null
+#   o action:       The action name of the issuing task, or null
+#   o element:      The name of the issuing element, or null
+#   o key:          The full cache key of the issuing element, or null
+#   o task_element: The name of the element of the issuing task, or null
+#   o task_key:     The full cache key of the element of the issuing task, or null
+#   o elapsed:      The elapsed time of timed messages in seconds, or null
+#   o logfile:      The log file of the issuing task, or null
+#   o sandbox:      Whether a sandbox is available to debug a failure
+#   o scheduler:    Whether this is a scheduler level message
+#
+# Task events, with `event` set to one of "task-started", "task-progress",
+# "task-failed" or "task-completed", report the changes of scheduled tasks:
+#
+#   o task:     The unique identifier of the task
+#   o action:   The action name of the task, e.g. "build"
+#   o name:     The full name of the task, e.g. an element name
+#   o key:      The full cache key of the element, in "task-failed" events only
+#   o elapsed:  The time since the session started, in seconds
+#   o progress: The current progress of the task, or null
+#   o total:    The maximum progress of the task, or null
+#   o rss:      The memory used by the sandboxed processes of the task in bytes, or null
+#   o cpu:      The CPU usage of the sandboxed processes of the task in percent, or null
+#
+# Error events, with `event` set to "error", report the error which
+# caused BuildStream to exit:
+#
+#   o text:   The error message
+#   o detail: The additional detail text, or null
+#
+# Args:
+#    state (State): The state to report task changes of
+#    output (file): The file object to write events to
+#
+class NDJSONLog:
+    def __init__(self, state, output):
+        self._state = state
+        self._output = output
+        self._lock = threading.Lock()
+
+        # Action and full name of the tasks, which are needed
+        # after tasks were removed from the state
+        self._tasks = {}  # type: Dict[str, Tuple[str, str]]
+
+        state.register_task_added_callback(self._task_added)
+        state.register_task_changed_callback(self._task_changed)
+        state.register_task_failed_callback(self._task_failed)
+        state.register_task_removed_callback(self._task_removed)
+
+    # write_messages()
+    #
+    # Write message events.
+    #
+    # Args:
+    #    messages (Iterable[Message]): The messages
+    #
+    def write_messages(self, messages: Iterable[Message]) -> None:
+        self._write([self._message_event(message) for message in messages])
+
+    # write_error()
+    #
+    # Write an error event.
+    #
+    # Args:
+    #    text (str): The error message
+    #    detail (str): The additional detail text, or None
+    #
+    def write_error(self, text: str, detail: Optional[str]) -> None:
+        self._write([self._event("error", text=text, detail=detail)])
+
+    #######################################################
+    #                  Local Private Methods              #
+    #######################################################
+
+    def _task_added(self, task_id):
+        task = self._state.tasks[task_id]
+        self._tasks[task_id] = (task.action_name, task.full_name)
+        self._write([self._task_event("task-started", task_id)])
+
+    def _task_changed(self, task_id):
+        self._write([self._task_event("task-progress", task_id)])
+
+    def _task_failed(self, task_id, element=None):
+        key = element[1].full if element else None
+        self._write([self._task_event("task-failed", task_id, key=key)])
+
+    def _task_removed(self, task_id):
+        self._write([self._task_event("task-completed", task_id)])
+        del self._tasks[task_id]
+
+    def _task_event(self, event, task_id, **members):
+        action_name, full_name = self._tasks[task_id]
+        task = self._state.tasks.get(task_id)
+
+        return self._event(
+            event,
+            task=task_id,
+            action=action_name,
+            name=full_name,
+            elapsed=self._state.elapsed_time().total_seconds(),
+            progress=task.current_progress if task else None,
+            total=task.maximum_progress if task else None,
+            rss=task.rss if task else None,
+            cpu=round(task.cpu_percent, 1) if task and task.cpu_percent is not None else None,
+            **members,
+        )
+
+    def _message_event(self, message):
+        return self._event(
+            "message",
+            time=message.creation_time.isoformat(),
+            type=message.message_type,
+            text=message.message,
+            detail=message.detail,
+            action=message.action_name,
+            element=message.element_name,
+            key=message.element_key.full if message.element_key else None,
+            task_element=message.task_element_name,
+            task_key=message.task_element_key.full if message.task_element_key else None,
+            elapsed=message.elapsed.total_seconds() if message.elapsed is not None else None,
+            logfile=message.logfile,
+            sandbox=bool(message.sandbox),
+            scheduler=message.scheduler,
+        )
+
+    def _event(self, event, *, time=None, **members):
+        if time is None:
+            time = datetime.datetime.now().isoformat()
+        return dict(members, version=SCHEMA_VERSION, event=event, time=time)
+
+    def _write(self, events):
+        if not events:
+            return
+
+        text = "".join([json.dumps(event, sort_keys=True) + "\n" for event in events])
+        with self._lock:
+            self._output.write(text)
+            self._output.flush()
@@ -22,6 +22,8 @@ from collections import OrderedDict
 import shutil
 import click
 
+from .. import utils
+
 # Import a widget internal for formatting time codes
 from .widget import TimeCode
 
@@ -111,6 +113,12 @@ class Status:
 
         elapsed = self._state.elapsed_time()
 
+        # Resource usage is not notified by the tasks, pick it up here
+        for task_id, job in self._jobs.items():
+            task = self._state.tasks.get(task_id)
+            if task and job.update(task):
+                self._need_alloc = True
+
         self.clear()
         self._check_term_width()
         self._allocate()
@@ -399,20 +407,18 @@ class _StatusHeader:
         line2 = self._centered(text, size, line_length, " ")
 
         #
-        # Line 3: Cache usage percentage report
+        # Line 3: Cache usage percentage report, and adaptive concurrency limits
         #
-        #  ~~~~~~ cache: 44.2G / 64G (69%) ~~~~~~
+        #  ~~~~~~ cache: 44.2G / 64G (69%) fetchers: 6/10 ~~~~~~
         #
         cas = self._context.get_cascache()
         usage = cas.get_cache_usage()
         usage_string = str(usage)
 
-        if usage.used_size is None:
-            # Cache usage is unknown
-            size = 0
-            text = ""
-        else:
-            size = 21
+        size = 0
+        text = ""
+        if usage.used_size is not None:
+            size += 7
             size += len(usage_string)
             if usage.used_percent >= 95:
                 formatted_usage = self._error_profile.fmt(usage_string)
@@ -421,13 +427,20 @@ class _StatusHeader:
             else:
                 formatted_usage = self._success_profile.fmt(usage_string)
 
-            text = (
-                self._format_profile.fmt("~~~~~~ ")
-                + self._content_profile.fmt("cache")
-                + self._format_profile.fmt(": ")
-                + formatted_usage
-                + self._format_profile.fmt(" ~~~~~~")
-            )
+            text += self._content_profile.fmt("cache") + self._format_profile.fmt(": ") + formatted_usage
+
+        for name, (limit, bound) in self._state.concurrency_limits.items():
+            if text:
+                size += 1
+                text += " "
+
+            limit_string = "{}/{}".format(limit, bound)
+            size += len(name) + 2 + len(limit_string)
+            text += self._content_profile.fmt(name) + self._format_profile.fmt(": ") + limit_string
+
+        if text:
+            size += 14
+            text = self._format_profile.fmt("~~~~~~ ") + text + self._format_profile.fmt(" ~~~~~~")
 
         line3 = self._centered(text, size, line_length, " ")
 
@@ -499,6 +512,7 @@ class _StatusJob:
         self._time_code = TimeCode(context, content_profile, format_profile)
         self._current_progress = None  # Progress tally to render
         self._maximum_progress = None  # Progress tally to render
+        self._usage = None  # Rendered resource usage of the task's processes
 
         self.size = self.calculate_size()
 
@@ -521,6 +535,9 @@ class _StatusJob:
             if self._maximum_progress is not None:
                 size += len(str(self._maximum_progress))
                 size += 1  # '/'
+        if self._usage is not None:
+            size += len(self._usage)
+            size += 1  # ' '
         return size
 
     # update()
@@ -543,6 +560,10 @@ class _StatusJob:
         if task.maximum_progress != self._maximum_progress:
             changed = True
             self._maximum_progress = task.maximum_progress
+        usage = self._format_usage(task.rss, task.cpu_percent)
+        if usage != self._usage:
+            changed = True
+            self._usage = usage
         if changed:
             old_size = self.size
             self.size = self.calculate_size()
@@ -578,8 +599,28 @@ class _StatusJob:
             if self._maximum_progress is not None:
                 text += self._format_profile.fmt("/") + self._content_profile.fmt(str(self._maximum_progress))
 
+        if self._usage is not None:
+            text += " " + self._content_profile.fmt(self._usage)
+
         # Add padding before terminating ']'
         terminator = (" " * padding) + "]"
         text += self._format_profile.fmt(terminator)
 
         return text
+
+    # _format_usage()
+    #
+    # Format the resource usage of a task's processes, with fixed
+    # width fields so that the size rarely changes while sampling.
+    #
+    # Args:
+    #    rss (int): The resident set size in bytes, or None
+    #    cpu_percent (float): The CPU usage, or None
+    #
+    # Returns:
+    #    (str): The formatted usage, or None if there is nothing to show
+    #
+    def _format_usage(self, rss, cpu_percent):
+        if rss is None:
+            return None
+        return "{:>6} {:>4.0f}%".format(utils._pretty_size(rss, dec_places=1), cpu_percent or 0)
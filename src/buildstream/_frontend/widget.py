@@ -28,6 +28,7 @@ import click
 from .profile import Profile
 from ..types import _Scope
 from .. import __version__ as bst_version
+from .. import utils
 from .. import FileType
 from .._exceptions import BstError, ImplError
 from .._message import MessageType
@@ -671,6 +672,40 @@ class LogLine(Widget):
             status_text += self.content_profile.fmt("failed ") + self._err_profile.fmt(failed) + " " + failed_align
             values["{} Queue".format(group.name)] = status_text
 
+        cascache = self.context.get_cascache()
+        presence_cache = cascache.get_presence_cache()
+        if presence_cache.lookups:
+            hit_rate = 100 * presence_cache.hits / presence_cache.lookups
+            values["Remote Blob Presence"] = (
+                self.content_profile.fmt("lookups ")
+                + self.content_profile.fmt(str(presence_cache.lookups))
+                + self.format_profile.fmt(", ")
+                + self.content_profile.fmt("hits ")
+                + self._success_profile.fmt(str(presence_cache.hits))
+                + self.format_profile.fmt(" ({:.1f}%)".format(hit_rate))
+            )
+
+        chunked_blobs, chunked_transferred, chunked_total = cascache.get_chunked_transfers()
+        if chunked_blobs:
+            values["Chunked Transfers"] = (
+                self.content_profile.fmt("blobs ")
+                + self.content_profile.fmt(str(chunked_blobs))
+                + self.format_profile.fmt(", ")
+                + self.content_profile.fmt("transferred ")
+                + self._success_profile.fmt(utils._pretty_size(chunked_transferred))
+                + self.format_profile.fmt(" of {}".format(utils._pretty_size(chunked_total)))
+            )
+
+        sourcecache = self.context.sourcecache
+        if sourcecache.shared:
+            values["Shared Sources"] = (
+                self.content_profile.fmt("fetched ")
+                + self.content_profile.fmt(str(sourcecache.get_session_count()))
+                + self.format_profile.fmt(", ")
+                + self.content_profile.fmt("shared ")
+                + self._success_profile.fmt(str(sourcecache.shared))
+            )
+
         text += self._format_values(values, style_value=False)
 
         click.echo(text, nl=False, err=True)
@@ -1016,6 +1051,75 @@ class LogLine(Widget):
 
         return report
 
+    # show_build_stats()
+    #
+    # Show the recorded statistics of jobs
+    #
+    # Example output:
+    #
+    #    "   0:42:07  Build  base/gcc.bst  (1.2G artifact, 0:41:20 in sandbox)"
+    #
+    # Args:
+    #    records (list [dict]): The records, see BuildStats
+    #
+    def show_build_stats(self, records):
+        report = ""
+        p = Profile()
+        for record in records:
+            line = "%{duration: >10}  %{action}  %{name}"
+            line = p.fmt_subst(line, "duration", self._format_seconds(record["duration"]), fg="cyan")
+            line = p.fmt_subst(line, "action", record.get("action", ""), fg="blue")
+            line = p.fmt_subst(line, "name", record.get("element", ""), fg="yellow")
+
+            details = []
+            if "size" in record:
+                details.append("{} artifact".format(utils._pretty_size(record["size"], dec_places=1)))
+            if "sandbox-time" in record:
+                details.append("{} in sandbox".format(self._format_seconds(record["sandbox-time"])))
+            if record.get("retries"):
+                details.append("{} retries".format(record["retries"]))
+            if details:
+                line += "  ({})".format(", ".join(details))
+
+            report += line + "\n"
+
+        return report
+
+    # show_build_regressions()
+    #
+    # Show jobs which became slower between sessions
+    #
+    # Example output:
+    #
+    #    "   0:02:10 ->    0:05:31  Build  base/gcc.bst  (cache key changed)"
+    #
+    # Args:
+    #    regressions (list [tuple]): The (previous, latest) records, see BuildStats
+    #
+    def show_build_regressions(self, regressions):
+        report = ""
+        p = Profile()
+        for previous, latest in regressions:
+            line = "%{previous: >10} -> %{latest: >10}  %{action}  %{name}"
+            line = p.fmt_subst(line, "previous", self._format_seconds(previous["duration"]), fg="cyan")
+            line = p.fmt_subst(line, "latest", self._format_seconds(latest["duration"]), fg="red")
+            line = p.fmt_subst(line, "action", latest.get("action", ""), fg="blue")
+            line = p.fmt_subst(line, "name", latest.get("element", ""), fg="yellow")
+
+            if previous.get("key") != latest.get("key"):
+                line += "  (cache key changed)"
+
+            report += line + "\n"
+
+        return report
+
+    # _format_seconds()
+    #
+    # Format a duration in seconds as H:MM:SS
+    #
+    def _format_seconds(self, seconds):
+        return str(datetime.timedelta(seconds=round(seconds)))
+
     # _get_filestats()
     #
     # Gets the necessary information from a dictionary
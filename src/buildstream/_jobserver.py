@@ -0,0 +1,114 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+
+# The path at which the jobserver FIFO is made available in sandboxes
+JOBSERVER_SANDBOX_PATH = "/dev/buildstream-jobserver"
+
+
+# JobServer()
+#
+# A GNU make compatible jobserver, shared by all the build jobs of a
+# scheduler session, such that the total parallelism of builds follows
+# the available processors regardless of how many elements build at once.
+#
+# The jobserver is a FIFO holding one token per additional job slot,
+# every client make process implicitly owns one job slot in addition
+# to the tokens it acquires from the FIFO, as described in:
+#
+#    https://www.gnu.org/software/make/manual/html_node/POSIX-Jobserver.html
+#
+# Named FIFOs are supported by GNU make 4.4 and later, earlier versions
+# of make ignore the jobserver and build with their own `-j` setting.
+#
+# Args:
+#    tokens (int): The number of tokens to provide
+#    tmpdir (str): The directory to create the FIFO in
+#
+class JobServer:
+    def __init__(self, tokens: int, tmpdir: str):
+        self._directory = tempfile.mkdtemp(prefix="jobserver-", dir=tmpdir)
+        self.path = os.path.join(self._directory, "fifo")  # type: str
+        self.tokens = max(tokens, 0)  # type: int
+
+        os.mkfifo(self.path, 0o600)
+
+        # Keep the FIFO open for both reading and writing for the whole
+        # session, such that tokens remain in the pipe while no client
+        # has it open.
+        self._fd = os.open(self.path, os.O_RDWR | os.O_NONBLOCK)  # type: Optional[int]
+        os.write(self._fd, b"+" * self.tokens)
+
+    # get_makeflags()
+    #
+    # Get the MAKEFLAGS which instruct make to use this jobserver
+    #
+    # GNU make treats an inherited jobserver as a request to run jobs in
+    # parallel, the jobserver is therefore only handed to builds which
+    # already ask for parallel jobs with `-jN` for N > 1, or with an
+    # unlimited `-j`. Builds which leave MAKEFLAGS unset or do not ask
+    # for parallel jobs keep building serially.
+    #
+    # Args:
+    #    makeflags (str): The MAKEFLAGS configured for the build, if any
+    #
+    # Returns:
+    #    (str): The MAKEFLAGS to use in the sandbox, or None if the build
+    #           must not use the jobserver
+    #
+    def get_makeflags(self, makeflags: Optional[str]) -> Optional[str]:
+        flags = makeflags.split() if makeflags else []
+
+        if not _is_parallel(flags):
+            return None
+
+        flags.append("--jobserver-auth=fifo:{}".format(JOBSERVER_SANDBOX_PATH))
+        return " ".join(flags)
+
+    # close()
+    #
+    # Close and remove the FIFO
+    #
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+
+# Whether make flags request parallel jobs, the last `-j` option wins
+def _is_parallel(flags):
+    parallel = False
+    for index, flag in enumerate(flags):
+        if flag.startswith("--jobs="):
+            jobs = flag[len("--jobs=") :]
+        elif flag.startswith("-j") and not flag.startswith("--"):
+            jobs = flag[len("-j") :]
+        elif flag == "--jobs":
+            jobs = ""
+        else:
+            continue
+
+        # The number of jobs may also be given as a separate argument
+        if not jobs and flags[index + 1 : index + 2] and flags[index + 1].isdigit():
+            jobs = flags[index + 1]
+
+        parallel = not jobs or (jobs.isdigit() and int(jobs) > 1)
+
+    return parallel
@@ -17,9 +17,11 @@
 #        Tristan Van Berkom <tristan.vanberkom@codethink.co.uk>
 
 import os
+import time
 from contextlib import suppress
 
-from .._exceptions import LoadError
+from .. import utils
+from .._exceptions import LoadError, CASCacheError
 from ..exceptions import LoadErrorReason
 from .. import _yaml
 from ..element import Element
@@ -34,6 +36,11 @@ from . import loadelement
 from .loadelement import LoadElement, Dependency, DependencyType, extract_depends_from_node
 
 
+# How long staged copies of junction sources other than the one in use are
+# kept, as they may still be in use by other sessions, in seconds
+_STAGED_JUNCTION_MAX_AGE = 24 * 60 * 60
+
+
 # Loader():
 #
 # The Loader class does the heavy lifting of parsing target
@@ -75,6 +82,7 @@ class Loader:
         self._links = {}  # Dict of link target target paths indexed by link element paths
         self._loaders = {}  # Dict of junction loaders
         self._loader_search_provenances = {}  # Dictionary of provenance nodes of ongoing child loader searches
+        self._scanned_for_junctions = set()  # Set of element names scanned by _fetch_referenced_junctions()
 
         self._includes = Includes(self, copy_tree=True)
 
@@ -470,6 +478,11 @@ class Loader:
         #
         top_element.mark_fully_loaded()
 
+        # Fetch the junctions which will be crossed while loading the dependencies
+        # all at once, rather than one by one as they are reached
+        if load_subprojects:
+            self._fetch_referenced_junctions(filename)
+
         dependencies = extract_depends_from_node(top_element.node)
         # The loader queue is a stack of tuples
         # [0] is the LoadElement instance
@@ -836,12 +849,20 @@ class Loader:
             # we haven't yet for this element),
             # element._get_cache_key() can fail if used with the
             # default _KeyStrength.STRONG.
-            basedir = os.path.join(
-                self.project.directory, ".bst", "staged-junctions", filename, element._get_cache_key(_KeyStrength.WEAK)
-            )
-            if not os.path.exists(basedir):
-                os.makedirs(basedir, exist_ok=True)
-                element._stage_sources_at(basedir)
+            stagedir = os.path.join(self.project.directory, ".bst", "staged-junctions", filename)
+            try:
+                basedir = element._stage_sources_read_only()
+            except CASCacheError as e:
+                # Fall back to staging a copy of the sources, which is kept
+                # for later sessions
+                element.info("Could not stage the sources read-only, copying them instead", detail=str(e))
+                basedir = os.path.join(stagedir, element._get_cache_key(_KeyStrength.WEAK))
+                if not os.path.exists(basedir):
+                    self._stage_junction(element, basedir)
+                else:
+                    # Record the use of the staged junction, see _clean_staged_junctions()
+                    os.utime(basedir)
+            self._clean_staged_junctions(stagedir, basedir)
 
         # Load the project
         project_dir = os.path.join(basedir, element.path)
@@ -886,6 +907,125 @@ class Loader:
 
         return loader
 
+    # _fetch_referenced_junctions():
+    #
+    # Scan the local dependencies of an element for references to junctions
+    # of this project, and fetch all of the referenced junctions which need
+    # to be fetched in a single scheduler session, with full fetcher
+    # concurrency.
+    #
+    # Elements are only shallow loaded here, anything out of the ordinary
+    # (overrides, links, load errors) is left for the regular loading to
+    # deal with, which also fetches any junctions missed here.
+    #
+    # Args:
+    #    filename (str): The element-path relative bst file to start from
+    #
+    def _fetch_referenced_junctions(self, filename):
+        junction_names = set()
+        pending = [filename]
+        while pending:
+            name = pending.pop()
+            if name in self._scanned_for_junctions:
+                continue
+            self._scanned_for_junctions.add(name)
+
+            try:
+                if self._search_for_overrides(name):
+                    continue
+                element = self._elements[name] if name in self._elements else self._load_file_no_deps(name)
+                if element.link_target is not None:
+                    continue
+                # Extracting the dependencies consumes them, leave the node to the regular loading
+                dependencies = extract_depends_from_node(element.node.clone())
+            except LoadError:
+                continue
+
+            for dep in dependencies:
+                if dep.junction:
+                    junction_names.add(dep.junction.split(":", 1)[0])
+                else:
+                    pending.append(dep.name)
+
+        junctions = []
+        for junction_name in sorted(junction_names):
+            if junction_name in self._loaders or self._search_for_overrides(junction_name):
+                continue
+
+            try:
+                if junction_name in self._elements:
+                    load_element = self._elements[junction_name]
+                else:
+                    load_element = self._load_file_no_deps(junction_name)
+                if load_element.kind != "junction" or load_element.link_target is not None:
+                    continue
+                if extract_depends_from_node(load_element.node.clone()):
+                    continue
+                element = Element._new_from_load_element(load_element)
+            except LoadError:
+                continue
+
+            if not element._has_all_sources_resolved():
+                continue
+
+            element._query_source_cache()
+            if element._should_fetch():
+                junctions.append(element)
+
+        if junctions and self.load_context.fetch_subprojects:
+            self.load_context.fetch_subprojects(junctions)
+
+    # _stage_junction():
+    #
+    # Stage a copy of the sources of a junction for loading its subproject,
+    # if they cannot be staged read-only.
+    #
+    # The sources are staged to a temporary directory first, such that an
+    # interrupted session never leaves a partially staged junction behind.
+    #
+    # Args:
+    #    element (Element): The junction element
+    #    basedir (str): The directory to stage the sources to
+    #
+    @staticmethod
+    def _stage_junction(element, basedir):
+        parentdir = os.path.dirname(basedir)
+        os.makedirs(parentdir, exist_ok=True)
+
+        with utils._tempdir(prefix=".staging-", dir=parentdir) as tempdir:
+            element._export_sources(tempdir)
+            try:
+                utils.move_atomic(tempdir, basedir)
+            except utils.DirectoryExistsError:
+                # Another session staged the same junction concurrently
+                pass
+
+    # _clean_staged_junctions():
+    #
+    # Remove the staged copies of the sources of a junction, which have not
+    # been used for a while, except for the one in use.
+    #
+    # Args:
+    #    stagedir (str): The directory with the staged copies of the junction
+    #    basedir (str): The directory with the staged sources in use
+    #
+    @staticmethod
+    def _clean_staged_junctions(stagedir, basedir):
+        expiry = time.time() - _STAGED_JUNCTION_MAX_AGE
+
+        try:
+            entries = os.scandir(stagedir)
+        except FileNotFoundError:
+            return
+
+        with entries:
+            for entry in entries:
+                if entry.path == basedir or not entry.is_dir(follow_symlinks=False):
+                    continue
+                with suppress(OSError, utils.UtilError):
+                    if entry.stat(follow_symlinks=False).st_mtime < expiry:
+                        utils._force_rmtree(entry.path)
+
     # _shallow_load_overrides():
     #
     # Loads any of the override elements on this loader's junction
@@ -0,0 +1,103 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import os
+from typing import Optional
+
+from ._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
+from . import utils
+
+
+# LocalActionCache()
+#
+# A cache of the results of actions which ran in local sandboxes, keyed
+# by action digest, such that identical actions (e.g. integration commands
+# of elements staging the same dependencies) need not run again.
+#
+# Only the ActionResult messages are stored here, the outputs they
+# reference are stored in the CAS. Results whose outputs have expired
+# from the CAS are treated as cache misses.
+#
+# Args:
+#    path (str): The directory to store action results in
+#    cascache (CASCache): The CAS cache holding the outputs
+#
+class LocalActionCache:
+    def __init__(self, path: str, cascache):
+        self._path = path
+        self._cascache = cascache
+
+    # get()
+    #
+    # Look up the result of an action.
+    #
+    # Args:
+    #    action_digest (Digest): The digest of the action
+    #
+    # Returns:
+    #    (ActionResult): The result of the action, or None if not cached
+    #
+    def get(self, action_digest: remote_execution_pb2.Digest) -> Optional[remote_execution_pb2.ActionResult]:
+        action_result = remote_execution_pb2.ActionResult()
+        try:
+            with open(self._result_path(action_digest), "rb") as f:
+                action_result.ParseFromString(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception:  # pylint: disable=broad-except
+            # A corrupted entry is merely a cache miss, it is replaced on update
+            return None
+
+        if not self._outputs_cached(action_result):
+            return None
+
+        return action_result
+
+    # update()
+    #
+    # Store the result of an action, only successful results are stored.
+    #
+    # Args:
+    #    action_digest (Digest): The digest of the action
+    #    action_result (ActionResult): The result of the action
+    #
+    def update(
+        self, action_digest: remote_execution_pb2.Digest, action_result: remote_execution_pb2.ActionResult
+    ) -> None:
+        if action_result.exit_code != 0:
+            return
+
+        path = self._result_path(action_digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with utils.save_file_atomic(path, "wb") as f:
+            f.write(action_result.SerializeToString())
+
+    # Check whether the outputs of an action result are all in the CAS, this
+    # also marks them as recently used such that they are kept alive
+    def _outputs_cached(self, action_result):
+        tree_digests = [output_directory.tree_digest for output_directory in action_result.output_directories]
+        if not self._cascache.contains_files(tree_digests):
+            return False
+
+        for tree_digest in tree_digests:
+            tree = remote_execution_pb2.Tree()
+            with open(self._cascache.objpath(tree_digest), "rb") as f:
+                tree.ParseFromString(f.read())
+            root_digest = utils._message_digest(tree.root.SerializeToString())
+            if not self._cascache.contains_directory(root_digest, with_files=True):
+                return False
+
+        return True
+
+    def _result_path(self, action_digest):
+        return os.path.join(self._path, action_digest.hash[:2], action_digest.hash[2:])
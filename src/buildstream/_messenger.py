@@ -20,7 +20,7 @@ import os
 import datetime
 import threading
 from contextlib import contextmanager
-from typing import Optional, Callable, Iterator, TextIO
+from typing import Optional, Callable, Iterator, Set, TextIO, cast
 
 from . import _signals
 from ._exceptions import BstError
@@ -30,6 +30,13 @@ from ._state import State, Task
 
 _RENDER_INTERVAL: datetime.timedelta = datetime.timedelta(seconds=1)
 
+# Size of the write buffer of task log files, recorded messages are
+# written out once this much output is pending
+_LOG_BUFFER_SIZE: int = 64 * 1024
+
+# Maximum time for which recorded messages remain buffered
+_LOG_FLUSH_INTERVAL: datetime.timedelta = datetime.timedelta(seconds=5)
+
 
 # Time in seconds for which we decide that we want to display subtask information
 _DISPLAY_LIMIT: datetime.timedelta = datetime.timedelta(seconds=3)
@@ -47,11 +54,101 @@ class _TimeData:
         self.start_time: datetime.datetime = start_time
 
 
+# _LogHandle
+#
+# The buffered log file of a task, which is written to by the task's
+# thread and periodically flushed by the _LogFlusher thread.
+#
+# Any buffered output is written out before the file descriptor is
+# handed out with fileno(), e.g. to a subprocess writing its output to
+# the log, such that the log remains in order.
+#
+# Args:
+#    logfile: The open log file
+#
+class _LogHandle:
+    def __init__(self, logfile: TextIO) -> None:
+        self._logfile: TextIO = logfile
+        self._lock: threading.Lock = threading.Lock()
+        self._pending: bool = False
+        self._closed: bool = False
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            self._pending = True
+            return self._logfile.write(text)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._pending and not self._closed:
+                self._logfile.flush()
+                self._pending = False
+
+    def fileno(self) -> int:
+        self.flush()
+        return self._logfile.fileno()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._closed = True
+
+    def __getattr__(self, name):
+        return getattr(self._logfile, name)
+
+
+# _LogFlusher
+#
+# A thread flushing the buffered log files of all active tasks every
+# _LOG_FLUSH_INTERVAL, such that the logs of quiet tasks do not hold
+# buffered messages indefinitely. The thread only runs while log files
+# are active, and is stopped as soon as the last one is removed.
+#
+class _LogFlusher:
+    def __init__(self) -> None:
+        self._lock: threading.Lock = threading.Lock()
+        self._handles: Set[_LogHandle] = set()
+        self._thread: Optional[threading.Thread] = None
+        self._stop: threading.Event = threading.Event()
+
+    def add(self, handle: _LogHandle) -> None:
+        with self._lock:
+            self._handles.add(handle)
+            if self._thread is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,), name="log-flusher", daemon=True)
+                self._thread.start()
+
+    def remove(self, handle: _LogHandle) -> None:
+        thread = None
+        with self._lock:
+            self._handles.discard(handle)
+            if not self._handles and self._thread is not None:
+                self._stop.set()
+                thread = self._thread
+                self._thread = None
+        handle.close()
+
+        if thread is not None:
+            thread.join()
+
+    def _run(self, stop: threading.Event) -> None:
+        while not stop.wait(_LOG_FLUSH_INTERVAL.total_seconds()):
+            with self._lock:
+                handles = list(self._handles)
+
+            for handle in handles:
+                handle.flush()
+
+
 class _JobInfo:
-    def __init__(self, action_name: str, element_name: str, element_key: str) -> None:
+    def __init__(
+        self, action_name: str, element_name: str, element_key: str, task_id: Optional[str] = None
+    ) -> None:
         self.action_name = action_name
         self.element_name = element_name
         self.element_key = element_key
+        self.task_id = task_id
 
 
 # _MessengerLocal
@@ -63,7 +160,7 @@ class _MessengerLocal(threading.local):
         super().__init__()
 
         # The open file handle for this task
-        self.log_handle: Optional[TextIO] = None
+        self.log_handle: Optional[_LogHandle] = None
 
         # The filename for this task
         self.log_filename: Optional[str] = None
@@ -99,6 +196,9 @@ class Messenger:
         # Thread local storage
         self._locals: _MessengerLocal = _MessengerLocal()
 
+        # Periodically flushes the log files of tasks
+        self._log_flusher: _LogFlusher = _LogFlusher()
+
         # The callback to call when propagating messages
         #
         # FIXME: The message handler is currently not strongly typed,
@@ -106,9 +206,29 @@ class Messenger:
         #        We can use `Protocol` to strongly type this with python >= 3.8
         self._message_handler = None
 
-    def setup_new_action_context(self, action_name: str, element_name: str, element_key: str) -> None:
+    def setup_new_action_context(
+        self, action_name: str, element_name: str, element_key: str, task_id: Optional[str] = None
+    ) -> None:
         self._locals.silence_scope_depth = 0
-        self._locals.job = _JobInfo(action_name, element_name, element_key)
+        self._locals.job = _JobInfo(action_name, element_name, element_key, task_id)
+
+    # report_resource_usage()
+    #
+    # Report the current resource usage of the processes run by the
+    # task of the calling thread, this does nothing outside of tasks.
+    #
+    # Args:
+    #    rss: The resident set size in bytes, or None once nothing is running
+    #    cpu_percent: The CPU usage, 100 per fully used processor, or None
+    #
+    def report_resource_usage(self, rss: Optional[int], cpu_percent: Optional[float]) -> None:
+        job = self._locals.job
+        if not self._state or not job or not job.task_id:
+            return
+
+        task = self._state.tasks.get(job.task_id)
+        if task:
+            task.set_resource_usage(rss, cpu_percent)
 
     # set_message_handler()
     #
@@ -399,7 +519,10 @@ class Messenger:
         directory = os.path.dirname(self._locals.log_filename)
         os.makedirs(directory, exist_ok=True)
 
-        with open(self._locals.log_filename, "a", encoding="utf-8") as logfile:
+        # Messages are buffered rather than written out one line at a time,
+        # which matters with log directories on network filesystems, see
+        # _LogHandle for when they are flushed.
+        with open(self._locals.log_filename, "a", encoding="utf-8", buffering=_LOG_BUFFER_SIZE) as logfile:
 
             # Write one last line to the log and flush it to disk
             def flush_log():
@@ -414,12 +537,16 @@ class Messenger:
                 except RuntimeError:
                     os.fsync(logfile.fileno())
 
-            self._locals.log_handle = logfile
-            with _signals.terminator(flush_log):
-                yield self._locals.log_filename
-
-            self._locals.log_handle = None
-            self._locals.log_filename = None
+            log_handle = _LogHandle(logfile)
+            self._locals.log_handle = log_handle
+            self._log_flusher.add(log_handle)
+            try:
+                with _signals.terminator(flush_log):
+                    yield self._locals.log_filename
+            finally:
+                self._log_flusher.remove(log_handle)
+                self._locals.log_handle = None
+                self._locals.log_filename = None
 
     # get_log_handle()
     #
@@ -427,11 +554,15 @@ class Messenger:
     # log file handle when the Messenger.recorded_messages() context
     # manager is active
     #
+    # The handle can be written to like a file, and buffered messages
+    # are written out before its file descriptor is handed out, such
+    # that subprocess output written to the log remains in order.
+    #
     # Returns:
     #    The active logging file handle, or None
     #
     def get_log_handle(self) -> Optional[TextIO]:
-        return self._locals.log_handle
+        return cast(Optional[TextIO], self._locals.log_handle)
 
     # get_log_filename()
     #
@@ -439,10 +570,15 @@ class Messenger:
     # log filename when the Messenger.recorded_messages() context
     # manager is active
     #
+    # Any buffered messages are written to the log file first, such
+    # that the file can be read by the caller.
+    #
     # Returns:
     #    The active logging filename, or None
     #
     def get_log_filename(self) -> Optional[str]:
+        if self._locals.log_handle is not None:
+            self._locals.log_handle.flush()
         return self._locals.log_filename
 
     # timed_suspendable()
@@ -530,9 +666,8 @@ class Messenger:
             detail=detail,
         )
 
-        # Write to the open log file
+        # Write to the open log file, see _LogHandle for when it is flushed
         self._locals.log_handle.write("{}\n".format(text))
-        self._locals.log_handle.flush()
 
     # _render_status()
     #
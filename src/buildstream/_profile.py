@@ -20,11 +20,15 @@
 #        Benjamin Schubert <bschubert15@bloomberg.net>
 
 
+import collections
 import contextlib
 import cProfile
 import pstats
 import os
 import datetime
+import signal
+import sys
+import threading
 import time
 from ._exceptions import ProfileError
 
@@ -39,6 +43,10 @@ from ._exceptions import ProfileError
 #   BST_PROFILE=circ-dep-check:sort-deps bst <command> <args>
 #
 # The special 'all' value will enable all profiles.
+#
+# Profiles are recorded with cProfile by default, setting the
+# BST_PROFILE_MODE environment variable to 'sample' records them with
+# a low overhead sampling profiler instead, see _SampledProfile.
 class Topics:
     CIRCULAR_CHECK = "circ-dep-check"
     SORT_DEPENDENCIES = "sort-deps"
@@ -50,6 +58,30 @@ class Topics:
     ALL = "all"
 
 
+# Profiling modes, set with the BST_PROFILE_MODE environment variable
+class Modes:
+    CPROFILE = "cprofile"
+    SAMPLE = "sample"
+
+
+# Default interval between samples, in milliseconds, which can be
+# overridden with the BST_PROFILE_INTERVAL environment variable
+DEFAULT_SAMPLE_INTERVAL = 10
+
+
+# Functions in which threads wait for work, threads sampled in these
+# functions are idle and their stacks are not recorded.
+#
+# The keys are tuples of (file basename, function name).
+_IDLE_FUNCTIONS = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("selectors.py", "select"),
+}
+
+
 class _Profile:
     def __init__(self, key, message):
         self.profiler = cProfile.Profile()
@@ -109,12 +141,172 @@ class _Profile:
             stats.dump_stats(self.cprofile_filename)
 
 
+# _SampledProfile()
+#
+# A profile recorded by sampling the stacks of all threads at a regular
+# interval of consumed CPU time, instead of tracing every function call.
+#
+# The samples are taken in a SIGPROF handler, which runs in the main
+# thread and records the stack of every thread which is not idle, see
+# _IDLE_FUNCTIONS. This keeps the overhead low enough to profile whole
+# sessions, including the jobs running in the scheduler's worker threads.
+#
+# The profile is saved as a log with a summary of the functions in which
+# most samples were taken, and in the collapsed stack format consumed by
+# flamegraph tools, e.g. https://www.speedscope.app or flamegraph.pl,
+# where the root of every stack is the name of the sampled thread.
+#
+# Like signal handlers, a sampled profile can only be started from the
+# main thread.
+#
+# Args:
+#    key (str): The profile key
+#    message (str): An optional message to add to the log heading
+#    interval (int): The interval between samples, in milliseconds
+#
+class _SampledProfile:
+    def __init__(self, key, message, interval):
+        self.key = key
+        self.message = message
+        self.interval = interval
+
+        self.samples = 0  # Number of samples taken
+        self.stacks = collections.Counter()  # Number of samples per collapsed stack
+        self.sampling_time = 0.0  # Time spent taking samples, in seconds
+        self.active_time = 0.0  # Time during which samples were taken, in seconds
+
+        self._active_start = None
+        self._previous_handler = None
+        self._labels = {}  # Cached frame labels, by code object
+        self._thread_names = {}  # Cached thread names, by thread identifier
+
+        self.start_time = time.time()
+        filename_template = os.path.join(
+            os.getcwd(),
+            "profile-{}-{}".format(
+                datetime.datetime.fromtimestamp(self.start_time).strftime("%Y%m%dT%H%M%S"),
+                self.key.replace("/", "-").replace(".", "-"),
+            ),
+        )
+        self.log_filename = "{}.log".format(filename_template)
+        self.folded_filename = "{}.folded".format(filename_template)
+
+    def __enter__(self):
+        self.start()
+
+    def __exit__(self, _exc_type, _exc_value, traceback):
+        self.stop()
+        self.save()
+
+    def merge(self, profile):
+        self.samples += profile.samples
+        self.stacks.update(profile.stacks)
+        self.sampling_time += profile.sampling_time
+
+    def start(self):
+        if threading.current_thread() is not threading.main_thread():
+            raise ProfileError("Sampled profile '{}' must be started from the main thread".format(self.key))
+
+        self._active_start = time.perf_counter()
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval / 1000, self.interval / 1000)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        self.active_time += time.perf_counter() - self._active_start
+
+    def save(self):
+        overhead = 100 * self.sampling_time / self.active_time if self.active_time else 0.0
+        heading = "\n".join(
+            [
+                "-" * 64,
+                "Profile for key: {}".format(self.key),
+                "Started at: {}".format(self.start_time),
+                "\n\t{}".format(self.message) if self.message else "",
+                "-" * 64,
+                "",  # for a final new line
+            ]
+        )
+
+        # The functions in which the most samples were taken
+        own_samples = collections.Counter()
+        for stack, count in self.stacks.items():
+            own_samples[stack.rsplit(";", 1)[-1]] += count
+
+        with open(self.log_filename, "a", encoding="utf-8") as fp:
+            fp.write(heading)
+            fp.write(
+                "{} samples taken every {}ms of CPU time, with {:.2f}% overhead\n\n".format(
+                    self.samples, self.interval, overhead
+                )
+            )
+            fp.write("{:>8} {:>7}  function\n".format("samples", "%"))
+            for label, count in own_samples.most_common(50):
+                fp.write("{:>8} {:>6.2f}%  {}\n".format(count, 100 * count / max(self.samples, 1), label))
+
+        with open(self.folded_filename, "w", encoding="utf-8") as fp:
+            for stack, count in self.stacks.items():
+                fp.write("{} {}\n".format(stack, count))
+
+    # _sample()
+    #
+    # The SIGPROF handler, recording the stacks of all threads.
+    #
+    def _sample(self, _signum, frame):
+        start = time.perf_counter()
+        main_thread_id = threading.main_thread().ident
+
+        for thread_id, thread_frame in sys._current_frames().items():  # pylint: disable=protected-access
+            # The frame of this handler is not part of the sampled stack
+            if thread_id == main_thread_id:
+                thread_frame = frame
+
+            if thread_frame is None or self._is_idle(thread_frame):
+                continue
+
+            labels = []
+            while thread_frame is not None:
+                labels.append(self._label(thread_frame.f_code))
+                thread_frame = thread_frame.f_back
+            labels.append(self._thread_name(thread_id))
+            labels.reverse()
+
+            self.stacks[";".join(labels)] += 1
+            self.samples += 1
+
+        self.sampling_time += time.perf_counter() - start
+
+    def _is_idle(self, frame):
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in _IDLE_FUNCTIONS
+
+    def _label(self, code):
+        try:
+            return self._labels[code]
+        except KeyError:
+            filename = os.path.join(*code.co_filename.split(os.sep)[-2:]) if code.co_filename else "?"
+            label = "{} ({}:{})".format(code.co_name, filename, code.co_firstlineno).replace(";", ":")
+            self._labels[code] = label
+            return label
+
+    def _thread_name(self, thread_id):
+        try:
+            return self._thread_names[thread_id]
+        except KeyError:
+            for thread in threading.enumerate():
+                self._thread_names[thread.ident] = thread.name.replace(";", ":")
+            return self._thread_names.setdefault(thread_id, "thread-{}".format(thread_id))
+
+
 class _Profiler:
-    def __init__(self, settings):
+    def __init__(self, settings, mode=None, interval=None):
         self.active_topics = set()
         self.enabled_topics = set()
         self._active_profilers = []
         self._valid_topics = False
+        self._mode = mode or Modes.CPROFILE
+        self._interval = interval or str(DEFAULT_SAMPLE_INTERVAL)
 
         if settings:
             self.enabled_topics = set(settings.split(":"))
@@ -143,7 +335,10 @@ class _Profiler:
         assert key not in self.active_topics
         self.active_topics.add(key)
 
-        profiler = _Profile(key, message)
+        if self._mode == Modes.SAMPLE:
+            profiler = _SampledProfile(key, message, int(self._interval))
+        else:
+            profiler = _Profile(key, message)
         self._active_profilers.append(profiler)
 
         with profiler:
@@ -170,8 +365,14 @@ class _Profiler:
         if non_valid_topics:
             raise ProfileError("Provided BST_PROFILE topics do not exist: {}".format(", ".join(non_valid_topics)))
 
+        if self._mode not in vars(Modes).values():
+            raise ProfileError("Provided BST_PROFILE_MODE does not exist: {}".format(self._mode))
+
+        if not self._interval.isdigit() or int(self._interval) <= 0:
+            raise ProfileError("Provided BST_PROFILE_INTERVAL is not a positive integer: {}".format(self._interval))
+
         self._valid_topics = True
 
 
 # Export a profiler to be used by BuildStream
-PROFILER = _Profiler(os.getenv("BST_PROFILE"))
+PROFILER = _Profiler(os.getenv("BST_PROFILE"), os.getenv("BST_PROFILE_MODE"), os.getenv("BST_PROFILE_INTERVAL"))
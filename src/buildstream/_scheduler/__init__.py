@@ -22,6 +22,7 @@ from .queues.fetchqueue import FetchQueue
 from .queues.sourcepushqueue import SourcePushQueue
 from .queues.trackqueue import TrackQueue
 from .queues.buildqueue import BuildQueue
+from .queues.artifactuploadqueue import ArtifactUploadQueue
 from .queues.artifactpushqueue import ArtifactPushQueue
 from .queues.pullqueue import PullQueue
 from .queues.cachequeryqueue import CacheQueryQueue
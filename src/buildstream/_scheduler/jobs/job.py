@@ -24,6 +24,7 @@ import asyncio
 import datetime
 import itertools
 import threading
+import time
 import traceback
 
 # BuildStream toplevel imports
@@ -115,7 +116,9 @@ class Job:
         self._max_retries = max_retries  # Maximum number of automatic retries
         self._result = None  # Return value of child action in the parent
         self._tries = 0  # Try count, for retryable jobs
+        self._start_time = None  # Monotonic time at which the first try started
         self._terminated = False  # Whether this job has been explicitly terminated
+        self._failed_temporarily = False  # Whether the last try failed with a temporary error
 
         self._logfile = logfile
         self._message_element_name = None  # The task-wide element name
@@ -139,6 +142,8 @@ class Job:
 
         assert not self._terminated, "Attempted to start process which was already terminated"
 
+        if self._tries == 0:
+            self._start_time = time.monotonic()
         self._tries += 1
 
         # FIXME: remove the parent/child separation, it's not needed anymore.
@@ -151,6 +156,7 @@ class Job:
             self._tries,
             self._message_element_name,
             self._message_element_key,
+            task_id=self.id,
         )
 
         loop = asyncio.get_event_loop()
@@ -185,6 +191,39 @@ class Job:
     def get_terminated(self):
         return self._terminated
 
+    # get_duration()
+    #
+    # Get how long the job has been running, including all of its tries.
+    #
+    # Returns:
+    #     (float): The duration in seconds
+    #
+    def get_duration(self):
+        if self._start_time is None:
+            return 0.0
+        return time.monotonic() - self._start_time
+
+    # get_retries()
+    #
+    # Get how often the job has been retried.
+    #
+    # Returns:
+    #     (int): The number of retries
+    #
+    def get_retries(self):
+        return max(0, self._tries - 1)
+
+    # get_failed_temporarily()
+    #
+    # Get whether the job failed with a temporary error, after
+    # exhausting its retries if it had any.
+    #
+    # Returns:
+    #     (bool): True if the job failed with a temporary error
+    #
+    def get_failed_temporarily(self):
+        return self._failed_temporarily
+
     # set_message_element_name()
     #
     # This is called by Job subclasses to set the plugin instance element
@@ -301,9 +340,13 @@ class Job:
         retry_flag = returncode == _ReturnCode.FAIL
 
         if retry_flag and (self._tries <= self._max_retries) and not self._scheduler.terminated:
+            if self._scheduler.tracer:
+                self._scheduler.tracer.job_retried(self)
             self.start()
             return
 
+        self._failed_temporarily = returncode == _ReturnCode.FAIL
+
         # Resolve the outward facing overall job completion status
         #
         if returncode == _ReturnCode.OK:
@@ -322,10 +365,35 @@ class Job:
         else:
             status = JobStatus.FAIL
 
+        if self._scheduler.tracer:
+            self._scheduler.tracer.job_completed(self, status)
+
+        if self._element is not None:
+            self._record_stats(status)
+
         self.parent_complete(status, self._result)
         self._scheduler.job_completed(self, status)
         self._task = None
 
+    # _record_stats()
+    #
+    # Record the statistics of a completed element job in the build stats
+    #
+    # Args:
+    #    status (JobStatus): The status of the job
+    #
+    def _record_stats(self, status):
+        element = self._element
+        self._scheduler.context.get_build_stats().record(
+            self.action_name,
+            element._get_full_name(),
+            element._get_cache_key(),
+            status.name.lower(),
+            self.get_duration(),
+            self.get_retries(),
+            **element._get_job_stats(),
+        )
+
 
 # ChildJob()
 #
@@ -349,13 +417,25 @@ class Job:
 #                                to be supplied to the Message() constructor.
 #    message_element_key (tuple): None, or the element display key tuple
 #                                to be supplied to the Message() constructor.
+#    task_id (str): The identifier of the task in the State, if any
 #
 class ChildJob:
     def __init__(
-        self, action_name, messenger, logdir, logfile, max_retries, tries, message_element_name, message_element_key
+        self,
+        action_name,
+        messenger,
+        logdir,
+        logfile,
+        max_retries,
+        tries,
+        message_element_name,
+        message_element_key,
+        *,
+        task_id=None,
     ):
 
         self.action_name = action_name
+        self.task_id = task_id
 
         self._messenger = messenger
         self._logdir = logdir
@@ -420,7 +500,7 @@ class ChildJob:
         # Set the global message handler in this child
         # process to forward messages to the parent process
         self._messenger.setup_new_action_context(
-            self.action_name, self._message_element_name, self._message_element_key
+            self.action_name, self._message_element_name, self._message_element_key, self.task_id
         )
 
         # Time, log and and run the action function
@@ -23,7 +23,8 @@ from ..resources import ResourceType
 from ..._exceptions import SkipJob
 
 
-# A queue which pushes element artifacts
+# A queue which pushes element artifacts, publishing them on the index
+# remotes once the ArtifactUploadQueue uploaded their blobs
 #
 class ArtifactPushQueue(Queue):
 
@@ -43,6 +44,10 @@ class ArtifactPushQueue(Queue):
         if element._skip_push(skip_uncached=self._skip_uncached):
             return QueueStatus.SKIP
 
+        # Never publish an artifact whose blobs were not uploaded
+        if not element._blobs_pushed():
+            return QueueStatus.SKIP
+
         return QueueStatus.READY
 
     @staticmethod
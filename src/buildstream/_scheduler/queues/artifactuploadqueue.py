@@ -0,0 +1,56 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+
+# Local imports
+from . import Queue, QueueStatus
+from ..resources import ResourceType
+from ..jobs import JobStatus
+from ..._exceptions import SkipJob
+
+
+# A queue which uploads the blobs of element artifacts to the storage
+# remotes, the first stage of pushing artifacts, followed by the
+# ArtifactPushQueue
+#
+class ArtifactUploadQueue(Queue):
+
+    action_name = "Upload"
+    complete_name = "Artifacts Uploaded"
+    resources = [ResourceType.UPLOAD]
+
+    def __init__(self, scheduler, *, skip_uncached=False):
+        super().__init__(scheduler)
+
+        self._skip_uncached = skip_uncached
+
+    def get_process_func(self):
+        return ArtifactUploadQueue._upload_or_skip
+
+    def status(self, element):
+        if element._skip_push(skip_uncached=self._skip_uncached):
+            return QueueStatus.SKIP
+
+        return QueueStatus.READY
+
+    def done(self, _, element, result, status):
+
+        if status is JobStatus.FAIL:
+            return
+
+        element._push_blobs_done()
+
+    @staticmethod
+    def _upload_or_skip(element):
+        if not element._push_blobs():
+            raise SkipJob(ArtifactUploadQueue.action_name)
@@ -71,6 +71,7 @@ class Queue:
         #
         self._scheduler = scheduler
         self._resources = scheduler.resources  # Shared resource pool
+        self._tracer = scheduler.tracer  # The scheduler Tracer, if tracing is enabled
         self._ready_queue = []  # Ready elements
         self._done_queue = deque()  # Processed / Skipped elements
         self._max_retries = 0
@@ -196,7 +197,10 @@ class Queue:
     #
     def dequeue(self):
         while self._done_queue:
-            yield self._done_queue.popleft()
+            element = self._done_queue.popleft()
+            if self._tracer:
+                self._tracer.element_dequeued(self, element)
+            yield element
 
     # dequeue_ready()
     #
@@ -231,6 +235,9 @@ class Queue:
             _, _, element = heapq.heappop(self._ready_queue)
             ready.append(element)
 
+        if ready and self._tracer:
+            self._tracer.ready_queue_changed(self, len(self._ready_queue))
+
         return [
             ElementJob(
                 self._scheduler,
@@ -308,6 +315,13 @@ class Queue:
         #
         self._resources.release(self.resources)
 
+        # Report the outcome of the job for adaptive concurrency, skipped
+        # jobs did no work which could tell about the load on a remote.
+        # Retries and temporary errors hint at congestion, permanent
+        # failures do not.
+        if status != JobStatus.SKIPPED:
+            self._resources.job_completed(self.resources, job.get_retries() > 0 or job.get_failed_temporarily())
+
         # Update values that need to be synchronized in the main task
         # before calling any queue implementation
         self._update_workspaces(element)
@@ -377,6 +391,9 @@ class Queue:
     #    element (Element): The Element to enqueue
     #
     def _enqueue_element(self, element):
+        if self._tracer:
+            self._tracer.element_enqueued(self, element)
+
         status = self.status(element)
 
         if status == QueueStatus.SKIP:
@@ -387,6 +404,9 @@ class Queue:
             # Push elements which are ready to be processed immediately into the queue
             heapq.heappush(self._ready_queue, (element._depth, self._queued_elements, element))
             self._queued_elements += 1
+
+            if self._tracer:
+                self._tracer.element_ready(self, element, len(self._ready_queue))
         else:
             # Register a queue specific callback for pending elements
             self.register_pending_element(element)
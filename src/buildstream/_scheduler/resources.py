@@ -1,3 +1,7 @@
+import time
+from typing import Dict, Optional
+
+
 class ResourceType:
     CACHE = 0
     DOWNLOAD = 1
@@ -5,8 +9,152 @@ class ResourceType:
     UPLOAD = 3
 
 
+# Names of the resource types, as displayed in the status header and the trace
+RESOURCE_NAMES = {
+    ResourceType.CACHE: "cache",
+    ResourceType.DOWNLOAD: "fetchers",
+    ResourceType.PROCESS: "builders",
+    ResourceType.UPLOAD: "pushers",
+}
+
+
+# ConcurrencyController()
+#
+# Adapts the concurrency limit of a network bound resource at runtime,
+# using additive increase and multiplicative decrease (AIMD) driven by
+# the throughput of the jobs which held the resource.
+#
+# Decisions are taken once per window of completed jobs, the window being
+# as large as the current limit, such that every decision is based on
+# observations made at that limit:
+#
+#   o If any job of the window had to be retried or failed with a temporary
+#     error, the limit is halved, as these are usually a sign of an
+#     overloaded remote. Permanent failures, e.g. a missing file on the
+#     remote, say nothing about its load and are ignored.
+#
+#   o If the resource was not fully used while the window was observed, the
+#     throughput is limited by the jobs available rather than by the limit,
+#     and the limit is kept.
+#
+#   o If the throughput at the current limit is not noticeably better than
+#     the throughput observed at a limit lower by one, the additional job
+#     does not pay off and the limit is decreased by one. The limit is also
+#     decreased if the throughput at the lower limit was not observed yet,
+#     but a limit higher by one did not pay off, such that the limit at
+#     which more jobs stop paying off is found from either side.
+#
+#   o Otherwise the limit is increased by one.
+#
+# The throughput is the number of completed jobs per second, smoothed per
+# limit over the windows observed at that limit, such that a window of
+# larger jobs does not outweigh the windows before it. The limit never
+# leaves the range from 1 to the configured bound.
+#
+# Args:
+#    bound (int): The maximum limit, as configured by the user
+#
+class ConcurrencyController:
+
+    # Share of the mean throughput of a single job, which one more
+    # concurrent job must add to the throughput to be worth it
+    MARGINAL_GAIN = 0.5
+
+    # Weight of the latest window in the smoothed throughput of a limit
+    SMOOTHING = 0.25
+
+    def __init__(self, bound: int):
+        assert bound > 0, "Adaptive concurrency requires a bounded resource"
+
+        self.bound = bound  # The maximum limit
+        self.limit = max(1, bound // 2)  # The current limit
+        self.reason = "initial"  # The reason of the latest decision
+
+        # Observations of the current window
+        self._completed = 0
+        self._congested = False
+        self._saturated = True
+        self._window_start = time.monotonic()
+
+        # The smoothed throughput observed at each limit
+        self._throughputs = {}  # type: Dict[int, float]
+
+        # Completed jobs per second in the latest window
+        self.throughput = 0.0
+
+    # record()
+    #
+    # Record the completion of a job which held the resource.
+    #
+    # Args:
+    #    congested (bool): Whether the job was retried or failed with a temporary error
+    #    saturated (bool): Whether the resource was fully used when the job completed
+    #
+    # Returns:
+    #    (bool): True if the limit changed
+    #
+    def record(self, congested: bool = False, saturated: bool = True) -> bool:
+        self._completed += 1
+        self._congested = self._congested or congested
+        self._saturated = self._saturated and saturated
+
+        if self._completed < self.limit:
+            return False
+
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        self.throughput = self._completed / elapsed if elapsed > 0 else 0.0
+
+        old_limit = self.limit
+        if self._congested:
+            self.limit = max(1, self.limit // 2)
+            self.reason = "congestion"
+        elif not self._saturated:
+            self.reason = "idle"
+        else:
+            self._record_throughput()
+            pays_off = self._pays_off(self.limit)
+            if pays_off is False or (pays_off is None and self._pays_off(self.limit + 1) is False):
+                self.limit = max(1, self.limit - 1)
+                self.reason = "throughput"
+            else:
+                self.limit = min(self.bound, self.limit + 1)
+                self.reason = "increase"
+
+        self._completed = 0
+        self._congested = False
+        self._saturated = True
+        self._window_start = now
+
+        return self.limit != old_limit
+
+    # Smooth the throughput of the window into the throughput of the current limit
+    def _record_throughput(self) -> None:
+        smoothed = self._throughputs.get(self.limit)
+        if smoothed is not None:
+            smoothed += self.SMOOTHING * (self.throughput - smoothed)
+        else:
+            smoothed = self.throughput
+        self._throughputs[self.limit] = smoothed
+
+    # Whether the throughput at `limit` is noticeably better than at the
+    # next lower limit, or None if either of them was not observed yet
+    def _pays_off(self, limit: int) -> Optional[bool]:
+        throughput = self._throughputs.get(limit)
+        lower = self._throughputs.get(limit - 1)
+        if throughput is None or lower is None:
+            return None
+
+        return throughput - lower >= self.MARGINAL_GAIN * lower / (limit - 1)
+
+
 class Resources:
-    def __init__(self, num_builders, num_fetchers, num_pushers):
+    def __init__(
+        self, num_builders, num_fetchers, num_pushers, *, tracer=None, adaptive=False, limits_changed_cb=None
+    ):
+        self._tracer = tracer  # The scheduler Tracer, if tracing is enabled
+        self._limits_changed_cb = limits_changed_cb  # Callback invoked when adaptive limits change
+
         self._max_resources = {
             ResourceType.CACHE: 0,
             ResourceType.DOWNLOAD: num_fetchers,
@@ -34,6 +182,40 @@ class Resources:
             ResourceType.UPLOAD: set(),
         }
 
+        # Controllers adapting the limits of network bound resources, if
+        # adaptive concurrency is enabled, the configured limits are used
+        # as the upper bounds. Unlimited resources are never adapted.
+        self._controllers = {}  # type: Dict[int, ConcurrencyController]
+        if adaptive:
+            for resource in (ResourceType.DOWNLOAD, ResourceType.UPLOAD):
+                if self._max_resources[resource] > 0:
+                    controller = ConcurrencyController(self._max_resources[resource])
+                    self._controllers[resource] = controller
+                    self._max_resources[resource] = controller.limit
+
+    # get_max_jobs()
+    #
+    # Get the maximum number of jobs which can run at the same time
+    #
+    # Returns:
+    #    (int): The sum of the limits, or of the bounds of adapted limits
+    #
+    def get_max_jobs(self):
+        max_jobs = sum(self._max_resources.values())
+        for resource, controller in self._controllers.items():
+            max_jobs += controller.bound - self._max_resources[resource]
+        return max_jobs
+
+    # get_limits()
+    #
+    # Get the current limits of the adaptive resources
+    #
+    # Returns:
+    #    (dict): A tuple of (limit, bound) per adapted ResourceType
+    #
+    def get_limits(self):
+        return {resource: (controller.limit, controller.bound) for resource, controller in self._controllers.items()}
+
     # reserve()
     #
     # Reserves a set of resources
@@ -100,6 +282,9 @@ class Resources:
             for resource in resources:
                 self._used_resources[resource] += 1
 
+            if self._tracer:
+                self._tracer.resources_changed(self._used_resources)
+
         return True
 
     # release()
@@ -113,3 +298,35 @@ class Resources:
         for resource in resources:
             assert self._used_resources[resource] > 0, "Scheduler resource imbalance"
             self._used_resources[resource] -= 1
+
+        if self._tracer:
+            self._tracer.resources_changed(self._used_resources)
+
+    # job_completed()
+    #
+    # Report the completion of a job which held resources, this feeds the
+    # adaptive concurrency controllers, if any. The resources must have
+    # been released already.
+    #
+    # Args:
+    #    resources (set): The resources the job held
+    #    congested (bool): Whether the job was retried or failed with a temporary error
+    #
+    def job_completed(self, resources, congested):
+        changed = False
+        for resource in resources:
+            controller = self._controllers.get(resource)
+            if not controller:
+                continue
+
+            # Whether the resource was fully used until this job completed
+            saturated = self._used_resources[resource] + 1 >= self._max_resources[resource]
+            if controller.record(congested, saturated):
+                self._max_resources[resource] = controller.limit
+                changed = True
+
+                if self._tracer:
+                    self._tracer.concurrency_changed(resource, controller)
+
+        if changed and self._limits_changed_cb:
+            self._limits_changed_cb()
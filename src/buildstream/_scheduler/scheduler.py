@@ -27,12 +27,14 @@ import signal
 import datetime
 import multiprocessing.forkserver
 import sys
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # Local imports
-from .resources import Resources
+from .resources import Resources, RESOURCE_NAMES
+from .tracer import Tracer
 from .jobs import JobStatus
 from ..types import FastEnum
+from .._jobserver import JobServer
 from .._profile import Topics, PROFILER
 from ..plugin import Plugin
 from .. import _signals
@@ -109,8 +111,20 @@ class Scheduler:
 
         self._ticker_callback = ticker_callback
         self._interrupt_callback = interrupt_callback
+        self._tick_pending = False  # Whether an extra tick was requested with tick_soon()
 
-        self.resources = Resources(context.sched_builders, context.sched_fetchers, context.sched_pushers)
+        # The timeline tracer, only created when tracing is enabled
+        self.tracer = Tracer(context.sched_trace_file) if context.sched_trace_file else None
+
+        self.resources = Resources(
+            context.sched_builders,
+            context.sched_fetchers,
+            context.sched_pushers,
+            tracer=self.tracer,
+            adaptive=context.sched_adaptive_concurrency,
+            limits_changed_cb=self._concurrency_limits_changed,
+        )
+        self._concurrency_limits_changed()
 
         # Ensure that the forkserver is started before we start.
         # This is best run before we do any GRPC connections to casd or have
@@ -170,23 +184,52 @@ class Scheduler:
 
         _watcher.add_child_handler(self._casd_process.pid, abort_casd)
 
-        # Start the profiler
-        with PROFILER.profile(Topics.SCHEDULER, "_".join(queue.action_name for queue in self.queues)):
-            # This is not a no-op. Since it is the first signal registration
-            # that is set, it allows then other threads to register signal
-            # handling routines, which would not be possible if the main thread
-            # hadn't set it before.
-            # FIXME: this should be done in a cleaner way
-            with _signals.suspendable(lambda: None, lambda: None), _signals.terminator(lambda: None):
-                with ThreadPoolExecutor(max_workers=sum(self.resources._max_resources.values())) as pool:
-                    self.loop.set_default_executor(pool)
-                    # Run the queues
-                    self._sched()
-                    self.loop.run_forever()
-                    self.loop.close()
-
-            # Invoke the ticker callback a final time to render pending messages
-            self._ticker_callback()
+        # Share a jobserver between all builds, the implicit job slot
+        # of each client make process accounts for one processor
+        if self.context.sched_jobserver:
+            jobserver = JobServer(self.context.platform.get_cpu_count() - 1, self.context.tmpdir)
+            self.context.set_jobserver(jobserver)
+
+        # Offload CPU bound work of jobs to worker processes, such that
+        # it does not contend for the GIL with the scheduling process
+        if self.context.sched_process_pool:
+            process_pool = ProcessPoolExecutor(
+                max_workers=self.context.sched_builders, mp_context=multiprocessing.get_context("forkserver")
+            )
+            self.context.set_process_pool(process_pool)
+
+        try:
+            # Start the profiler
+            with PROFILER.profile(Topics.SCHEDULER, "_".join(queue.action_name for queue in self.queues)):
+                # This is not a no-op. Since it is the first signal registration
+                # that is set, it allows then other threads to register signal
+                # handling routines, which would not be possible if the main thread
+                # hadn't set it before.
+                # FIXME: this should be done in a cleaner way
+                with _signals.suspendable(lambda: None, lambda: None), _signals.terminator(lambda: None):
+                    with ThreadPoolExecutor(max_workers=self.resources.get_max_jobs()) as pool:
+                        self.loop.set_default_executor(pool)
+                        # Run the queues
+                        self._sched()
+                        self.loop.run_forever()
+                        self.loop.close()
+
+                # Invoke the ticker callback a final time to render pending messages
+                self._ticker_callback()
+        finally:
+            # Don't leave worker processes behind, even if scheduling failed
+            process_pool = self.context.get_process_pool()
+            if process_pool:
+                self.context.set_process_pool(None)
+                process_pool.shutdown()
+
+        if self.tracer:
+            self.tracer.save()
+
+        jobserver = self.context.get_jobserver()
+        if jobserver:
+            self.context.set_jobserver(None)
+            jobserver.close()
 
         # Stop watching casd
         _watcher.remove_child_handler(self._casd_process.pid)
@@ -272,6 +315,33 @@ class Scheduler:
     def stop(self):
         self._queue_jobs = False
 
+    # tick_soon()
+    #
+    # Invoke the ticker callback from the scheduler's event loop as soon
+    # as possible, without waiting for the next regular tick. This can be
+    # called from any thread, multiple requests before the callback runs
+    # result in a single invocation.
+    #
+    # Returns:
+    #    (bool): Whether the callback was scheduled, which is not the case
+    #            if the event loop is not running
+    #
+    def tick_soon(self):
+        loop = self.loop
+        if loop is None or not loop.is_running():
+            return False
+
+        if not self._tick_pending:
+            self._tick_pending = True
+            try:
+                loop.call_soon_threadsafe(self._tick_now)
+            except RuntimeError:
+                # The loop was closed in the meantime
+                self._tick_pending = False
+                return False
+
+        return True
+
     # job_completed():
     #
     # Called when a Job completes
@@ -337,6 +407,8 @@ class Scheduler:
         # are always started.
         #
         self._active_jobs.append(job)
+        if self.tracer:
+            self.tracer.job_started(job)
         job.start()
 
         self._state.add_task(job.id, job.action_name, job.name, self._state.elapsed_time())
@@ -508,6 +580,18 @@ class Scheduler:
         for job in self._active_jobs:
             job.terminate()
 
+    # Publish the adaptive concurrency limits to the frontend
+    def _concurrency_limits_changed(self):
+        self._state.set_concurrency_limits(
+            {RESOURCE_NAMES[resource]: limits for resource, limits in self.resources.get_limits().items()}
+        )
+
+    # Tick requested with tick_soon(), requests made while the ticker
+    # callback runs schedule another tick
+    def _tick_now(self):
+        self._tick_pending = False
+        self._ticker_callback()
+
     # Regular timeout for driving status in the UI
     def _tick(self):
         self._ticker_callback()
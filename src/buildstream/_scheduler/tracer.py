@@ -0,0 +1,279 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+from .resources import RESOURCE_NAMES
+from .. import utils
+
+# The trace process id, the whole scheduler is a single process in the trace
+_PID = 1
+
+# Thread ids of the resource slot tracks are allocated from this offset per
+# resource type, thread id 0 is the scheduler itself
+_SLOT_TID_OFFSET = 1000
+
+
+# Tracer()
+#
+# Records a timeline of a scheduler session in the Chrome trace event
+# format, which can be loaded in https://ui.perfetto.dev or chrome://tracing.
+#
+# The trace contains:
+#
+#   o One track per resource slot, showing the jobs which held the slot
+#   o The residency of each element in each queue, with a nested span for
+#     the time it spent ready but waiting for resources
+#   o Counters for the depth of each queue's ready queue and for the
+#     resources in use
+#   o The decisions of the adaptive concurrency controllers, if enabled
+#
+# The tracer is only instantiated when tracing is requested, see the
+# `--trace-file` main option, the scheduling code skips the hooks entirely
+# otherwise.
+#
+# Args:
+#    path (str): The file to write the trace to
+#
+class Tracer:
+    def __init__(self, path: str):
+        self._path = path
+        self._start = time.perf_counter()
+        self._events = []  # type: List[Dict]
+
+        # Slots held by each running job, keyed by job id
+        self._job_slots = {}  # type: Dict[str, List[Tuple[int, int]]]
+
+        # Start time of each running job, keyed by job id
+        self._job_start = {}  # type: Dict[str, int]
+
+        # Slot indices which are currently in use, per resource type
+        self._busy_slots = {resource: set() for resource in RESOURCE_NAMES}
+
+        # Resource slot tracks which were already named
+        self._named_tracks = set()
+
+        self._metadata("process_name", 0, name="BuildStream scheduler")
+        self._metadata("thread_name", 0, name="scheduler")
+
+    # element_enqueued()
+    #
+    # Called when an element enters a queue.
+    #
+    # Args:
+    #    queue (Queue): The queue
+    #    element (Element): The element entering the queue
+    #
+    def element_enqueued(self, queue, element):
+        self._async_event("b", queue.action_name, element, "queue")
+
+    # element_ready()
+    #
+    # Called when an element becomes ready to be processed in a queue.
+    #
+    # Args:
+    #    queue (Queue): The queue
+    #    element (Element): The ready element
+    #    depth (int): The resulting number of ready elements in the queue
+    #
+    def element_ready(self, queue, element, depth):
+        self._async_event("b", "waiting", element, "queue", queue=queue.action_name)
+        self.ready_queue_changed(queue, depth)
+
+    # element_dequeued()
+    #
+    # Called when an element leaves a queue.
+    #
+    # Args:
+    #    queue (Queue): The queue
+    #    element (Element): The element leaving the queue
+    #
+    def element_dequeued(self, queue, element):
+        self._async_event("e", queue.action_name, element, "queue")
+
+    # ready_queue_changed()
+    #
+    # Called when the number of ready elements in a queue changed.
+    #
+    # Args:
+    #    queue (Queue): The queue
+    #    depth (int): The number of ready elements in the queue
+    #
+    def ready_queue_changed(self, queue, depth):
+        self._events.append(
+            {"ph": "C", "name": "ready queue", "pid": _PID, "ts": self._now(), "args": {queue.action_name: depth}}
+        )
+
+    # resources_changed()
+    #
+    # Called when resources were reserved or released.
+    #
+    # Args:
+    #    used_resources (dict): The number of used resources per ResourceType
+    #
+    def resources_changed(self, used_resources):
+        self._events.append(
+            {
+                "ph": "C",
+                "name": "resources",
+                "pid": _PID,
+                "ts": self._now(),
+                "args": {RESOURCE_NAMES[resource]: used for resource, used in used_resources.items()},
+            }
+        )
+
+    # concurrency_changed()
+    #
+    # Called when an adaptive concurrency controller changed the
+    # limit of a resource.
+    #
+    # Args:
+    #    resource (ResourceType): The resource
+    #    controller (ConcurrencyController): The controller
+    #
+    def concurrency_changed(self, resource, controller):
+        now = self._now()
+        name = RESOURCE_NAMES[resource]
+        self._events.append(
+            {"ph": "C", "name": "concurrency limits", "pid": _PID, "ts": now, "args": {name: controller.limit}}
+        )
+        self._events.append(
+            {
+                "ph": "i",
+                "s": "p",
+                "name": "{} limit {}".format(name, controller.limit),
+                "pid": _PID,
+                "tid": 0,
+                "ts": now,
+                "args": {"reason": controller.reason, "throughput": round(controller.throughput, 3)},
+            }
+        )
+
+    # job_started()
+    #
+    # Called when the scheduler starts a job, the job is assigned
+    # a slot of each resource it reserved.
+    #
+    # Args:
+    #    job (Job): The job which was started
+    #
+    def job_started(self, job):
+        now = self._now()
+        element = job.get_element()
+        if element:
+            self._async_event("e", "waiting", element, "queue", ts=now)
+
+        slots = []
+        queue = getattr(job, "queue", None)
+        for resource in queue.resources if queue else []:
+            busy = self._busy_slots[resource]
+            index = next(index for index in range(len(busy) + 1) if index not in busy)
+            busy.add(index)
+            slots.append((resource, index))
+            self._name_track(resource, index)
+
+        self._job_slots[job.id] = slots
+        self._job_start[job.id] = now
+
+    # job_retried()
+    #
+    # Called when a failed job is retried, the job keeps its slots.
+    #
+    # Args:
+    #    job (Job): The job which is retried
+    #
+    def job_retried(self, job):
+        for resource, index in self._job_slots.get(job.id, []):
+            self._events.append(
+                {
+                    "ph": "i",
+                    "s": "t",
+                    "name": "retry",
+                    "pid": _PID,
+                    "tid": self._slot_tid(resource, index),
+                    "ts": self._now(),
+                }
+            )
+
+    # job_completed()
+    #
+    # Called when a job completed, this records the job on the
+    # tracks of the slots it held and releases them.
+    #
+    # Args:
+    #    job (Job): The job which completed
+    #    status (JobStatus): The status of the job
+    #
+    def job_completed(self, job, status):
+        now = self._now()
+        start = self._job_start.pop(job.id, now)
+        for resource, index in self._job_slots.pop(job.id, []):
+            self._busy_slots[resource].discard(index)
+            self._events.append(
+                {
+                    "ph": "X",
+                    "name": job.action_name,
+                    "cat": "job",
+                    "pid": _PID,
+                    "tid": self._slot_tid(resource, index),
+                    "ts": start,
+                    "dur": now - start,
+                    "args": {"job": job.name, "status": status.name.lower()},
+                }
+            )
+
+    # save()
+    #
+    # Write the trace recorded so far.
+    #
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+        with utils.save_file_atomic(self._path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self._events, "displayTimeUnit": "ms"}, f)
+
+    #######################################################
+    #                  Local Private Methods              #
+    #######################################################
+
+    # Microseconds since the tracer was created
+    def _now(self):
+        return int((time.perf_counter() - self._start) * 1000000)
+
+    def _slot_tid(self, resource, index):
+        return _SLOT_TID_OFFSET * (resource + 1) + index
+
+    def _name_track(self, resource, index):
+        tid = self._slot_tid(resource, index)
+        if tid not in self._named_tracks:
+            self._named_tracks.add(tid)
+            self._metadata("thread_name", tid, name="{} {}".format(RESOURCE_NAMES[resource], index + 1))
+            self._metadata("thread_sort_index", tid, sort_index=tid)
+
+    def _metadata(self, name, tid, **args):
+        self._events.append({"ph": "M", "name": name, "pid": _PID, "tid": tid, "args": args})
+
+    def _async_event(self, phase, name, element, category, *, ts=None, **args):
+        event = {
+            "ph": phase,
+            "name": name,
+            "cat": category,
+            "id": element._unique_id,
+            "pid": _PID,
+            "ts": self._now() if ts is None else ts,
+        }
+        if phase == "b":
+            event["args"] = dict(args, element=element._get_full_name())
+        self._events.append(event)
@@ -17,6 +17,9 @@
 #        Raoul Hidalgo Charman <raoul.hidalgocharman@codethink.co.uk>
 #
 import os
+import threading
+from contextlib import contextmanager
+from typing import Dict
 
 from ._cas.casremote import BlobNotFound
 from .storage._casbaseddirectory import CasBasedDirectory
@@ -40,6 +43,59 @@ class SourceCache(AssetCache):
         self._basedir = os.path.join(context.cachedir, "source_protos")
         os.makedirs(self._basedir, exist_ok=True)
 
+        # Sources are keyed by their kind and unique key, identical sources
+        # of different elements share the same ref. Fetching a ref is
+        # serialized by a lock per ref, such that concurrent fetch jobs only
+        # fetch and commit it once.
+        #
+        # Whether a ref is cached is always verified against the CAS, as
+        # its blobs may expire from the local cache during the session.
+        self._session_refs = set()  # Refs which were committed or pulled in this session
+        self._ref_locks = {}  # type: Dict[str, threading.Lock]
+        self._ref_locks_lock = threading.Lock()
+
+        # Number of sources which did not need to be fetched, because
+        # an identical source was already fetched in this session
+        self.shared = 0
+
+    # fetch_lock()
+    #
+    # A context manager serializing the fetching of identical sources.
+    #
+    # Args:
+    #    source (Source): The source which is going to be fetched
+    #
+    @contextmanager
+    def fetch_lock(self, source):
+        ref = source._get_source_name()
+        with self._ref_locks_lock:
+            lock = self._ref_locks.setdefault(ref, threading.Lock())
+        with lock:
+            yield
+
+    # mark_shared()
+    #
+    # Record that a source was found in the cache while fetching it, this
+    # is accounted for as sharing if an identical source was fetched
+    # earlier in this session.
+    #
+    # Args:
+    #    source (Source): The source which was found in the cache
+    #
+    def mark_shared(self, source):
+        ref = source._get_source_name()
+        with self._ref_locks_lock:
+            if ref in self._session_refs:
+                self.shared += 1
+
+    # get_session_count()
+    #
+    # Returns:
+    #    (int): The number of distinct sources committed or pulled in this session
+    #
+    def get_session_count(self):
+        return len(self._session_refs)
+
     # contains()
     #
     # Given a source, gets the ref name and checks whether the local CAS
@@ -81,6 +137,7 @@ class SourceCache(AssetCache):
             source._stage(vdir)
 
         self._store_source(ref, vdir._get_digest())
+        self._mark_fetched(ref)
 
     # export()
     #
@@ -113,19 +170,30 @@ class SourceCache(AssetCache):
 
         index_remotes, storage_remotes = self.get_remotes(project.name, False)
 
-        # First fetch the source directory digest so we know what to pull
-        source_digest = None
-        for remote in index_remotes:
-            remote.init()
-            source.status("Pulling source {} <- {}".format(display_key, remote))
+        # First fetch the source directory digest so we know what to pull,
+        # querying the index remotes concurrently
+        if index_remotes:
+            source.status("Pulling source {} <- {}".format(display_key, ", ".join(map(str, index_remotes))))
+        uri = REMOTE_ASSET_SOURCE_URN_TEMPLATE.format(ref)
+        result = self._query_index_remotes(index_remotes, lambda remote: remote.fetch_directory([uri]))
+
+        for remote in result.misses:
+            source.info("Remote source service ({}) does not have source {} cached".format(remote, display_key))
+
+        if not result.answer:
+            if result.errors:
+                raise SourceCacheError(
+                    "Failed to pull source {}".format(display_key),
+                    detail="\n".join(str(error) for _, error in result.errors),
+                    temporary=True,
+                )
+            return False
 
-            source_digest = self._pull_source(ref, remote)
-            if source_digest is None:
-                source.info("Remote source service ({}) does not have source {} cached".format(remote, display_key))
-                continue
+        for remote, error in result.errors:
+            source.warn("Could not pull from remote {}: {}".format(remote, error))
 
-        if not source_digest:
-            return False
+        source_digest = result.answer.root_directory_digest
+        self._store_source(ref, source_digest)
 
         for remote in storage_remotes:
             remote.init()
@@ -136,6 +204,7 @@ class SourceCache(AssetCache):
                 self.cas._fetch_directory(remote, source_digest)
 
                 source.info("Pulled source {} <- {}".format(display_key, remote))
+                self._mark_fetched(ref)
                 return True
             except BlobNotFound as e:
                 # Not all blobs are available on this remote
@@ -196,6 +265,10 @@ class SourceCache(AssetCache):
 
         return pushed_index and pushed_storage
 
+    def _mark_fetched(self, ref):
+        with self._ref_locks_lock:
+            self._session_refs.add(ref)
+
     def _store_source(self, ref, digest):
         source_proto = source_pb2.Source()
         source_proto.files.CopyFrom(digest)
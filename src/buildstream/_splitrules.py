@@ -0,0 +1,149 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+#  This module implements split rule matching as pure functions of plain
+#  data, such that it can be run either in the scheduling process or in
+#  the scheduler's process pool without having to serialize any element
+#  state.
+#
+import functools
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Pattern, Tuple
+
+from ._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
+from .utils import _glob2re
+
+
+# Split rules as plain data, a tuple of (domain, tuple of glob patterns)
+SplitRules = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+# compile_split_rules()
+#
+# Compile split rules into one regular expression per domain
+#
+# Args:
+#    split_rules (SplitRules): The split rules
+#
+# Returns:
+#    (dict): The compiled regular expressions, keyed by domain
+#
+@functools.lru_cache(maxsize=64)
+def compile_split_rules(split_rules: SplitRules) -> Dict[str, Pattern]:
+    return {
+        domain: re.compile("^(?:" + "|".join([_glob2re(r) for r in rules]) + ")$", re.MULTILINE | re.DOTALL)
+        for domain, rules in split_rules
+    }
+
+
+# split_filter()
+#
+# Returns True if the file with the specified `path` is included in the
+# specified split domains.
+#
+# Args:
+#    splits (dict): The compiled split rules, see compile_split_rules()
+#    include (list): A list of domains to include files from
+#    exclude (list): A list of domains to exclude files from
+#    orphans (bool): Whether to include files not spoken for by split domains
+#    path (str): The relative path of the file
+#
+# Returns:
+#    (bool): Whether to include the specified file
+#
+def split_filter(splits: Dict[str, Pattern], include: List[str], exclude: List[str], orphans: bool, path: str) -> bool:
+    # Absolute path is required for matching
+    filename = os.path.join(os.sep, path)
+
+    include_file = False
+    exclude_file = False
+    claimed_file = False
+
+    for domain, regex in splits.items():
+        if regex.match(filename):
+            claimed_file = True
+            if domain in include:
+                include_file = True
+            if domain in exclude:
+                exclude_file = True
+
+    if orphans and not claimed_file:
+        include_file = True
+
+    return include_file and not exclude_file
+
+
+# filter_split_paths()
+#
+# Filter a list of paths according to split rules.
+#
+# Args:
+#    split_rules (SplitRules): The split rules
+#    include (list): A list of domains to include files from
+#    exclude (list): A list of domains to exclude files from
+#    orphans (bool): Whether to include files not spoken for by split domains
+#    paths (Iterable[str]): The relative paths to filter
+#
+# Returns:
+#    (list): The included paths
+#
+def filter_split_paths(
+    split_rules: SplitRules, include: List[str], exclude: List[str], orphans: bool, paths: Iterable[str]
+) -> List[str]:
+    splits = compile_split_rules(split_rules)
+    return [path for path in paths if split_filter(splits, include, exclude, orphans, path)]
+
+
+# list_split_paths()
+#
+# List the paths of a directory tree in the local CAS which are included
+# in the specified split domains, in the order of
+# Directory.list_relative_paths().
+#
+# This is the entry point for the scheduler's process pool, all arguments
+# and the return value are plain picklable data. The Directory objects
+# are read from the CAS directly, such that neither walking the tree nor
+# matching the paths takes any time in the scheduling process.
+#
+# Args:
+#    casdir (str): The directory of the local CAS, see CASCache.casdir
+#    directory_hash (str): The hash of the root Directory object
+#    split_rules (SplitRules): The split rules
+#    include (list): A list of domains to include files from
+#    exclude (list): A list of domains to exclude files from
+#    orphans (bool): Whether to include files not spoken for by split domains
+#
+# Returns:
+#    (list): The included paths
+#
+def list_split_paths(
+    casdir: str, directory_hash: str, split_rules: SplitRules, include: List[str], exclude: List[str], orphans: bool
+) -> List[str]:
+    return filter_split_paths(split_rules, include, exclude, orphans, _list_relative_paths(casdir, directory_hash))
+
+
+# Walk a directory tree in the local CAS, see list_split_paths()
+def _list_relative_paths(casdir: str, directory_hash: str, prefix: str = "") -> Iterator[str]:
+    directory = remote_execution_pb2.Directory()
+    with open(os.path.join(casdir, "objects", directory_hash[:2], directory_hash[2:]), "rb") as f:
+        directory.ParseFromString(f.read())
+
+    if prefix:
+        yield prefix
+
+    for name in sorted([node.name for node in directory.files] + [node.name for node in directory.symlinks]):
+        yield os.path.join(prefix, name)
+
+    for node in sorted(directory.directories, key=lambda node: node.name):
+        yield from _list_relative_paths(casdir, node.digest.hash, os.path.join(prefix, node.name))
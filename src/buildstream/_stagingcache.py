@@ -0,0 +1,86 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+from ._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
+from .utils import FileListResult
+
+
+# The maximum number of staged trees to remember
+_STAGING_CACHE_SIZE = 128
+
+# A staged directory digest, and the staging result of each artifact in staging order
+_StagedTree = Tuple[remote_execution_pb2.Digest, List[FileListResult]]
+
+
+# StagingCache()
+#
+# A session wide cache of dependency trees which were staged into
+# an empty directory.
+#
+# Many elements share the same set of build dependencies, for instance
+# a base runtime, so rather than importing every dependency artifact
+# and collecting overlaps again for each of them, the resulting directory
+# digest is remembered along with the staging results which were collected
+# for every dependency, such that the overlap report can be replayed.
+#
+# Entries are keyed by the ordered list of staged artifacts along with
+# the split parameters they were staged with, see Element.__stage_dependencies().
+#
+class StagingCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # type: OrderedDict[Hashable, _StagedTree]
+
+        self.hits = 0
+        self.misses = 0
+
+    # lookup()
+    #
+    # Args:
+    #    key (Hashable): The staging key
+    #
+    # Returns:
+    #    (Digest): The digest of the staged directory, or None
+    #    (List[FileListResult]): The staging result for each artifact, in staging order
+    #
+    def lookup(self, key: Hashable) -> Tuple[Optional[remote_execution_pb2.Digest], List[FileListResult]]:
+        with self._lock:
+            try:
+                digest, results = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None, []
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return digest, results
+
+    # store()
+    #
+    # Args:
+    #    key (Hashable): The staging key
+    #    digest (Digest): The digest of the staged directory
+    #    results (List[FileListResult]): The staging result for each artifact, in staging order
+    #
+    def store(self, key: Hashable, digest: remote_execution_pb2.Digest, results: List[FileListResult]) -> None:
+        with self._lock:
+            self._entries[key] = (digest, results)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > _STAGING_CACHE_SIZE:
+                self._entries.popitem(last=False)
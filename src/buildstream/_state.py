@@ -118,6 +118,8 @@ class Task:
         self.elapsed_offset: datetime.timedelta = elapsed_offset
         self.current_progress: Optional[int] = None
         self.maximum_progress: Optional[int] = None
+        self.rss: Optional[int] = None  # Resident memory of the processes run by the task, in bytes
+        self.cpu_percent: Optional[float] = None  # CPU usage of the processes run by the task
 
         #
         # Private members
@@ -181,6 +183,22 @@ class Task:
             new_progress = self.current_progress + 1
         self.set_current_progress(new_progress)
 
+    # set_resource_usage()
+    #
+    # Sets the current resource usage of the processes run by this
+    # task, e.g. of a sandboxed build.
+    #
+    # This is sampled frequently from the job threads, so no callbacks
+    # are notified, the frontend picks up the usage when it next renders.
+    #
+    # Args:
+    #    rss: The resident set size in bytes, or None if nothing is running
+    #    cpu_percent: The CPU usage, 100 per fully used processor, or None
+    #
+    def set_resource_usage(self, rss: Optional[int], cpu_percent: Optional[float]) -> None:
+        self.rss = rss
+        self.cpu_percent = cpu_percent
+
     ##############################################
     #             Private methods                #
     ##############################################
@@ -211,6 +229,7 @@ class State:
         #
         self.task_groups: Dict[str, TaskGroup] = {}  # Dictionary of active task groups by group name
         self.tasks: Dict[str, Task] = {}  # Dictionary of active tasks by unique task ID
+        self.concurrency_limits: Dict[str, Tuple[int, int]] = {}  # Adaptive (limit, bound) by resource name
 
         #
         # Private members
@@ -388,6 +407,18 @@ class State:
         # Rely on 'del' to raise an error when removing nonexistent task groups
         del self.task_groups[name]
 
+    # set_concurrency_limits()
+    #
+    # Update the current limits of the adaptively sized resources
+    #
+    # This is a core-facing API and should not be called from the frontend
+    #
+    # Args:
+    #    limits: A tuple of (limit, bound) by resource name, e.g. 'fetchers'
+    #
+    def set_concurrency_limits(self, limits: Dict[str, Tuple[int, int]]) -> None:
+        self.concurrency_limits = limits
+
     # add_task()
     #
     # Add a task and send appropriate notifications
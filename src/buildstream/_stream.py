@@ -28,6 +28,7 @@ import tarfile
 import tempfile
 from contextlib import contextmanager, suppress
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Optional, Iterable, Callable
 
 from ._artifactelement import verify_artifact_ref, ArtifactElement
@@ -42,6 +43,7 @@ from ._scheduler import (
     SourcePushQueue,
     BuildQueue,
     PullQueue,
+    ArtifactUploadQueue,
     ArtifactPushQueue,
 )
 from .element import Element
@@ -213,7 +215,15 @@ class Stream:
                 self._enqueue_plan(plan)
                 self._run()
             else:
+                # Query the local artifact cache for all elements together, and then
+                # the source cache of all elements which need it, such that blobs of
+                # different elements are checked in shared requests and identical
+                # trees only once. The remaining requests are issued concurrently
+                # in worker threads. The results are completed in the main thread
+                # in plan order to remain deterministic.
                 task.set_maximum_progress(len(plan))
+                artifact_queries = []
+                source_queries = []
                 for element in plan:
                     if element._can_query_cache():
                         # Cache status already available.
@@ -221,17 +231,29 @@ class Stream:
                         # artifact early on.
                         pass
                     elif not only_sources and element._get_cache_key(strength=_KeyStrength.WEAK):
-                        element._load_artifact(pull=False)
+                        artifact_queries.append(element)
+                    elif element._has_all_sources_resolved():
+                        source_queries.append(element)
+
+                with ThreadPoolExecutor(max_workers=self._context.platform.get_cpu_count()) as executor:
+                    Element._load_artifacts(self._context, artifact_queries, executor=executor)
+
+                    # Sources are only required if the artifact is not cached
+                    for element in artifact_queries:
                         if (
                             sources_of_cached_elements
                             or not element._can_query_cache()
                             or not element._cached_success()
                         ):
-                            element._query_source_cache()
-                        if not element._pull_pending():
-                            element._load_artifact_done()
-                    elif element._has_all_sources_resolved():
-                        element._query_source_cache()
+                            source_queries.append(element)
+
+                    if source_queries:
+                        Element._query_source_caches(self._context, source_queries, executor=executor)
+
+                loaded_artifacts = set(artifact_queries)
+                for element in plan:
+                    if element in loaded_artifacts and not element._pull_pending():
+                        element._load_artifact_done()
 
                     task.add_current_progress()
 
@@ -406,6 +428,7 @@ class Stream:
         self._add_queue(BuildQueue(self._scheduler))
 
         if self._artifacts.has_push_remotes():
+            self._add_queue(ArtifactUploadQueue(self._scheduler, skip_uncached=True))
             self._add_queue(ArtifactPushQueue(self._scheduler, skip_uncached=True))
 
         if source_push_enabled:
@@ -632,6 +655,7 @@ class Stream:
 
         self._reset()
         self._add_queue(PullQueue(self._scheduler))
+        self._add_queue(ArtifactUploadQueue(self._scheduler))
         self._add_queue(ArtifactPushQueue(self._scheduler))
         self._enqueue_plan(elements)
         self._run(announce_session=True)
@@ -732,11 +756,15 @@ class Stream:
                             utils.safe_remove(location)
                         except OSError as e:
                             raise StreamError("Failed to remove checkout directory: {}".format(e)) from e
-                        virdir._export_files(location, can_link=True, can_destroy=True)
+                        result = virdir._export_files(location, can_link=True, can_destroy=True)
                     else:
-                        virdir._export_files(location)
+                        result = virdir._export_files(location)
                 except OSError as e:
                     raise StreamError("Failed to checkout files: '{}'".format(e)) from e
+
+                copy_strategies = result._describe_copy_strategies()
+                if copy_strategies:
+                    target.status("Copied files: {}".format(copy_strategies))
         else:
             to_stdout = location == "-"
             mode = _handle_compression(compression, to_stream=to_stdout)
@@ -1240,6 +1268,18 @@ class Stream:
     def terminated(self):
         return self._terminated
 
+    # tick_soon()
+    #
+    # Invoke the ticker callback from the scheduler's event loop as soon
+    # as possible, this can be called from any thread.
+    #
+    # Returns:
+    #    (bool): Whether the callback was scheduled, which is not the case
+    #            if the scheduler is not running
+    #
+    def tick_soon(self):
+        return self._scheduler.tick_soon()
+
     # terminate()
     #
     # Terminate jobs
@@ -99,6 +99,7 @@ from ._elementproxy import ElementProxy
 from ._elementsources import ElementSources
 from ._loader import Symbol, DependencyType, MetaSource
 from ._overlapcollector import OverlapCollector
+from ._splitrules import compile_split_rules, list_split_paths, split_filter
 
 from .storage import Directory, DirectoryError
 from .storage._filebaseddirectory import FileBasedDirectory
@@ -281,12 +282,15 @@ class Element(Plugin):
         self.__assemble_scheduled = False  # Element is scheduled to be assembled
         self.__assemble_done = False  # Element is assembled
         self.__pull_pending = False  # Whether pull is pending
+        self.__blobs_pushed = False  # Whether the blobs of the artifact were uploaded, see _push_blobs()
         self.__cached_successfully = None  # If the Element is known to be successfully cached
+        self.__split_rules = None  # Split rules as plain data, see _splitrules.py
         self.__splits = None  # Resolved regex objects for computing split domains
         self.__whitelist_regex = None  # Resolved regex object to check if file is allowed to overlap
         self.__tainted = None  # Whether the artifact is tainted and should not be shared
         self.__required = False  # Whether the artifact is required in the current session
         self.__build_result = None  # The result of assembling this Element (success, description, detail)
+        self.__job_stats = {}  # Statistics of the latest job processing this Element, see _get_job_stats()
         # Artifact class for direct artifact composite interaction
         self.__artifact = None  # type: Optional[Artifact]
         self.__dynamic_public = None
@@ -688,8 +692,9 @@ class Element(Plugin):
         assert self._overlap_collector is not None, "Attempted to stage artifacts outside of Element.stage()"
 
         with self._overlap_collector.session(action, path):
-            for dep in self.dependencies(selection):
-                dep._stage_artifact(sandbox, path=path, include=include, exclude=exclude, orphans=orphans, owner=self)
+            self.__stage_dependencies(
+                sandbox, self.dependencies(selection), path=path, include=include, exclude=exclude, orphans=orphans
+            )
 
     def integrate(self, sandbox: "Sandbox") -> None:
         """Integrate currently staged filesystem against this artifact.
@@ -945,9 +950,9 @@ class Element(Plugin):
         vbasedir = sandbox.get_virtual_directory()
         vstagedir = vbasedir if path is None else vbasedir.open_directory(path.lstrip(os.sep), create=True)
 
-        split_filter = self.__split_filter_func(include, exclude, orphans)
+        filter_callback = self.__split_filter_func(files_vdir, include, exclude, orphans)
 
-        result = vstagedir._import_files_internal(files_vdir, filter_callback=split_filter)
+        result = vstagedir._import_files_internal(files_vdir, filter_callback=filter_callback)
 
         owner._overlap_collector.collect_stage_result(self, result)
 
@@ -974,8 +979,9 @@ class Element(Plugin):
     #
     def _stage_dependency_artifacts(self, sandbox, scope, *, path=None, include=None, exclude=None, orphans=True):
         with self._overlap_collector.session(OverlapAction.WARNING, path):
-            for dep in self._dependencies(scope):
-                dep._stage_artifact(sandbox, path=path, include=include, exclude=exclude, orphans=orphans, owner=self)
+            self.__stage_dependencies(
+                sandbox, self._dependencies(scope), path=path, include=include, exclude=exclude, orphans=orphans
+            )
 
     # _new_from_load_element():
     #
@@ -1463,6 +1469,35 @@ class Element(Plugin):
         # Ensure deterministic owners of sources at build time
         vdirectory._set_deterministic_user()
 
+    # _stage_sources_read_only():
+    #
+    # Make the sources of this element available in a read-only directory
+    # which is backed by the CAS, see CASCache.stage_directory(). This is
+    # meant for loading junctioned subprojects.
+    #
+    # Returns:
+    #    (str): The path of the staged sources
+    #
+    # Raises:
+    #    CASCacheError: If the sources could not be staged
+    #
+    def _stage_sources_read_only(self):
+        cascache = self._get_context().get_cascache()
+        with self.timed_activity("Staging sources", silent_nested=True):
+            return cascache.stage_directory(self.__sources.get_files()._get_digest())
+
+    # _export_sources():
+    #
+    # Export the sources of this element to a directory. The files are
+    # copied, using reflinks where the filesystem supports them.
+    #
+    # Args:
+    #    directory (str): An empty directory to export the sources to
+    #
+    def _export_sources(self, directory):
+        with self.timed_activity("Staging sources", silent_nested=True):
+            self.__sources.get_files()._export_files(directory)
+
     # _set_required():
     #
     # Mark this element and its dependencies as required.
@@ -1618,7 +1653,7 @@ class Element(Plugin):
         if self._cached_failure() and not self.__assemble_done:
             with self._output_file() as output_file:
                 for log_path in self.__artifact.get_logs():
-                    with open(log_path, encoding="utf-8") as log_file:
+                    with utils._open_log(log_path) as log_file:
                         output_file.write(log_file.read())
 
             _, description, detail = self._get_build_result()
@@ -1744,6 +1779,15 @@ class Element(Plugin):
                 sandboxconfig=self.__sandbox_config,
             )
 
+        self.__job_stats = {"size": artifact_size}
+        sandbox_time = sandbox._get_execution_time()
+        if sandbox_time is not None:
+            self.__job_stats["sandbox-time"] = round(sandbox_time, 3)
+        peak_rss, cpu_time = sandbox._get_resource_usage()
+        if peak_rss is not None:
+            self.__job_stats["peak-rss"] = peak_rss
+            self.__job_stats["cpu-time"] = round(cpu_time, 3)
+
         if collect is not None and collectvdir is None:
             raise ElementError(
                 "Directory '{}' was not found inside the sandbox, "
@@ -1752,6 +1796,21 @@ class Element(Plugin):
 
         return artifact_size
 
+    # _get_job_stats()
+    #
+    # Take the statistics gathered by the latest job which processed
+    # this element, e.g. the size of the artifact produced by a build.
+    #
+    # This is called in the main process when a job completes, see
+    # the BuildStats object for the statistics which can be gathered.
+    #
+    # Returns:
+    #    (dict): The statistics, which may be empty
+    #
+    def _get_job_stats(self):
+        stats, self.__job_stats = self.__job_stats, {}
+        return stats
+
     # _fetch_done()
     #
     # Indicates that fetching the sources for this element has been done.
@@ -1821,21 +1880,9 @@ class Element(Plugin):
         pull_buildtrees = context.pull_buildtrees and not self._get_workspace()
 
         # First check whether we already have the strict artifact in the local cache
-        artifact = Artifact(
-            self,
-            context,
-            strict_key=self.__strict_cache_key,
-            strong_key=self.__strict_cache_key,
-            weak_key=self.__weak_cache_key,
-        )
+        artifact = self.__new_artifact(strict=True)
         artifact.query_cache()
-
-        self.__pull_pending = False
-        if not pull and not artifact.cached(buildtree=pull_buildtrees):
-            if self.__artifacts.has_fetch_remotes(plugin=self) and not self._get_workspace():
-                # Artifact is not completely available in cache and artifact remote server is available.
-                # Stop artifact loading here as pull is required to proceed.
-                self.__pull_pending = True
+        self.__update_pull_pending(artifact, pull=pull)
 
         # Attempt to pull artifact with the strict cache key
         pulled = pull and artifact.pull(pull_buildtrees=pull_buildtrees)
@@ -1847,7 +1894,7 @@ class Element(Plugin):
             return False
 
         # In non-strict mode retry with weak cache key
-        artifact = Artifact(self, context, strict_key=self.__strict_cache_key, weak_key=self.__weak_cache_key)
+        artifact = self.__new_artifact(strict=False)
         artifact.query_cache()
 
         # Attempt to pull artifact with the weak cache key
@@ -1856,9 +1903,61 @@ class Element(Plugin):
         self.__artifact = artifact
         return pulled
 
+    # _load_artifacts():
+    #
+    # Load the artifacts of several elements from the local cache, like
+    # calling `_load_artifact(pull=False)` for each of them, but checking
+    # the presence of all artifacts together, see Artifact.query_caches().
+    #
+    # `_load_artifact_done()` must be called for each element afterwards,
+    # unless a pull is pending.
+    #
+    # Args:
+    #    context (Context): The invocation context
+    #    elements (list): The elements to load the artifacts of
+    #    executor (Executor): An optional executor to query the cache in concurrently
+    #
+    @staticmethod
+    def _load_artifacts(context, elements, *, executor=None):
+        strict = context.get_strict()
+
+        # First check whether we already have the strict artifacts in the local cache
+        artifacts = [element.__new_artifact(strict=True) for element in elements]
+        Artifact.query_caches(context, artifacts, executor=executor)
+
+        retry = []
+        for element, artifact in zip(elements, artifacts):
+            element.__update_pull_pending(artifact, pull=False)
+            if artifact.cached() or strict:
+                element.__artifact = artifact
+            elif not element.__pull_pending:
+                retry.append(element)
+
+        # In non-strict mode retry with weak cache keys
+        artifacts = [element.__new_artifact(strict=False) for element in retry]
+        Artifact.query_caches(context, artifacts, executor=executor)
+
+        for element, artifact in zip(retry, artifacts):
+            element.__artifact = artifact
+
     def _query_source_cache(self):
         self.__sources.query_cache()
 
+    # _query_source_caches():
+    #
+    # Query the source cache for the sources of several elements at
+    # once, this is cheaper than calling _query_source_cache() for each
+    # element as identical sources are only checked once.
+    #
+    # Args:
+    #    context (Context): The invocation context
+    #    elements (list): The elements to query, their sources must be resolved
+    #    executor (Executor): An optional executor to query the cache in concurrently
+    #
+    @staticmethod
+    def _query_source_caches(context, elements, *, executor=None):
+        ElementSources.query_caches(context, [element.__sources for element in elements], executor=executor)
+
     def _skip_source_push(self):
         if not self.sources() or self._get_workspace():
             return True
@@ -1892,15 +1991,15 @@ class Element(Plugin):
 
         return False
 
-    # _push():
+    # _push_blobs():
     #
-    # Push locally cached artifact to remote artifact repository.
+    # Upload the blobs of the locally cached artifact to the storage
+    # remotes, the first stage of pushing the artifact, see _push().
     #
     # Returns:
-    #   (bool): True if the remote was updated, False if it already existed
-    #           and no updated was required
+    #   (bool): True if any remote was updated, False if no uploads were required
     #
-    def _push(self):
+    def _push_blobs(self):
         if not self._cached():
             raise ElementError("Push failed: {} is not cached".format(self.name))
 
@@ -1909,6 +2008,38 @@ class Element(Plugin):
         if not self._cached_buildtree() and self._buildtree_exists():
             raise ElementError("Push failed: buildtree of {} is not cached".format(self.name))
 
+        if self.__get_tainted():
+            return False
+
+        return self.__artifacts.push_blobs(self, self.__artifact)
+
+    # _push_blobs_done():
+    #
+    # Mark the blobs of the artifact as uploaded, such that the artifact
+    # can be published, see _push().
+    #
+    def _push_blobs_done(self):
+        self.__blobs_pushed = True
+
+    # _blobs_pushed():
+    #
+    # Returns:
+    #   (bool): Whether the blobs of the artifact were uploaded
+    #
+    def _blobs_pushed(self):
+        return self.__blobs_pushed
+
+    # _push():
+    #
+    # Push locally cached artifact to remote artifact repository, by
+    # publishing it on the index remotes once its blobs were uploaded,
+    # see _push_blobs().
+    #
+    # Returns:
+    #   (bool): True if the remote was updated, False if it already existed
+    #           and no updated was required
+    #
+    def _push(self):
         if self.__get_tainted():
             self.warn("Not pushing tainted artifact.")
             return False
@@ -2501,6 +2632,48 @@ class Element(Plugin):
             for dep in self._dependencies(_Scope.BUILD)
         ]
 
+    # __new_artifact()
+    #
+    # Create the Artifact to load from the cache, see _load_artifact().
+    #
+    # Args:
+    #    strict (bool): Whether to create the Artifact for the strict cache key,
+    #                   rather than for the weak cache key
+    #
+    # Returns:
+    #    (Artifact): The Artifact, its cache status needs to be queried
+    #
+    def __new_artifact(self, *, strict):
+        if strict:
+            return Artifact(
+                self,
+                self._get_context(),
+                strict_key=self.__strict_cache_key,
+                strong_key=self.__strict_cache_key,
+                weak_key=self.__weak_cache_key,
+            )
+
+        return Artifact(self, self._get_context(), strict_key=self.__strict_cache_key, weak_key=self.__weak_cache_key)
+
+    # __update_pull_pending()
+    #
+    # Determine whether a pull is required before the artifact loading
+    # can proceed, see _load_artifact().
+    #
+    # Args:
+    #    artifact (Artifact): The strict Artifact, with its cache status queried
+    #    pull (bool): Whether the artifact is going to be pulled right away
+    #
+    def __update_pull_pending(self, artifact, *, pull):
+        pull_buildtrees = self._get_context().pull_buildtrees and not self._get_workspace()
+
+        self.__pull_pending = False
+        if not pull and not artifact.cached(buildtree=pull_buildtrees):
+            if self.__artifacts.has_fetch_remotes(plugin=self) and not self._get_workspace():
+                # Artifact is not completely available in cache and artifact remote server is available.
+                # Stop artifact loading here as pull is required to proceed.
+                self.__pull_pending = True
+
     # __get_last_build_artifact()
     #
     # Return the Artifact of the previous build of this element,
@@ -2662,6 +2835,75 @@ class Element(Plugin):
         yield
         self._overlap_collector = None
 
+    # __stage_dependencies():
+    #
+    # Stage a list of dependency artifacts within the current overlap
+    # collector session.
+    #
+    # When staging into an empty directory, the resulting tree and the
+    # collected staging results are remembered in the session's StagingCache,
+    # such that other elements staging the same artifacts with the same split
+    # parameters can reuse the staged tree directly, and replay the staging
+    # results to report the same overlaps.
+    #
+    # Args:
+    #    sandbox: The build sandbox
+    #    dependencies (Iterable[Element]): The dependencies to stage, in staging order
+    #    path: An optional sandbox relative path
+    #    include: An optional list of domains to include files from
+    #    exclude: An optional list of domains to exclude files from
+    #    orphans: Whether to include files not spoken for by split domains
+    #
+    def __stage_dependencies(self, sandbox, dependencies, *, path, include, exclude, orphans):
+        dependencies = list(dependencies)
+
+        vbasedir = sandbox.get_virtual_directory()
+        vstagedir = vbasedir if path is None else vbasedir.open_directory(path.lstrip(os.sep), create=True)
+
+        # Anything which was already staged would affect the outcome
+        key = None
+        if len(vstagedir) == 0 and all(dep._cached() for dep in dependencies):
+            key = tuple(dep.__get_staging_key(include, exclude, orphans) for dep in dependencies)
+
+        staging_cache = self._get_context().get_staging_cache()
+        if key:
+            digest, results = staging_cache.lookup(key)
+            if digest is not None:
+                self.status("Staging {} dependencies from previously staged tree".format(len(dependencies)))
+                vstagedir._reset(digest=digest)
+                for dep, result in zip(dependencies, results):
+                    self._overlap_collector.collect_stage_result(dep, result)
+                return
+
+        results = [
+            dep._stage_artifact(sandbox, path=path, include=include, exclude=exclude, orphans=orphans, owner=self)
+            for dep in dependencies
+        ]
+
+        if key:
+            staging_cache.store(key, vstagedir._get_digest(), results)
+
+    # __get_staging_key():
+    #
+    # Args:
+    #    include: An optional list of domains to include files from
+    #    exclude: An optional list of domains to exclude files from
+    #    orphans: Whether to include files not spoken for by split domains
+    #
+    # Returns:
+    #    (tuple): A key identifying this cached artifact staged with the given split parameters
+    #
+    def __get_staging_key(self, include, exclude, orphans):
+        files_digest = self.__artifact.get_files_digest()
+        return (
+            self._get_full_name(),
+            self._get_cache_key(),
+            files_digest.hash if files_digest else None,
+            tuple(include or ()),
+            tuple(exclude or ()),
+            orphans,
+        )
+
     # __sandbox():
     #
     # A context manager to prepare a Sandbox object at the specified directory,
@@ -2993,49 +3235,37 @@ class Element(Plugin):
     def __init_splits(self):
         bstdata = self.get_public_data("bst")
         splits = bstdata.get_mapping("split-rules")
-        self.__splits = {
-            domain: re.compile(
-                "^(?:" + "|".join([utils._glob2re(r) for r in rules.as_str_list()]) + ")$", re.MULTILINE | re.DOTALL
-            )
-            for domain, rules in splits.items()
-        }
+        self.__split_rules = tuple((domain, tuple(rules.as_str_list())) for domain, rules in splits.items())
+        self.__splits = compile_split_rules(self.__split_rules)
 
-    # __split_filter():
+    # __split_filter_args():
     #
-    # Returns True if the file with the specified `path` is included in the
-    # specified split domains. This is used by `__split_filter_func()` to create
-    # a filter callback.
+    # Resolve the split domains to filter with.
     #
     # Args:
-    #    element_domains (list): All domains for this element
-    #    include (list): A list of domains to include files from
-    #    exclude (list): A list of domains to exclude files from
-    #    orphans (bool): Whether to include files not spoken for by split domains
-    #    path (str): The relative path of the file
+    #    include (list): An optional list of domains to include files from
+    #    exclude (list): An optional list of domains to exclude files from
     #
     # Returns:
-    #    (bool): Whether to include the specified file
+    #    (list): The domains to include files from
+    #    (list): The domains to exclude files from
     #
-    def __split_filter(self, element_domains, include, exclude, orphans, path):
-        # Absolute path is required for matching
-        filename = os.path.join(os.sep, path)
-
-        include_file = False
-        exclude_file = False
-        claimed_file = False
+    def __split_filter_args(self, include, exclude):
+        if not self.__splits:
+            self.__init_splits()
 
-        for domain in element_domains:
-            if self.__splits[domain].match(filename):
-                claimed_file = True
-                if domain in include:
-                    include_file = True
-                if domain in exclude:
-                    exclude_file = True
+        element_domains = list(self.__splits.keys())
+        if not include:
+            include = element_domains
+        if not exclude:
+            exclude = []
 
-        if orphans and not claimed_file:
-            include_file = True
+        # Ignore domains that dont apply to this element
+        #
+        include = [domain for domain in include if domain in element_domains]
+        exclude = [domain for domain in exclude if domain in element_domains]
 
-        return include_file and not exclude_file
+        return include, exclude
 
     # __split_filter_func():
     #
@@ -3043,6 +3273,7 @@ class Element(Plugin):
     # `link_files()` or `Directory.import_files()`.
     #
     # Args:
+    #    files_vdir (Directory): The artifact files which will be filtered
     #    include (list): An optional list of domains to include files from
     #    exclude (list): An optional list of domains to exclude files from
     #    orphans (bool): Whether to include files not spoken for by split domains
@@ -3051,44 +3282,80 @@ class Element(Plugin):
     #    (callable): Filter callback that returns True if the file is included
     #                in the specified split domains.
     #
-    def __split_filter_func(self, include=None, exclude=None, orphans=True):
+    def __split_filter_func(self, files_vdir, include=None, exclude=None, orphans=True):
         # No splitting requested, no filter needed
         if orphans and not (include or exclude):
             return None
 
-        if not self.__splits:
-            self.__init_splits()
+        include, exclude = self.__split_filter_args(include, exclude)
 
-        element_domains = list(self.__splits.keys())
-        if not include:
-            include = element_domains
-        if not exclude:
-            exclude = []
+        included = self.__split_paths_in_process_pool(files_vdir, include, exclude, orphans)
+        if included is not None:
+            return set(included).__contains__
 
-        # Ignore domains that dont apply to this element
-        #
-        include = [domain for domain in include if domain in element_domains]
-        exclude = [domain for domain in exclude if domain in element_domains]
+        # The arguments splits, include, exclude, and orphans are the same
+        # for all files. Use `partial` to create a function with the required
+        # callback signature: a single `path` parameter.
+        return partial(split_filter, self.__splits, include, exclude, orphans)
+
+    # __split_paths_in_process_pool():
+    #
+    # List the paths of the artifact files which are included in the
+    # specified split domains in the scheduler's process pool, if it runs
+    # one. The worker walks the tree in the CAS and matches the paths, the
+    # scheduling process only receives the result.
+    #
+    # Args:
+    #    files_vdir (Directory): The artifact files which will be filtered
+    #    include (list): The domains to include files from
+    #    exclude (list): The domains to exclude files from
+    #    orphans (bool): Whether to include files not spoken for by split domains
+    #
+    # The worker reads the Directory objects from the local CAS directly,
+    # they are fetched first if they may only be in the remote cache.
+    #
+    # Returns:
+    #    (list): The included paths, or None if there is no process pool
+    #            or the worker failed, in which case the caller filters the
+    #            paths itself
+    #
+    def __split_paths_in_process_pool(self, files_vdir, include, exclude, orphans):
+        process_pool = self._get_context().get_process_pool()
+        if not process_pool:
+            return None
 
-        # The arguments element_domains, include, exclude, and orphans are
-        # the same for all files. Use `partial` to create a function with
-        # the required callback signature: a single `path` parameter.
-        return partial(self.__split_filter, element_domains, include, exclude, orphans)
+        cascache = self._get_context().get_cascache()
+        digest = files_vdir._get_digest()
+        try:
+            cascache._ensure_directory_protos(digest)
+            future = process_pool.submit(
+                list_split_paths, cascache.casdir, digest.hash, self.__split_rules, include, exclude, orphans
+            )
+            return future.result()
+        except Exception:  # pylint: disable=broad-except
+            # Missing objects, a broken pool or any other worker failure
+            # is handled by filtering in this process instead
+            return None
 
     def __compute_splits(self, include=None, exclude=None, orphans=True):
-        filter_func = self.__split_filter_func(include=include, exclude=exclude, orphans=orphans)
-
         files_vdir = self.__artifact.get_files()
 
-        element_files = files_vdir.list_relative_paths()
-
-        if not filter_func:
+        if orphans and not (include or exclude):
             # No splitting requested, just report complete artifact
-            yield from element_files
-        else:
-            for filename in element_files:
-                if filter_func(filename):
-                    yield filename
+            yield from files_vdir.list_relative_paths()
+            return
+
+        include, exclude = self.__split_filter_args(include, exclude)
+
+        included = self.__split_paths_in_process_pool(files_vdir, include, exclude, orphans)
+        if included is not None:
+            yield from included
+            return
+
+        filter_func = partial(split_filter, self.__splits, include, exclude, orphans)
+        for filename in files_vdir.list_relative_paths():
+            if filter_func(filename):
+                yield filename
 
     # __load_public_data():
     #
@@ -0,0 +1,142 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import os
+import subprocess
+import time
+
+import psutil
+
+# The interval at which wait() polls for the process to exit, like
+# subprocess.Popen.wait() does at most when given a timeout
+_WAIT_INTERVAL = 0.05
+
+
+# ProcessTreeMonitor()
+#
+# Samples the memory and CPU usage of a process and all of its
+# descendants, e.g. of a sandboxed build.
+#
+# The CPU time of descendants which already exited is accounted for
+# once their parent waited for them, the CPU time is therefore never
+# decreasing, but may lag behind for processes which were not waited
+# for yet. The final usage of the tree is taken from the resource usage
+# of the root process when reaping it with wait().
+#
+# Args:
+#    pid (int): The process identifier of the root of the tree
+#
+class ProcessTreeMonitor:
+    def __init__(self, pid: int):
+        self._process = psutil.Process(pid)
+        self._last_sample_time = time.monotonic()
+
+        self.rss = 0  # Current resident set size of the tree, in bytes
+        self.peak_rss = 0  # Peak resident set size of the tree, in bytes
+        self.cpu_time = 0.0  # CPU time consumed by the tree, in seconds
+        self.cpu_percent = 0.0  # CPU usage since the previous sample, 100 per fully used processor
+        self.measured = False  # Whether the usage was sampled at least once
+
+    # sample()
+    #
+    # Sample the current usage of the process tree.
+    #
+    # Returns:
+    #    (bool): False if the root process no longer exists
+    #
+    def sample(self) -> bool:
+        try:
+            processes = [self._process] + self._process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return False
+
+        rss = 0
+        cpu_time = 0.0
+        for process in processes:
+            try:
+                with process.oneshot():
+                    rss += process.memory_info().rss
+                    times = process.cpu_times()
+                    cpu_time += times.user + times.system + times.children_user + times.children_system
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                # The process exited while sampling, or is not ours to inspect
+                continue
+
+        now = time.monotonic()
+        elapsed = now - self._last_sample_time
+        cpu_time = max(cpu_time, self.cpu_time)
+        if elapsed > 0:
+            self.cpu_percent = 100 * (cpu_time - self.cpu_time) / elapsed
+
+        self._last_sample_time = now
+        self.rss = rss
+        self.peak_rss = max(self.peak_rss, rss)
+        self.cpu_time = cpu_time
+        self.measured = True
+
+        return True
+
+    # wait()
+    #
+    # Wait for the root process to exit, like subprocess.Popen.wait(),
+    # and account for the final usage of the tree.
+    #
+    # Commands which exit before they could be sampled, and the last
+    # interval of longer running commands, are accounted for using the
+    # resource usage which the kernel reports when reaping the process.
+    # This covers the CPU time of the process and all of its descendants
+    # which were waited for, and the peak memory of the largest of them.
+    #
+    # Args:
+    #    process (subprocess.Popen): The root process
+    #    timeout (float): The number of seconds to wait
+    #
+    # Returns:
+    #    (int): The return code of the process
+    #
+    # Raises:
+    #    (subprocess.TimeoutExpired): If the process did not exit in time
+    #
+    def wait(self, process: subprocess.Popen, timeout: float) -> int:
+        if not hasattr(os, "waitid") or process.returncode is not None:
+            return process.wait(timeout=timeout)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                # Check whether the process exited, leaving it to be reaped below
+                exited = os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+            except ChildProcessError:
+                # Reaped elsewhere, e.g. when it was killed
+                return process.wait(timeout=timeout)
+
+            if exited is not None:
+                break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(process.args, timeout)
+            time.sleep(min(remaining, _WAIT_INTERVAL))
+
+        _, status, rusage = os.wait4(process.pid, 0)
+        if os.WIFSIGNALED(status):
+            process.returncode = -os.WTERMSIG(status)
+        else:
+            process.returncode = os.WEXITSTATUS(status)
+
+        # The maximum resident set size is reported in KiB
+        self.peak_rss = max(self.peak_rss, rusage.ru_maxrss * 1024)
+        self.cpu_time = max(self.cpu_time, rusage.ru_utime + rusage.ru_stime)
+        self.measured = True
+
+        return process.returncode
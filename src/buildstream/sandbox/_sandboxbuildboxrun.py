@@ -26,6 +26,8 @@ from . import _SandboxFlags
 from .._exceptions import SandboxError
 from .._platform import Platform
 from .._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
+from .._jobserver import JOBSERVER_SANDBOX_PATH
+from ._resourceusage import ProcessTreeMonitor
 from ._sandboxreapi import SandboxREAPI
 
 
@@ -87,6 +89,19 @@ class SandboxBuildBoxRun(SandboxREAPI):
         cascache = context.get_cascache()
         casd_process_manager = cascache.get_casd_process_manager()
 
+        # Reuse the result of an identical action which ran before, if enabled
+        action_cache = self._get_local_action_cache(flags)
+        if action_cache:
+            action_digest = cascache.add_object(buffer=action.SerializeToString())
+            action_result = action_cache.get(action_digest)
+            if action_result:
+                context.messenger.info(
+                    "Action result found in local action cache", element_name=self._get_element_name()
+                )
+                # Nothing was executed in this session
+                action_result.ClearField("execution_metadata")
+                return action_result
+
         with utils._tempnamedfile() as action_file, utils._tempnamedfile() as result_file:
             action_file.write(action.SerializeToString())
             action_file.flush()
@@ -117,6 +132,10 @@ class SandboxBuildBoxRun(SandboxREAPI):
 
                 buildbox_command.append("--bind-mount={}:{}".format(mount_source, mount_point))
 
+            jobserver = self._get_jobserver(flags)
+            if jobserver:
+                buildbox_command.append("--bind-mount={}:{}".format(jobserver.path, JOBSERVER_SANDBOX_PATH))
+
             # If we're interactive, we want to inherit our stdin,
             # otherwise redirect to /dev/null, ensuring process
             # disconnected from terminal.
@@ -138,7 +157,41 @@ class SandboxBuildBoxRun(SandboxREAPI):
                 interactive=(flags & _SandboxFlags.INTERACTIVE),
             )
 
-            return remote_execution_pb2.ActionResult().FromString(result_file.read())
+            action_result = remote_execution_pb2.ActionResult().FromString(result_file.read())
+
+        if action_cache:
+            action_cache.update(action_digest, action_result)
+
+        return action_result
+
+    # _get_local_action_cache()
+    #
+    # Get the local action cache for a command, commands which depend on
+    # more than their action, i.e. interactive commands, commands with
+    # network access and commands with host files mounted, are not cached.
+    #
+    # Args:
+    #    flags (_SandboxFlags): The flags of the command to run
+    #
+    # Returns:
+    #    (LocalActionCache): The local action cache, or None
+    #
+    def _get_local_action_cache(self, flags):
+        if flags & (_SandboxFlags.INTERACTIVE | _SandboxFlags.NETWORK_ENABLED):
+            return None
+
+        mount_sources = self._get_mount_sources()
+        if any(mount_point in mount_sources for mount_point in self._get_marked_directories()):
+            return None
+
+        return self._get_context().get_local_action_cache()
+
+    def _get_jobserver(self, flags):
+        # The jobserver is only meant for builds, not interactive shells
+        if "bind-mount" not in self._capabilities or flags & _SandboxFlags.INTERACTIVE:
+            return None
+
+        return self._get_context().get_jobserver()
 
     def _run_buildbox(self, argv, stdin, stdout, stderr, *, interactive):
         def kill_proc():
@@ -184,6 +237,11 @@ class SandboxBuildBoxRun(SandboxREAPI):
                 start_new_session=new_session,
             )
 
+            # Account for the resource usage of the sandboxed process tree
+            messenger = self._get_context().messenger
+            monitor = ProcessTreeMonitor(process.pid)
+            stack.callback(self._account_resource_usage, monitor)
+
             # Wait for the child process to finish, ensuring that
             # a SIGINT has exactly the effect the user probably
             # expects (i.e. let the child process handle it).
@@ -197,13 +255,15 @@ class SandboxBuildBoxRun(SandboxREAPI):
                         # shutdown, or kill the process.
                         # We therefore loop with a timeout, to ensure the python process
                         # can act if it needs.
-                        returncode = process.wait(timeout=1)
+                        returncode = monitor.wait(process, timeout=1)
                         # If the process exits due to a signal, we
                         # brutally murder it to avoid zombies
                         if returncode < 0:
                             utils._kill_process_tree(process.pid)
 
                     except subprocess.TimeoutExpired:
+                        if monitor.sample():
+                            messenger.report_resource_usage(monitor.rss, monitor.cpu_percent)
                         continue
 
                     # Unlike in the bwrap case, here only the main
@@ -224,5 +284,12 @@ class SandboxBuildBoxRun(SandboxREAPI):
             if returncode != 0:
                 raise SandboxError("buildbox-run failed with returncode {}".format(returncode))
 
+    # Accumulate the usage of a finished process tree, and clear the
+    # live usage reported for the task
+    def _account_resource_usage(self, monitor):
+        self._get_context().messenger.report_resource_usage(None, None)
+        if monitor.measured:
+            self._add_resource_usage(monitor.peak_rss, monitor.cpu_time)
+
     def _supported_platform_properties(self):
         return {"OSFamily", "ISA", "unixUID", "unixGID", "network"}
@@ -20,6 +20,7 @@ from .sandbox import Sandbox, _SandboxFlags, SandboxCommandError, _SandboxBatch
 from .. import utils
 from .._exceptions import ImplError, SandboxError
 from .._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
+from .._jobserver import JOBSERVER_SANDBOX_PATH
 
 
 # SandboxREAPI()
@@ -85,6 +86,19 @@ class SandboxREAPI(Sandbox):
                 if flags & _SandboxFlags.ROOT_READ_ONLY:
                     marked_vdir._set_subtree_read_only(False)
 
+        # Make the jobserver shared between builds available, if any
+        jobserver = self._get_jobserver(flags)
+        if jobserver:
+            makeflags = jobserver.get_makeflags(env.get("MAKEFLAGS"))
+            if makeflags:
+                env = dict(env, MAKEFLAGS=makeflags)
+
+            # Create the mount point for the jobserver FIFO
+            split_mount_point = JOBSERVER_SANDBOX_PATH.lstrip(os.path.sep).rsplit(os.path.sep, 1)
+            parent_vdir = vdir.open_directory(split_mount_point[0], create=True)
+            if not parent_vdir.exists(split_mount_point[1]):
+                parent_vdir._create_empty_file(split_mount_point[1])
+
         if flags & _SandboxFlags.ROOT_READ_ONLY:
             vdir._set_subtree_read_only(True)
         else:
@@ -99,6 +113,15 @@ class SandboxREAPI(Sandbox):
 
         action_result = self._execute_action(action, flags)  # pylint: disable=assignment-from-no-return
 
+        # Accumulate the execution time of all commands run in the sandbox
+        metadata = action_result.execution_metadata
+        if metadata.HasField("execution_start_timestamp") and metadata.HasField("execution_completed_timestamp"):
+            execution_time = (
+                metadata.execution_completed_timestamp.ToNanoseconds()
+                - metadata.execution_start_timestamp.ToNanoseconds()
+            ) / 1e9
+            self._execution_time = (self._execution_time or 0.0) + execution_time
+
         # Get output of build
         self._process_job_output(
             cwd, action_result.output_directories, action_result.output_files, failure=action_result.exit_code != 0
@@ -194,6 +217,21 @@ class SandboxREAPI(Sandbox):
     def _create_batch(self, main_group, flags, *, collect=None):
         return _SandboxREAPIBatch(self, main_group, flags, collect=collect)
 
+    # _get_jobserver()
+    #
+    # Get the jobserver which commands should use, sandbox implementations
+    # which are able to make the jobserver FIFO available at JOBSERVER_SANDBOX_PATH
+    # should override this.
+    #
+    # Args:
+    #    flags (_SandboxFlags): The flags of the command to run
+    #
+    # Returns:
+    #    (JobServer): The jobserver, or None
+    #
+    def _get_jobserver(self, flags):
+        return None
+
     def _execute_action(self, action, flags):
         raise ImplError("Sandbox of type '{}' does not implement _execute_action()".format(type(self).__name__))
 
@@ -18,12 +18,14 @@
 #        Jim MacArthur <jim.macarthur@codethink.co.uk>
 
 import shutil
+import threading
+import time
 from functools import partial
 
 import grpc
 
 from ._sandboxreapi import SandboxREAPI
-from .. import _signals
+from .. import _signals, utils
 from .._protos.build.bazel.remote.execution.v2 import remote_execution_pb2, remote_execution_pb2_grpc
 from .._protos.google.rpc import code_pb2
 from .._exceptions import BstError, SandboxError
@@ -31,6 +33,46 @@ from .._protos.google.longrunning import operations_pb2, operations_pb2_grpc
 from .._cas import CASRemote
 
 
+# How often to resume waiting for an operation after losing the connection
+# to the execution server, without receiving any update in between
+_MAX_RECONNECTS = 5
+
+# How often to check for termination while waiting for the execution server
+_WAIT_INTERVAL = 0.1
+
+
+# _wait_for_channel()
+#
+# Wait for a channel to be ready again after losing the connection.
+#
+# This waits in short intervals rather than blocking the thread for the
+# whole duration, such that the job can still be terminated while waiting.
+#
+# Args:
+#    channel (grpc.Channel): The channel to wait for
+#    timeout (float): The maximum time to wait, in seconds
+#
+# Returns:
+#    (bool): True if the channel is ready, False if the wait timed out
+#
+def _wait_for_channel(channel, timeout):
+    ready = threading.Event()
+
+    def on_connectivity_change(connectivity):
+        if connectivity == grpc.ChannelConnectivity.READY:
+            ready.set()
+
+    channel.subscribe(on_connectivity_change, try_to_connect=True)
+    try:
+        deadline = time.monotonic() + timeout
+        while not ready.wait(_WAIT_INTERVAL):
+            if time.monotonic() >= deadline:
+                return False
+        return True
+    finally:
+        channel.unsubscribe(on_connectivity_change)
+
+
 # SandboxRemote()
 #
 # This isn't really a sandbox, it's a stub which sends all the sources and build
@@ -69,6 +111,11 @@ class SandboxRemote(SandboxREAPI):
         # Sends an execution request to the remote execution server.
         #
         # This function blocks until it gets a response from the server.
+        #
+        # If the connection is lost while an operation is running, waiting
+        # for the operation is resumed with WaitExecution once the channel
+        # reconnected.
+        reconnects = 0
 
         # Try to create a communication channel to the BuildGrid server.
         stub = remote_execution_pb2_grpc.ExecutionStub(channel)
@@ -77,8 +124,9 @@ class SandboxRemote(SandboxREAPI):
         )
 
         def __run_remote_command(stub, execute_request=None, running_operation=None):
+            nonlocal reconnects
+            last_operation = None
             try:
-                last_operation = None
                 if execute_request is not None:
                     operation_iterator = stub.Execute(execute_request)
                 else:
@@ -86,6 +134,7 @@ class SandboxRemote(SandboxREAPI):
                     operation_iterator = stub.WaitExecution(request)
 
                 for operation in operation_iterator:
+                    reconnects = 0
                     if not self.operation_name:
                         self.operation_name = operation.name
                     if operation.done:
@@ -96,6 +145,13 @@ class SandboxRemote(SandboxREAPI):
             except grpc.RpcError as e:
                 status_code = e.code()
 
+                known_operation = last_operation or running_operation
+                if status_code == grpc.StatusCode.UNAVAILABLE and known_operation and reconnects < _MAX_RECONNECTS:
+                    # Give the channel some time to reconnect before resuming
+                    reconnects += 1
+                    _wait_for_channel(channel, reconnects)
+                    return known_operation
+
                 if status_code in (
                     grpc.StatusCode.INVALID_ARGUMENT,
                     grpc.StatusCode.FAILED_PRECONDITION,
@@ -183,9 +239,12 @@ class SandboxRemote(SandboxREAPI):
                 "Uploading input root", element_name=self._get_element_name()
             ):
                 # Determine blobs missing on remote
+                upload_stats = {}
                 try:
                     input_root_digest = action.input_root_digest
-                    missing_blobs = list(cascache.missing_blobs_for_directory(input_root_digest, remote=casremote))
+                    missing_blobs = list(
+                        cascache.missing_blobs_for_directory(input_root_digest, remote=casremote, stats=upload_stats)
+                    )
                 except grpc.RpcError as e:
                     raise SandboxError("Failed to determine missing blobs: {}".format(e)) from e
 
@@ -208,11 +267,24 @@ class SandboxRemote(SandboxREAPI):
                 except grpc.RpcError as e:
                     raise SandboxError("Failed to push source directory to remote: {}".format(e)) from e
 
+                # The whole input tree is now present on the remote, later actions
+                # sharing subtrees with it need not query them again
+                cascache.mark_directory_present(input_root_digest, remote=casremote)
+
+            self._get_context().messenger.info(
+                "Uploaded {} blobs ({}) of the input root".format(
+                    len(missing_blobs), utils._pretty_size(sum(digest.size_bytes for digest in missing_blobs))
+                ),
+                detail="Queried {} blobs in {} requests, skipped {} subtrees known to be present".format(
+                    upload_stats.get("queried", 0), upload_stats.get("requests", 0), upload_stats.get("pruned", 0)
+                ),
+                element_name=self._get_element_name(),
+            )
+
             # Now request to execute the action
-            channel = self.exec_spec.open_channel()
-            with channel:
-                operation = self.run_remote_command(channel, action_digest)
-                action_result = self._extract_action_result(operation)
+            channel = context.get_remote_channel(self.exec_spec)
+            operation = self.run_remote_command(channel, action_digest)
+            action_result = self._extract_action_result(operation)
 
         # Fetch outputs
         for output_directory in action_result.output_directories:
@@ -250,22 +322,21 @@ class SandboxRemote(SandboxREAPI):
         if not self.action_spec:
             return None
 
-        channel = self.action_spec.open_channel()
-        with channel:
-            request = remote_execution_pb2.GetActionResultRequest(
-                instance_name=self.action_spec.instance_name, action_digest=action_digest
-            )
-            stub = remote_execution_pb2_grpc.ActionCacheStub(channel)
-            try:
-                result = stub.GetActionResult(request)
-            except grpc.RpcError as e:
-                if e.code() != grpc.StatusCode.NOT_FOUND:
-                    raise SandboxError("Failed to query action cache: {} ({})".format(e.code(), e.details()))
-                return None
-            else:
-                context = self._get_context()
-                context.messenger.info("Action result found in action cache", element_name=self._get_element_name())
-                return result
+        context = self._get_context()
+        channel = context.get_remote_channel(self.action_spec)
+        request = remote_execution_pb2.GetActionResultRequest(
+            instance_name=self.action_spec.instance_name, action_digest=action_digest
+        )
+        stub = remote_execution_pb2_grpc.ActionCacheStub(channel)
+        try:
+            result = stub.GetActionResult(request)
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.NOT_FOUND:
+                raise SandboxError("Failed to query action cache: {} ({})".format(e.code(), e.details()))
+            return None
+        else:
+            context.messenger.info("Action result found in action cache", element_name=self._get_element_name())
+            return result
 
     @staticmethod
     def _extract_action_result(operation):
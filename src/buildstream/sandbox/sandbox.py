@@ -98,6 +98,9 @@ class Sandbox:
         self._build_directory_always = None
         self._vdir = None  # type: Optional[Directory]
         self._usebuildtree = False
+        self._execution_time = None  # type: Optional[float]
+        self._peak_rss = None  # type: Optional[int]
+        self._cpu_time = None  # type: Optional[float]
 
         # Pending command batch
         self.__batch = None
@@ -556,6 +559,42 @@ class Sandbox:
         self._build_directory = directory
         self._build_directory_always = always
 
+    # _get_execution_time()
+    #
+    # Get the time spent executing commands, as reported in the execution
+    # metadata of the sandbox implementation.
+    #
+    # Returns:
+    #    (float): The execution time in seconds, or None if not reported
+    #
+    def _get_execution_time(self):
+        return self._execution_time
+
+    # _add_resource_usage()
+    #
+    # Account for the resource usage of a command which finished
+    # running in the sandbox, for sandbox implementations which are
+    # able to measure it.
+    #
+    # Args:
+    #    peak_rss (int): The peak resident set size of the command, in bytes
+    #    cpu_time (float): The CPU time consumed by the command, in seconds
+    #
+    def _add_resource_usage(self, peak_rss, cpu_time):
+        self._peak_rss = max(self._peak_rss or 0, peak_rss)
+        self._cpu_time = (self._cpu_time or 0.0) + cpu_time
+
+    # _get_resource_usage()
+    #
+    # Get the resource usage of the commands which ran in the sandbox.
+    #
+    # Returns:
+    #    (int): The peak resident set size in bytes, or None if not measured
+    #    (float): The consumed CPU time in seconds, or None if not measured
+    #
+    def _get_resource_usage(self):
+        return self._peak_rss, self._cpu_time
+
 
 # SandboxFlags()
 #
@@ -387,12 +387,14 @@ class CasBasedDirectory(Directory):
 
         return result
 
-    def _export_files(self, to_directory: str, *, can_link: bool = False, can_destroy: bool = False) -> None:
+    def _export_files(self, to_directory: str, *, can_link: bool = False, can_destroy: bool = False) -> FileListResult:
         #
         # This is documented to raise DirectoryError, if we are raising a system error
         # or an error from CAS, it is a bug and we should catch/re-raise from here.
         #
-        self.__cas_cache.checkout(to_directory, self._get_digest(), can_link=can_link)
+        result = FileListResult()
+        self.__cas_cache.checkout(to_directory, self._get_digest(), can_link=can_link, result=result)
+        return result
 
     # We don't store UID/GID in CAS presently, so this can be ignored.
     def _set_deterministic_user(self) -> None:
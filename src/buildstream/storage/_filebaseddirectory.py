@@ -285,22 +285,22 @@ class FileBasedDirectory(Directory):
 
         return import_result
 
-    def _export_files(self, to_directory: str, *, can_link: bool = False, can_destroy: bool = False) -> None:
+    def _export_files(self, to_directory: str, *, can_link: bool = False, can_destroy: bool = False) -> FileListResult:
         if can_destroy:
             # Try a simple rename of the sandbox root; if that
             # doesnt cut it, then do the regular link files code path
             try:
                 os.rename(self.__external_directory, to_directory)
-                return
+                return FileListResult()
             except OSError:
                 # Proceed using normal link/copy
                 pass
 
         os.makedirs(to_directory, exist_ok=True)
         if can_link:
-            utils.link_files(self.__external_directory, to_directory)
+            return utils.link_files(self.__external_directory, to_directory)
         else:
-            utils.copy_files(self.__external_directory, to_directory)
+            return utils.copy_files(self.__external_directory, to_directory)
 
     def _set_deterministic_user(self) -> None:
         utils._set_deterministic_user(self.__external_directory)
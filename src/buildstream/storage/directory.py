@@ -453,10 +453,14 @@ class Directory:
     #    can_destroy: Can we destroy the data already in this directory when exporting? If set,
     #                 this may allow data to be moved rather than copied which will be quicker.
     #
+    # Returns:
+    #    A FileListResult, recording which copy strategies were used for files
+    #    which could not be linked or moved.
+    #
     # Raises:
     #    DirectoryError: if any system error occurs.
     #
-    def _export_files(self, to_directory: str, *, can_link: bool = False, can_destroy: bool = False) -> None:
+    def _export_files(self, to_directory: str, *, can_link: bool = False, can_destroy: bool = False) -> FileListResult:
         raise NotImplementedError()
 
     # _get_underlying_path()
@@ -28,6 +28,8 @@ Utilities
 
 import calendar
 import errno
+import fcntl
+import gzip
 import hashlib
 import math
 import os
@@ -44,7 +46,7 @@ import datetime
 import itertools
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Callable, IO, Iterable, Iterator, Optional, Tuple, Union
+from typing import Callable, Dict, IO, Iterable, Iterator, Optional, Set, Tuple, Union
 from dateutil import parser as dateutil_parser
 from google.protobuf import timestamp_pb2
 
@@ -66,6 +68,18 @@ BST_ARBITRARY_TIMESTAMP = calendar.timegm((2011, 11, 11, 11, 11, 11))
 _ALIAS_SEPARATOR = ":"
 _URI_SCHEMES = ["http", "https", "ftp", "file", "git", "sftp", "ssh"]
 
+# The ioctl() request number for FICLONE, from linux/fs.h
+_FICLONE = 0x40049409
+
+# Errors raised by FICLONE or copy_file_range() which indicate that the
+# strategy is not supported for a given pair of files, rather than a
+# genuine failure to copy
+_COPY_UNSUPPORTED_ERRNOS = (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EPERM)
+
+# Copy strategies which were found to be unsupported, keyed by
+# (source device, destination device)
+_COPY_UNSUPPORTED_STRATEGIES = {}  # type: Dict[Tuple[int, int], Set[str]]
+
 # The process's file mode creation mask.
 # Impossible to retrieve without temporarily changing it on POSIX.
 _UMASK = os.umask(0o777)
@@ -119,6 +133,29 @@ class FileListResult:
         self.files_written = []
         """List of files that were written."""
 
+        # Number of files which were written with each copy strategy,
+        # see _copy_file_data()
+        self._copy_strategies = {}  # type: Dict[str, int]
+
+    # _record_copy_strategy()
+    #
+    # Args:
+    #    strategy (str): The copy strategy used to write a file
+    #
+    def _record_copy_strategy(self, strategy: str) -> None:
+        self._copy_strategies[strategy] = self._copy_strategies.get(strategy, 0) + 1
+
+    # _describe_copy_strategies()
+    #
+    # Returns:
+    #    (str): A human readable summary of the copy strategies used, or
+    #           an empty string if no files were copied
+    #
+    def _describe_copy_strategies(self) -> str:
+        return ", ".join(
+            "{} {}".format(count, strategy) for strategy, count in sorted(self._copy_strategies.items())
+        )
+
 
 def _make_timestamp(timepoint: float) -> str:
     """Obtain the ISO 8601 timestamp represented by the time given in seconds.
@@ -382,10 +419,13 @@ def safe_copy(src: str, dest: str, *, copystat: bool = True, result: Optional[Fi
             raise UtilError("Failed to remove destination file '{}': {}".format(dest, e)) from e
 
     try:
-        shutil.copyfile(src, dest)
+        strategy = _copy_file_data(src, dest)
     except (OSError, shutil.Error) as e:
         raise UtilError("Failed to copy '{} -> {}': {}".format(src, dest, e)) from e
 
+    if result:
+        result._record_copy_strategy(strategy)
+
     if copystat:
         try:
             shutil.copystat(src, dest)
@@ -428,7 +468,7 @@ def safe_link(src: str, dest: str, *, result: Optional[FileListResult] = None, _
             # Target exists already, unlink and try again
             safe_link(src, dest, result=result, _unlink=True)
         elif e.errno in (errno.EXDEV, errno.EPERM):
-            safe_copy(src, dest)
+            safe_copy(src, dest, result=result)
         else:
             raise UtilError("Failed to link '{} -> {}': {}".format(src, dest, e)) from e
 
@@ -502,6 +542,12 @@ def copy_files(
        case the path will be reported in the return value.
 
        UNIX domain socket files from `src` are ignored.
+
+    .. note::
+
+       Where the filesystem supports it, file data is shared with `src`
+       using reflinks or copied in kernel space rather than being read
+       and written through userspace.
     """
     result = FileListResult()
     try:
@@ -1089,6 +1135,65 @@ def _process_list(
         os.chmod(d, perms)
 
 
+# _copy_file_data()
+#
+# Copy the data of a regular file using the cheapest strategy the
+# underlying filesystems support, in order of preference:
+#
+#   "reflink":         Share the extents of `src` with FICLONE (btrfs, XFS)
+#   "copy_file_range": Copy in kernel space with os.copy_file_range()
+#   "copy":            Fall back to shutil.copyfile()
+#
+# Strategies which fail as unsupported are remembered per pair of devices,
+# so that they are not attempted again for every file.
+#
+# Args:
+#    src (str): The source filename
+#    dest (str): The destination filename, will be created or truncated
+#
+# Returns:
+#    (str): The strategy which was used to copy the file
+#
+# Raises:
+#    (OSError): In the case of unexpected system call failures
+#
+def _copy_file_data(src, dest):
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+        src_stat = os.fstat(fsrc.fileno())
+        devices = (src_stat.st_dev, os.fstat(fdest.fileno()).st_dev)
+        unsupported = _COPY_UNSUPPORTED_STRATEGIES.setdefault(devices, set())
+
+        if "reflink" not in unsupported:
+            try:
+                fcntl.ioctl(fdest.fileno(), _FICLONE, fsrc.fileno())
+                return "reflink"
+            except OSError as e:
+                if e.errno not in _COPY_UNSUPPORTED_ERRNOS:
+                    raise
+                unsupported.add("reflink")
+
+        if hasattr(os, "copy_file_range") and "copy_file_range" not in unsupported:
+            try:
+                remaining = src_stat.st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdest.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+
+                # Files which report a misleading size (e.g. in /proc) may
+                # have more data, let shutil take care of what is left.
+                if remaining == 0 and not fsrc.read(1):
+                    return "copy_file_range"
+            except OSError as e:
+                if e.errno not in _COPY_UNSUPPORTED_ERRNOS:
+                    raise
+                unsupported.add("copy_file_range")
+
+    shutil.copyfile(src, dest)
+    return "copy"
+
+
 # _set_deterministic_user()
 #
 # Set the uid/gid for every file in a directory tree to the process'
@@ -1281,6 +1386,27 @@ def _tempnamedfile_name(dir):  # pylint: disable=redefined-builtin
             rm_tempfile()
 
 
+# _open_log()
+#
+# Open a build log for reading, build logs stored in artifacts are
+# compressed with gzip when the `compress-artifact-logs` user configuration
+# is enabled, and are decompressed transparently.
+#
+# Args:
+#    filename (str): The log file to open
+#
+# Returns:
+#    (TextIO): The opened log file, in text mode
+#
+def _open_log(filename):
+    with open(filename, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+
+    if compressed:
+        return gzip.open(filename, "rt", encoding="utf-8")
+    return open(filename, "r", encoding="utf-8")  # pylint: disable=consider-using-with
+
+
 # _kill_process_tree()
 #
 # Brutally murder a process and all of its children
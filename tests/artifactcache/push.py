@@ -2,10 +2,13 @@
 # pylint: disable=redefined-outer-name
 
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
-from buildstream import _yaml
+from buildstream import _artifactcache, _yaml
+from buildstream._exceptions import CASRemoteError
 from buildstream._project import Project
 from buildstream._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
 from buildstream._testing import cli  # pylint: disable=unused-import
@@ -42,6 +45,8 @@ def _push(cli, cache_dir, project_dir, config_file, target):
         element._load_artifact(pull=False)
 
         assert artifactcache.has_push_remotes(plugin=element), "No remote configured for element target.bst"
+        assert element._push_blobs(), "Upload operation failed"
+        element._push_blobs_done()
         assert element._push(), "Push operation failed"
 
     return element_key
@@ -170,3 +175,69 @@ def test_push_message(tmpdir, datafiles):
         assert message_hash and message_size
         message_digest = remote_execution_pb2.Digest(hash=message_hash, size_bytes=message_size)
         assert share.has_object(message_digest)
+
+
+# A stand-in for the CASCache, recording the uploads
+class _UploadRecorder:
+    def __init__(self, error=None):
+        self.uploads = []
+        self._error = error
+
+    def send_blobs(self, remote, digests):
+        self.uploads.append(sorted(digest.hash for digest in digests))
+        if self._error:
+            raise self._error
+
+
+# Start an upload of the batcher in the executor, and wait for its blobs
+# to be added to the open batch
+def _start_upload(executor, batcher, digests, batch_size):
+    future = executor.submit(batcher.upload, digests)
+    while batcher._batch is None or batcher._batch.size < batch_size:
+        assert not future.done()
+        time.sleep(0.01)
+    return future
+
+
+def _digests(names):
+    return [remote_execution_pb2.Digest(hash=name, size_bytes=10) for name in names]
+
+
+def test_upload_batcher(monkeypatch):
+    # Only upload full batches
+    monkeypatch.setattr(_artifactcache, "_BATCH_DELAY", 60)
+    monkeypatch.setattr(_artifactcache, "_BATCH_SIZE", 30)
+
+    cas = _UploadRecorder()
+    batcher = _artifactcache._UploadBatcher(cas, None)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        first = _start_upload(executor, batcher, _digests("a"), 10)
+        second = _start_upload(executor, batcher, _digests("ab"), 20)
+        third = executor.submit(batcher.upload, _digests("c"))
+
+        first.result()
+        second.result()
+        third.result()
+
+    # A single upload for all jobs, with the shared blob only uploaded once
+    assert cas.uploads == [["a", "b", "c"]]
+    assert batcher._batch is None
+
+
+def test_upload_batcher_error(monkeypatch):
+    monkeypatch.setattr(_artifactcache, "_BATCH_DELAY", 60)
+    monkeypatch.setattr(_artifactcache, "_BATCH_SIZE", 20)
+
+    cas = _UploadRecorder(error=CASRemoteError("Failed to upload", reason="cache-too-full"))
+    batcher = _artifactcache._UploadBatcher(cas, None)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = _start_upload(executor, batcher, _digests("a"), 10)
+        second = executor.submit(batcher.upload, _digests("b"))
+
+        # All jobs of the batch fail
+        for future in (first, second):
+            with pytest.raises(CASRemoteError) as excinfo:
+                future.result()
+            assert excinfo.value.reason == "cache-too-full"
+
+    assert cas.uploads == [["a", "b"]]
@@ -2,11 +2,14 @@
 # pylint: disable=redefined-outer-name
 
 import os
+import time
 
 import pytest
 
 from buildstream import _yaml
 from buildstream.exceptions import ErrorDomain, LoadErrorReason
+from buildstream._loader.loader import Loader, _STAGED_JUNCTION_MAX_AGE
+from buildstream._stream import Stream
 from buildstream._testing import cli  # pylint: disable=unused-import
 from buildstream._testing import create_repo
 
@@ -353,6 +356,203 @@ def test_build_tar_cross_junction_names(cli, tmpdir, datafiles):
     assert os.path.exists(os.path.join(checkoutdir, "base.txt"))
 
 
+# Records the names of the junctions fetched by each session fetching subprojects
+@pytest.fixture
+def fetched_junctions(monkeypatch):
+    sessions = []
+    fetch_subprojects = Stream._fetch_subprojects
+
+    def record_fetch_subprojects(self, junctions):
+        sessions.append(sorted(junction.name for junction in junctions))
+        fetch_subprojects(self, junctions)
+
+    monkeypatch.setattr(Stream, "_fetch_subprojects", record_fetch_subprojects)
+    return sessions
+
+
+#
+# Test that the junctions referenced by the dependencies of an element
+# are fetched together, in a single session
+#
+@pytest.mark.datafiles(DATA_DIR)
+def test_tar_fetch_junctions_together(cli, tmpdir, datafiles, fetched_junctions):
+    project = os.path.join(str(datafiles), "use-repo")
+
+    # Junctions to two subprojects, with distinct project names
+    for name in ("base", "other"):
+        _yaml.roundtrip_dump({"name": name, "min-version": "2.0"}, os.path.join(project, "baserepo", "project.conf"))
+        repo = create_repo("tar", os.path.join(str(tmpdir), name))
+        ref = repo.create(os.path.join(project, "baserepo"))
+        element = {"kind": "junction", "sources": [repo.source_config(ref=ref)]}
+        _yaml.roundtrip_dump(element, os.path.join(project, "{}.bst".format(name)))
+
+    # One of the junctions is only referenced by a dependency
+    element = {"kind": "stack", "depends": [{"junction": "other.bst", "filename": "target.bst"}]}
+    _yaml.roundtrip_dump(element, os.path.join(project, "middle.bst"))
+    element = {"kind": "stack", "depends": [{"junction": "base.bst", "filename": "target.bst"}, "middle.bst"]}
+    _yaml.roundtrip_dump(element, os.path.join(project, "target.bst"))
+
+    element_list = cli.get_pipeline(project, ["target.bst"])
+    assert "base.bst:target.bst" in element_list
+    assert "other.bst:target.bst" in element_list
+
+    assert fetched_junctions == [["base.bst", "other.bst"]]
+
+
+#
+# Test that an overridden junction, which is not fetched together with
+# the junctions referenced by the dependencies, is still fetched when
+# it is reached
+#
+@pytest.mark.datafiles(DATA_DIR)
+def test_tar_fetch_overridden_junction(cli, tmpdir, datafiles, fetched_junctions):
+    project = os.path.join(str(datafiles), "use-repo")
+    subproject = os.path.join(project, "subproject")
+
+    repo = create_repo("tar", str(tmpdir))
+    ref = repo.create(os.path.join(project, "baserepo"))
+    junction = {"kind": "junction", "sources": [repo.source_config(ref=ref)]}
+
+    # A subproject with a junction to the base project, which this project overrides
+    os.makedirs(subproject)
+    _yaml.roundtrip_dump({"name": "sub", "min-version": "2.0"}, os.path.join(subproject, "project.conf"))
+    _yaml.roundtrip_dump(junction, os.path.join(subproject, "base.bst"))
+    element = {"kind": "stack", "depends": [{"junction": "base.bst", "filename": "target.bst"}]}
+    _yaml.roundtrip_dump(element, os.path.join(subproject, "target.bst"))
+
+    element = {
+        "kind": "junction",
+        "sources": [{"kind": "local", "path": "subproject"}],
+        "config": {"overrides": {"base.bst": "base-override.bst"}},
+    }
+    _yaml.roundtrip_dump(element, os.path.join(project, "sub.bst"))
+    _yaml.roundtrip_dump(junction, os.path.join(project, "base-override.bst"))
+    element = {"kind": "stack", "depends": [{"junction": "sub.bst", "filename": "target.bst"}]}
+    _yaml.roundtrip_dump(element, os.path.join(project, "target.bst"))
+
+    element_list = cli.get_pipeline(project, ["target.bst"])
+    assert "base-override.bst:target.bst" in element_list
+
+    # The overridden junction is not fetched, the override is fetched once it is reached
+    assert fetched_junctions[-1] == ["base-override.bst"]
+    assert not any("base.bst" in junctions for junctions in fetched_junctions)
+
+
+#
+# Test that staged copies of junction sources, which are left over from
+# sessions which could not stage them read-only, are cleaned up once they
+# have not been used for a while
+#
+@pytest.mark.datafiles(DATA_DIR)
+def test_tar_staged_junctions_expire(cli, tmpdir, datafiles):
+    project = os.path.join(str(datafiles), "use-repo")
+    stagedir = os.path.join(project, ".bst", "staged-junctions", "base.bst")
+
+    # Create the repo from 'baserepo' subdir
+    repo = create_repo("tar", str(tmpdir))
+    ref = repo.create(os.path.join(project, "baserepo"))
+
+    # Write out junction element with tar source
+    element = {"kind": "junction", "sources": [repo.source_config(ref=ref)]}
+    _yaml.roundtrip_dump(element, os.path.join(project, "base.bst"))
+
+    expired = time.time() - 2 * _STAGED_JUNCTION_MAX_AGE
+    for name in ("expired", ".staging-expired", "recent"):
+        os.makedirs(os.path.join(stagedir, name, "files"))
+        if name != "recent":
+            os.utime(os.path.join(stagedir, name), (expired, expired))
+
+    element_list = cli.get_pipeline(project, ["target.bst"])
+    assert "base.bst:target.bst" in element_list
+
+    assert "recent" in os.listdir(stagedir)
+    assert "expired" not in os.listdir(stagedir)
+    assert ".staging-expired" not in os.listdir(stagedir)
+
+
+# A stand-in for a junction element, exporting its sources with a function
+class _Junction:
+    def __init__(self, export):
+        self._export = export
+
+    def _export_sources(self, directory):
+        self._export(directory)
+
+
+class _Interrupted(Exception):
+    pass
+
+
+def _write_project_conf(directory, name):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "project.conf"), "w", encoding="utf-8") as f:
+        f.write("name: {}\n".format(name))
+
+
+def _read_project_conf(directory):
+    with open(os.path.join(directory, "project.conf"), encoding="utf-8") as f:
+        return f.read()
+
+
+#
+# Test that an interrupted staging of a junction copy never leaves a
+# partially staged junction behind
+#
+def test_stage_junction_atomic(tmpdir):
+    stagedir = os.path.join(str(tmpdir), "staged-junctions", "base.bst")
+    basedir = os.path.join(stagedir, "key")
+
+    def interrupted_export(directory):
+        _write_project_conf(directory, "base")
+        raise _Interrupted()
+
+    with pytest.raises(_Interrupted):
+        Loader._stage_junction(_Junction(interrupted_export), basedir)
+    assert os.listdir(stagedir) == []
+
+    Loader._stage_junction(_Junction(lambda directory: _write_project_conf(directory, "base")), basedir)
+    assert os.listdir(stagedir) == ["key"]
+    assert _read_project_conf(basedir) == "name: base\n"
+
+
+#
+# Test that staging a junction copy which another session staged
+# concurrently keeps the copy of the other session
+#
+def test_stage_junction_concurrent(tmpdir):
+    stagedir = os.path.join(str(tmpdir), "staged-junctions", "base.bst")
+    basedir = os.path.join(stagedir, "key")
+
+    def racing_export(directory):
+        # The other session completes its staging first
+        _write_project_conf(basedir, "other")
+        _write_project_conf(directory, "base")
+
+    Loader._stage_junction(_Junction(racing_export), basedir)
+    assert os.listdir(stagedir) == ["key"]
+    assert _read_project_conf(basedir) == "name: other\n"
+
+
+#
+# Test that only the staged junction copies of other keys, which have not
+# been used for a while, are removed
+#
+def test_clean_staged_junctions(tmpdir):
+    stagedir = os.path.join(str(tmpdir), "staged-junctions", "base.bst")
+
+    expired = time.time() - 2 * _STAGED_JUNCTION_MAX_AGE
+    for name in ("current", "recent", "expired", ".staging-expired"):
+        _write_project_conf(os.path.join(stagedir, name), name)
+        if name != "recent":
+            os.utime(os.path.join(stagedir, name), (expired, expired))
+
+    Loader._clean_staged_junctions(stagedir, os.path.join(stagedir, "current"))
+    assert sorted(os.listdir(stagedir)) == ["current", "recent"]
+
+    # Junctions which were never staged as a copy have nothing to clean up
+    Loader._clean_staged_junctions(os.path.join(str(tmpdir), "staged-junctions", "other.bst"), None)
+
+
 @pytest.mark.datafiles(DATA_DIR)
 @pytest.mark.parametrize(
     "target",
@@ -104,3 +104,23 @@ def test_artifact_log_files(cli, datafiles):
     with open(import_bin, "r", encoding="utf-8") as f:
         data = f.read()
         assert len(re.findall(pattern, data, re.MULTILINE)) > 0
+
+
+@pytest.mark.datafiles(DATA_DIR)
+def test_artifact_log_compressed(cli, datafiles):
+    project = str(datafiles)
+    cli.configure({"logging": {"compress-artifact-logs": True}})
+
+    result = cli.run(project=project, args=["build", "target.bst"])
+    result.assert_success()
+
+    # Compressed logs are decompressed transparently
+    result = cli.run(project=project, args=["artifact", "log", "target.bst"])
+    result.assert_success()
+    assert re.search(r"\[..:..:..\] LOG     \[.*\] target.bst", result.output)
+
+    logfiles = os.path.join(project, "logfiles")
+    result = cli.run(project=project, args=["artifact", "log", "--out", logfiles, "target.bst"])
+    result.assert_success()
+    with open(os.path.join(logfiles, "target.log"), "r", encoding="utf-8") as f:
+        assert re.search(r"\[..:..:..\] LOG     \[.*\] target.bst", f.read())
@@ -8,7 +8,7 @@ from buildstream._testing import cli  # pylint: disable=unused-import
 # Project directory
 DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "completions")
 
-MAIN_COMMANDS = ["artifact ", "build ", "help ", "init ", "shell ", "show ", "source ", "workspace "]
+MAIN_COMMANDS = ["artifact ", "build ", "help ", "init ", "shell ", "show ", "source ", "stats ", "workspace "]
 
 MAIN_OPTIONS = [
     "--builders ",
@@ -23,6 +23,7 @@ MAIN_OPTIONS = [
     "--error-lines ",
     "--fetchers ",
     "--log-file ",
+    "--log-format ",
     "--max-jobs ",
     "--message-lines ",
     "--network-retries ",
@@ -37,6 +38,7 @@ MAIN_OPTIONS = [
     "--pull-buildtrees ",
     "--pushers ",
     "--strict ",
+    "--trace-file ",
     "--verbose ",
     "--version ",
 ]
@@ -126,7 +128,7 @@ def test_commands(cli, cmd, word_idx, expected):
     "cmd,word_idx,expected",
     [
         ("bst -", 1, MAIN_OPTIONS),
-        ("bst --l", 1, ["--log-file "]),
+        ("bst --l", 1, ["--log-file ", "--log-format "]),
         # Test that options of subcommands also complete
         (
             "bst --no-colors build -",
@@ -0,0 +1,79 @@
+# Pylint doesn't play well with fixtures and dependency injection from pytest
+# pylint: disable=redefined-outer-name
+
+import json
+import os
+
+import pytest
+from buildstream._testing import cli  # pylint: disable=unused-import
+from buildstream.exceptions import ErrorDomain, LoadErrorReason
+
+# Project directory
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "project",
+)
+
+
+def _parse_events(text):
+    events = [json.loads(line) for line in text.splitlines()]
+    assert all(event["version"] == 1 for event in events)
+    return events
+
+
+@pytest.mark.datafiles(DATA_DIR)
+def test_ndjson_log_file(cli, datafiles):
+    project = str(datafiles)
+    log_file = os.path.join(cli.directory, "log.ndjson")
+
+    result = cli.run(project=project, args=["--log-format", "ndjson", "--log-file", log_file, "build", "target.bst"])
+    result.assert_success()
+
+    # The terminal still receives the human readable log
+    assert result.get_built_elements()
+
+    with open(log_file, encoding="utf-8") as f:
+        events = _parse_events(f.read())
+
+    # Every task which started also completed
+    started = {event["task"] for event in events if event["event"] == "task-started"}
+    completed = {event["task"] for event in events if event["event"] == "task-completed"}
+    assert started
+    assert started == completed
+
+    # The build of the target was reported, with its cache key
+    key = cli.get_element_key(project, "target.bst")
+    successes = [
+        event
+        for event in events
+        if event["event"] == "message"
+        and event["type"] == "success"
+        and event["action"] == "build"
+        and event["task_element"] == "target.bst"
+    ]
+    assert successes
+    assert all(event["task_key"] == key for event in successes)
+    assert all(event["elapsed"] is not None for event in successes)
+
+
+@pytest.mark.datafiles(DATA_DIR)
+def test_ndjson_stderr(cli, datafiles):
+    project = str(datafiles)
+
+    result = cli.run(project=project, args=["--log-format", "ndjson", "build", "target.bst"])
+    result.assert_success()
+
+    # Only events are written to stderr
+    events = _parse_events(result.stderr)
+    assert any(event["event"] == "task-started" and event["name"] == "target.bst" for event in events)
+
+
+@pytest.mark.datafiles(DATA_DIR)
+def test_ndjson_error(cli, datafiles):
+    project = str(datafiles)
+
+    result = cli.run(project=project, args=["--log-format", "ndjson", "build", "nonexistent.bst"])
+    result.assert_main_error(ErrorDomain.LOAD, LoadErrorReason.MISSING_FILE)
+
+    events = _parse_events(result.stderr)
+    assert events[-1]["event"] == "error"
@@ -50,6 +50,34 @@ def test_overlaps(cli, datafiles, error):
         assert "WARNING [overlaps]" in result.stderr
 
 
+#
+# Two elements staging the same dependencies share the staged tree,
+# ensure overlaps are still reported for both of them.
+#
+@pytest.mark.datafiles(DATA_DIR)
+@pytest.mark.parametrize("error", [False, True], ids=["warning", "error"])
+def test_overlaps_staged_twice(cli, datafiles, error):
+    project_dir = str(datafiles)
+    gen_project(project_dir, error)
+    result = cli.run(project=project_dir, silent=True, args=["build", "collect-twice.bst"])
+    if error:
+        result.assert_main_error(ErrorDomain.STREAM, None)
+        result.assert_task_error(ErrorDomain.PLUGIN, CoreWarnings.OVERLAPS)
+    else:
+        result.assert_success()
+        assert result.stderr.count("WARNING [overlaps]") == 2
+
+        checkouts = []
+        for element in ("collect.bst", "collect-again.bst"):
+            checkout = os.path.join(project_dir, "checkout-{}".format(element))
+            result = cli.run(project=project_dir, args=["artifact", "checkout", element, "--directory", checkout])
+            result.assert_success()
+            with open(os.path.join(checkout, "file1")) as f:
+                checkouts.append(f.read())
+
+        assert checkouts[0] == checkouts[1]
+
+
 #
 # When the overlap is whitelisted, there is no warning or error.
 #
@@ -0,0 +1,42 @@
+# Pylint doesn't play well with fixtures and dependency injection from pytest
+# pylint: disable=redefined-outer-name
+
+import json
+import os
+
+import pytest
+from buildstream._testing import cli  # pylint: disable=unused-import
+
+# Project directory
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "project",
+)
+
+
+@pytest.mark.datafiles(DATA_DIR)
+def test_build_stats_recorded(cli, datafiles):
+    project = str(datafiles)
+    local_cache = os.path.join(str(datafiles), "cache")
+    cli.configure({"cachedir": local_cache})
+
+    result = cli.run(project=project, args=["build", "target.bst"])
+    result.assert_success()
+
+    with open(os.path.join(local_cache, "build-stats"), encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+
+    builds = {record["element"]: record for record in records if record["action"] == "Build"}
+    assert "target.bst" in builds
+    assert builds["target.bst"]["status"] == "ok"
+    assert builds["target.bst"]["key"] == cli.get_element_key(project, "target.bst")
+    assert "size" in builds["target.bst"]
+
+    result = cli.run(project=project, args=["stats", "slowest", "--action", "build", "--limit", "100"])
+    result.assert_success()
+    assert "target.bst" in result.output
+
+    # A single session cannot regress
+    result = cli.run(project=project, args=["stats", "regressions"])
+    result.assert_success()
+    assert result.output == ""
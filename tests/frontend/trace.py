@@ -0,0 +1,43 @@
+# Pylint doesn't play well with fixtures and dependency injection from pytest
+# pylint: disable=redefined-outer-name
+
+import json
+import os
+
+import pytest
+from buildstream._testing import cli  # pylint: disable=unused-import
+
+# Project directory
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "project",
+)
+
+
+@pytest.mark.datafiles(DATA_DIR)
+def test_trace_file(cli, datafiles):
+    project = str(datafiles)
+    trace_file = os.path.join(cli.directory, "trace.json")
+
+    result = cli.run(project=project, args=["--trace-file", trace_file, "build", "target.bst"])
+    result.assert_success()
+
+    with open(trace_file, encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+
+    # Every built element was recorded on a builder slot track
+    track_names = {event["tid"]: event["args"]["name"] for event in events if event["name"] == "thread_name"}
+    build_jobs = [event for event in events if event["ph"] == "X" and event["name"] == "Build"]
+    assert build_jobs
+    assert all(track_names[event["tid"]].startswith("builders ") for event in build_jobs)
+    assert "target.bst" in {event["args"]["job"] for event in build_jobs}
+
+    # Queue residency spans are balanced
+    begin = [event for event in events if event["ph"] == "b"]
+    end = [event for event in events if event["ph"] == "e"]
+    assert begin
+    assert len(begin) == len(end)
+
+    # Counters for the ready queues and resources were recorded
+    counters = {event["name"] for event in events if event["ph"] == "C"}
+    assert counters == {"ready queue", "resources"}
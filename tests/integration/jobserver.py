@@ -0,0 +1,46 @@
+# Pylint doesn't play well with fixtures and dependency injection from pytest
+# pylint: disable=redefined-outer-name
+
+import os
+import pytest
+
+from buildstream._testing import cli_integration as cli  # pylint: disable=unused-import
+from buildstream._testing._utils.site import HAVE_SANDBOX
+
+
+pytestmark = pytest.mark.integration
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "project")
+
+
+def read_makeflags(cli, project, element_name):
+    checkout = os.path.join(cli.directory, "checkout-{}".format(os.path.basename(element_name)))
+    result = cli.run(project=project, args=["artifact", "checkout", element_name, "--directory", checkout])
+    result.assert_success()
+
+    with open(os.path.join(checkout, "makeflags"), encoding="utf-8") as f:
+        return f.read().strip()
+
+
+# Build concurrently with make-like elements which acquire and release
+# a job slot from the shared jobserver.
+#
+@pytest.mark.skipif(not HAVE_SANDBOX, reason="Only available with a functioning sandbox")
+@pytest.mark.skipif(len(os.sched_getaffinity(0)) < 2, reason="The jobserver has no tokens with a single processor")
+@pytest.mark.datafiles(DATA_DIR)
+def test_jobserver(cli, datafiles):
+    project = str(datafiles)
+    cli.configure({"scheduler": {"jobserver": True, "builders": 2}})
+
+    result = cli.run(project=project, args=["build", "jobserver/target.bst"])
+    result.assert_success()
+
+    for element_name in ("jobserver/make-like.bst", "jobserver/make-like-2.bst"):
+        makeflags = read_makeflags(cli, project, element_name)
+        assert makeflags == "-j4 --jobserver-auth=fifo:/dev/buildstream-jobserver"
+
+    # Builds explicitly requesting a single job don't use the jobserver
+    assert read_makeflags(cli, project, "jobserver/notparallel.bst") == "-j1"
+
+    # Builds without MAKEFLAGS don't get any, make would run them in parallel
+    assert read_makeflags(cli, project, "jobserver/serial.bst") == "unset"
@@ -0,0 +1,100 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from buildstream._assetcache import query_index_remotes
+from buildstream._exceptions import AssetCacheError
+
+
+# How long a stand-in waits for the test to unblock it before giving up,
+# this only bounds the time taken by a failing test
+TIMEOUT = 30
+
+
+# A stand-in for an index remote, which answers once it is released
+# and optionally once all remotes sharing a barrier have been queried
+class _Remote:
+    def __init__(self, name, answer, *, held=False, barrier=None):
+        self.name = name
+        self.answer = answer
+        self.barrier = barrier
+        self.queried = threading.Event()
+        self.released = threading.Event()
+        if not held:
+            self.released.set()
+
+    def query(self):
+        self.queried.set()
+        if self.barrier:
+            self.barrier.wait(timeout=TIMEOUT)
+        self.released.wait(timeout=TIMEOUT)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+def _query(remotes, hedge_delay=0.05):
+    executor = ThreadPoolExecutor()
+    try:
+        return query_index_remotes(remotes, _Remote.query, executor, hedge_delay=hedge_delay)
+    finally:
+        # Let held stand-ins finish once the query has returned
+        for remote in remotes:
+            remote.released.set()
+        executor.shutdown()
+
+
+def test_single_remote():
+    remote = _Remote("a", "digest-a")
+    result = _query([remote])
+    assert result.answer == "digest-a"
+    assert result.remote is remote
+
+
+def test_misses_do_not_add_up():
+    # None of the remotes answer before all of them have been queried,
+    # which only happens if the queries overlap rather than running one
+    # after the other
+    barrier = threading.Barrier(3)
+    remotes = [
+        _Remote("a", None, barrier=barrier),
+        _Remote("b", None, barrier=barrier),
+        _Remote("c", "digest-c", barrier=barrier),
+    ]
+
+    result = _query(remotes)
+
+    assert not barrier.broken
+    assert all(remote.queried.is_set() for remote in remotes)
+    assert result.answer == "digest-c"
+    assert result.remote is remotes[2]
+
+    # Misses which arrive after the answer are not waited for
+    assert set(result.misses) <= {remotes[0], remotes[1]}
+
+
+def test_first_answer_wins():
+    # The high priority remote only answers after the query returned,
+    # the answer of the other remote is taken in the meantime
+    remotes = [_Remote("slow", "digest-slow", held=True), _Remote("fast", "digest-fast")]
+    result = _query(remotes)
+    assert remotes[0].queried.is_set()
+    assert result.answer == "digest-fast"
+    assert result.remote is remotes[1]
+
+
+def test_fast_priority_remote_not_hedged():
+    # The hedge delay is never reached by a remote answering right away
+    remotes = [_Remote("a", "digest-a"), _Remote("b", "digest-b")]
+    result = _query(remotes, hedge_delay=TIMEOUT)
+    assert result.answer == "digest-a"
+    assert not remotes[1].queried.is_set()
+
+
+@pytest.mark.parametrize("answer", [None, "digest-b"])
+def test_errors(answer):
+    remotes = [_Remote("a", AssetCacheError("unavailable")), _Remote("b", answer)]
+    result = _query(remotes)
+    assert result.answer == answer
+    assert [remote for remote, _ in result.errors] == [remotes[0]]
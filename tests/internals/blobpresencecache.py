@@ -0,0 +1,82 @@
+import os
+
+from buildstream._cas.blobpresencecache import BlobPresenceCache
+from buildstream._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
+
+
+def _digest(content):
+    return remote_execution_pb2.Digest(hash=content * 64, size_bytes=len(content))
+
+
+def test_filter_missing():
+    cache = BlobPresenceCache()
+    cache.mark_present("remote-a", [_digest("a"), _digest("b")])
+
+    missing = cache.filter_missing("remote-a", [_digest("a"), _digest("b"), _digest("c")])
+    assert [digest.hash for digest in missing] == [_digest("c").hash]
+    assert cache.lookups == 3
+    assert cache.hits == 2
+
+    # Presence is tracked per remote
+    missing = cache.filter_missing("remote-b", [_digest("a")])
+    assert len(missing) == 1
+
+
+def test_is_present():
+    cache = BlobPresenceCache()
+    cache.mark_present("remote-a#trees", [_digest("a")])
+
+    assert cache.is_present("remote-a#trees", _digest("a"))
+    assert not cache.is_present("remote-a#trees", _digest("b"))
+    assert not cache.is_present("remote-a", _digest("a"))
+    assert cache.lookups == 3
+    assert cache.hits == 1
+
+
+def test_filter_missing_generated():
+    cache = BlobPresenceCache()
+    cache.mark_present("remote-a#trees", [_digest("a")])
+
+    # Digests generated while checking presence, like a walk of a tree
+    # which skips the subtrees known to be present
+    def walk():
+        for content in ("a", "b"):
+            if not cache.is_present("remote-a#trees", _digest(content)):
+                yield _digest(content)
+
+    missing = cache.filter_missing("remote-a", walk())
+    assert [digest.hash for digest in missing] == [_digest("b").hash]
+
+    cache.mark_present("remote-a", walk())
+    assert cache.is_present("remote-a", _digest("b"))
+
+
+def test_not_persisted_without_ttl(tmpdir):
+    path = os.path.join(str(tmpdir), "remote-blobs")
+
+    cache = BlobPresenceCache(path)
+    cache.mark_present("remote", [_digest("a")])
+    cache.save()
+
+    assert not os.path.exists(path)
+
+
+def test_persisted_with_ttl(tmpdir):
+    path = os.path.join(str(tmpdir), "remote-blobs")
+
+    cache = BlobPresenceCache(path, ttl=3600)
+    cache.mark_present("remote", [_digest("a")])
+    cache.save()
+
+    cache = BlobPresenceCache(path, ttl=3600)
+    assert not cache.filter_missing("remote", [_digest("a")])
+
+
+def test_expired_entries_dropped(tmpdir):
+    path = os.path.join(str(tmpdir), "remote-blobs")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("remote {} 1 0.0\n".format(_digest("a").hash))
+        f.write("corrupted\n")
+
+    cache = BlobPresenceCache(path, ttl=3600)
+    assert len(cache.filter_missing("remote", [_digest("a")])) == 1
@@ -0,0 +1,78 @@
+import os
+
+from buildstream._buildstats import BuildStats, regressions, slowest
+
+
+def test_record_and_load(tmpdir):
+    path = os.path.join(str(tmpdir), "build-stats")
+
+    stats = BuildStats(path)
+    stats.record("Build", "a.bst", "abc", "ok", 2.0, 0, size=1024)
+
+    # Records are written as they are recorded
+    assert [record["element"] for record in BuildStats(path).load()] == ["a.bst"]
+    stats.record("Fetch", "a.bst", None, "fail", 1.0, 2)
+
+    # Records are appended across sessions, truncated lines are ignored
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"truncated\n')
+    stats = BuildStats(path)
+    stats.record("Build", "b.bst", "def", "ok", 3.0, 0)
+
+    records = list(stats.load())
+    assert [(record["action"], record["element"]) for record in records] == [
+        ("Build", "a.bst"),
+        ("Fetch", "a.bst"),
+        ("Build", "b.bst"),
+    ]
+    assert records[0]["size"] == 1024
+    assert records[1]["retries"] == 2
+    assert records[0]["session"] != records[2]["session"]
+
+
+def _record(session, action, element, duration, status="ok", key="key"):
+    return {
+        "session": session,
+        "action": action,
+        "element": element,
+        "key": key,
+        "status": status,
+        "duration": duration,
+    }
+
+
+def test_slowest():
+    records = [
+        _record(1, "Build", "a.bst", 10.0),
+        _record(1, "Build", "b.bst", 5.0),
+        _record(1, "Fetch", "c.bst", 20.0),
+        _record(2, "Build", "a.bst", 1.0),
+        _record(2, "Build", "b.bst", 50.0, status="fail"),
+    ]
+
+    # The latest successful job of each element is considered
+    assert [(record["element"], record["duration"]) for record in slowest(records)] == [
+        ("c.bst", 20.0),
+        ("b.bst", 5.0),
+        ("a.bst", 1.0),
+    ]
+    assert [record["element"] for record in slowest(records, action="build", limit=1)] == ["b.bst"]
+
+
+def test_regressions():
+    records = [
+        _record(1, "Build", "a.bst", 10.0),
+        _record(1, "Build", "b.bst", 10.0),
+        _record(1, "Build", "c.bst", 0.1),
+        _record(2, "Build", "a.bst", 30.0, key="other"),
+        _record(2, "Build", "b.bst", 11.0),
+        _record(2, "Build", "c.bst", 0.5),
+        _record(3, "Build", "b.bst", 40.0, status="fail"),
+    ]
+
+    found = regressions(records)
+    assert [(previous["duration"], latest["duration"]) for previous, latest in found] == [(10.0, 30.0)]
+
+    # Short jobs are only reported when asked for
+    found = regressions(records, min_duration=0.0)
+    assert [latest["element"] for _, latest in found] == ["a.bst", "c.bst"]
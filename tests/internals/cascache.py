@@ -1,10 +1,23 @@
+import io
 import os
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from unittest.mock import MagicMock
 
+import grpc
+import pytest
+
 from buildstream._cas.cascache import CASCache
-from buildstream._cas import casdprocessmanager
+from buildstream._cas.casremote import CASRemote, _MESSAGES
+from buildstream._cas import casdprocessmanager, chunking
+from buildstream._exceptions import CASCacheError, CASRemoteError
 from buildstream._messenger import Messenger
+from buildstream._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
+from buildstream._protos.build.buildgrid import local_cas_pb2
+from buildstream._remotespec import RemoteSpec, RemoteType
+from buildstream import utils
 
 
 def test_report_when_cascache_dies_before_asked_to(tmp_path, monkeypatch):
@@ -106,3 +119,337 @@ def test_casd_redirects_stderr_to_file_and_rotate(tmp_path, monkeypatch):
         assert len(existing_log_files) == n_max_log_files
         assert evicted_file not in existing_log_files
         assert existing_log_files[-1].read_text() == "hello\n"
+
+
+# Counts the requests made through a gRPC stub
+class _CountingStub:
+    def __init__(self, stub):
+        self._stub = stub
+        self.requests = {}
+
+    def __getattr__(self, name):
+        method = getattr(self._stub, name)
+
+        def call(*args, **kwargs):
+            self.requests[name] = self.requests.get(name, 0) + 1
+            return method(*args, **kwargs)
+
+        return call
+
+
+def test_missing_directories(tmp_path, monkeypatch):
+    cache = CASCache(str(tmp_path.joinpath("cas")), log_directory=str(tmp_path.joinpath("logs")))
+    try:
+        digests = {}
+        for name in ("complete", "incomplete"):
+            directory = tmp_path.joinpath(name)
+            directory.joinpath("subdir").mkdir(parents=True)
+            directory.joinpath("subdir", "file").write_text(name)
+
+            # A realistic source tree, with more files than fit in a
+            # single FindMissingBlobs request
+            for index in range(2000):
+                directory.joinpath("file-{}".format(index)).write_text("{}-{}".format(name, index))
+
+            digests[name] = cache.import_directory(str(directory))
+
+        # Remove the file blob of one of the trees
+        with open(str(tmp_path.joinpath("incomplete", "subdir", "file")), "rb") as f:
+            file_digest = utils._message_digest(f.read())
+        os.unlink(cache.objpath(file_digest))
+
+        unknown = remote_execution_pb2.Digest(hash="0" * 64, size_bytes=10)
+
+        local_cas = _CountingStub(cache.get_local_cas())
+        cas = _CountingStub(cache.get_cas())
+        monkeypatch.setattr(cache, "get_local_cas", lambda: local_cas)
+        monkeypatch.setattr(cache, "get_cas", lambda: cas)
+
+        # Identical trees are only checked once, with a single request per tree
+        directories = [digests["complete"], digests["incomplete"], unknown, digests["complete"]]
+        with ThreadPoolExecutor() as executor:
+            missing = cache.missing_directories(directories, executor=executor)
+
+        assert missing == {digests["incomplete"].hash, unknown.hash}
+        assert local_cas.requests == {"FetchTree": 3}
+        assert not cas.requests
+    finally:
+        cache.release_resources()
+
+
+# A stand-in for the CAS stub of buildbox-casd, reporting every blob
+# as missing and recording the digests it was asked about
+class _MissingBlobsCAS:
+    def __init__(self):
+        self.queried = []
+
+    def FindMissingBlobs(self, request):
+        self.queried.extend(request.blob_digests)
+        return remote_execution_pb2.FindMissingBlobsResponse(missing_blob_digests=request.blob_digests)
+
+
+def test_missing_blobs_for_directory_pruned(tmp_path, monkeypatch):
+    cache = CASCache(str(tmp_path.joinpath("cas")), log_directory=str(tmp_path.joinpath("logs")))
+    try:
+        directory = tmp_path.joinpath("root")
+        directory.joinpath("present").mkdir(parents=True)
+        directory.joinpath("present", "file").write_text("present")
+        directory.joinpath("file").write_text("missing")
+        root_digest = cache.import_directory(str(directory))
+
+        root = remote_execution_pb2.Directory()
+        with open(cache.objpath(root_digest), "rb") as f:
+            root.ParseFromString(f.read())
+        subdir_digest = root.directories[0].digest
+
+        remote = SimpleNamespace(
+            spec=SimpleNamespace(url="https://cache.example.com", instance_name=""), local_cas_instance_name="remote"
+        )
+        cas = _MissingBlobsCAS()
+        monkeypatch.setattr(cache, "get_cas", lambda: cas)
+
+        cache.mark_directory_present(subdir_digest, remote=remote)
+
+        stats = {}
+        missing = list(cache.missing_blobs_for_directory(root_digest, remote=remote, stats=stats))
+
+        # Neither the Directory object of the present subtree nor its file were queried
+        assert stats["pruned"] == 1
+        assert stats["requests"] == 1
+        assert stats["queried"] == 2
+        assert {digest.hash for digest in cas.queried} == {root_digest.hash, root.files[0].digest.hash}
+        assert len(missing) == 2
+
+        # Nothing is pruned for the local cache
+        assert len(list(cache.required_blobs_for_remote(root_digest, remote=None))) == 4
+    finally:
+        cache.release_resources()
+
+
+def test_stage_directory(tmp_path):
+    cache = CASCache(str(tmp_path.joinpath("cas")), log_directory=str(tmp_path.joinpath("logs")))
+    try:
+        directory = tmp_path.joinpath("root")
+        directory.joinpath("subdir").mkdir(parents=True)
+        directory.joinpath("subdir", "file").write_text("content")
+        digest = cache.import_directory(str(directory))
+
+        path = cache.stage_directory(digest)
+        with open(os.path.join(path, "subdir", "file"), encoding="utf-8") as f:
+            assert f.read() == "content"
+    finally:
+        cache.release_resources()
+
+    # The staged directory is cleaned up with the cache
+    assert not os.path.exists(os.path.join(path, "subdir", "file"))
+
+
+# An in-process CAS server, which splits blobs into the chunks of
+# buildstream._cas.chunking and splices blobs from chunks
+class _ChunkingCAS:
+    def __init__(self):
+        self.blobs = {}
+        self.split_supported = True
+        self.splice_supported = True
+        self.corrupt_split = False
+        self.corrupt_splice = False
+        self.uploaded = []
+        self.downloaded = []
+        self.spliced = []
+
+    def add(self, data):
+        digest = utils._message_digest(data)
+        self.blobs[digest.hash] = data
+        return digest
+
+    def FindMissingBlobs(self, request, context):
+        missing = [digest for digest in request.blob_digests if digest.hash not in self.blobs]
+        return remote_execution_pb2.FindMissingBlobsResponse(missing_blob_digests=missing)
+
+    def BatchUpdateBlobs(self, request, context):
+        response = remote_execution_pb2.BatchUpdateBlobsResponse()
+        for blob in request.requests:
+            self.uploaded.append(blob.digest)
+            self.add(blob.data)
+            response.responses.add(digest=blob.digest)
+        return response
+
+    def BatchReadBlobs(self, request, context):
+        response = remote_execution_pb2.BatchReadBlobsResponse()
+        for digest in request.digests:
+            self.downloaded.append(digest)
+            response.responses.add(digest=digest, data=self.blobs[digest.hash])
+        return response
+
+    def SplitBlob(self, request, context):
+        if not self.split_supported:
+            context.abort(grpc.StatusCode.UNIMPLEMENTED, "SplitBlob is not supported")
+
+        chunks = list(chunking.split(io.BytesIO(self.blobs[request.blob_digest.hash])))
+        if self.corrupt_split:
+            chunks = chunks[:-1]
+
+        response = _MESSAGES["SplitBlobResponse"]()
+        for chunk in chunks:
+            digest = self.add(chunk)
+            response.chunk_digests.add(hash=digest.hash, size_bytes=digest.size_bytes)
+        return response
+
+    def SpliceBlob(self, request, context):
+        if not self.splice_supported:
+            context.abort(grpc.StatusCode.UNIMPLEMENTED, "SpliceBlob is not supported")
+
+        self.spliced.append(request.blob_digest.hash)
+        data = b"".join(self.blobs[chunk_digest.hash] for chunk_digest in request.chunk_digests)
+        if self.corrupt_splice:
+            data = data[:-1]
+
+        digest = self.add(data)
+        response = _MESSAGES["SpliceBlobResponse"]()
+        response.blob_digest.hash = digest.hash
+        response.blob_digest.size_bytes = digest.size_bytes
+        return response
+
+    def serve(self):
+        methods = {
+            "FindMissingBlobs": remote_execution_pb2.FindMissingBlobsRequest,
+            "BatchUpdateBlobs": remote_execution_pb2.BatchUpdateBlobsRequest,
+            "BatchReadBlobs": remote_execution_pb2.BatchReadBlobsRequest,
+            "SplitBlob": _MESSAGES["SplitBlobRequest"],
+            "SpliceBlob": _MESSAGES["SpliceBlobRequest"],
+        }
+        handlers = {
+            name: grpc.unary_unary_rpc_method_handler(
+                getattr(self, name),
+                request_deserializer=request_class.FromString,
+                response_serializer=lambda response: response.SerializeToString(),
+            )
+            for name, request_class in methods.items()
+        }
+
+        service = "build.bazel.remote.execution.v2.ContentAddressableStorage"
+        server = grpc.server(ThreadPoolExecutor(max_workers=1))
+        server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(service, handlers),))
+        port = server.add_insecure_port("localhost:0")
+        server.start()
+        return server, "http://localhost:{}".format(port)
+
+
+# The local CAS stub of buildbox-casd, without connecting buildbox-casd
+# to remotes, as chunks are transferred directly
+class _LocalCASWithoutRemotes:
+    def __init__(self, stub):
+        self._stub = stub
+
+    def __getattr__(self, name):
+        return getattr(self._stub, name)
+
+    def GetInstanceNameForRemotes(self, request):
+        return local_cas_pb2.GetInstanceNameForRemotesResponse(instance_name="remote")
+
+
+@pytest.fixture
+def chunked_transfer(tmp_path, monkeypatch):
+    cache = CASCache(str(tmp_path.joinpath("cas")), log_directory=str(tmp_path.joinpath("logs")), chunk_threshold=0)
+    local_cas = _LocalCASWithoutRemotes(cache.get_local_cas())
+    monkeypatch.setattr(cache, "get_local_cas", lambda: local_cas)
+
+    server_cas = _ChunkingCAS()
+    server, url = server_cas.serve()
+    remote = CASRemote(RemoteSpec(RemoteType.STORAGE, url), cache)
+    try:
+        yield cache, server_cas, remote
+    finally:
+        remote.close()
+        server.stop(None)
+        cache.release_resources()
+
+
+def _content(size, seed=0):
+    return random.Random(seed).getrandbits(size * 8).to_bytes(size, "little")
+
+
+def test_chunked_transfer(chunked_transfer):
+    cache, server_cas, remote = chunked_transfer
+
+    # Uploads only send the chunks missing on the server, and the chunks
+    # are never stored in the local cache
+    content = _content(8 * 1024 * 1024)
+    digest = cache.add_object(buffer=content)
+    cache.send_blobs(remote, [digest])
+    transferred = len(content)
+
+    assert server_cas.spliced == [digest.hash]
+    assert server_cas.blobs[digest.hash] == content
+    chunk_digests = [utils._message_digest(chunk) for chunk in chunking.split(io.BytesIO(content))]
+    assert [chunk_digest.hash for chunk_digest in server_cas.uploaded] == [d.hash for d in chunk_digests]
+    assert not any(os.path.exists(cache.objpath(chunk_digest)) for chunk_digest in chunk_digests)
+
+    server_cas.uploaded.clear()
+    changed_content = content[:4096] + b"inserted" + content[4096:]
+    changed_digest = cache.add_object(buffer=changed_content)
+    cache.send_blobs(remote, [changed_digest])
+
+    assert server_cas.blobs[changed_digest.hash] == changed_content
+    uploaded = sum(chunk_digest.size_bytes for chunk_digest in server_cas.uploaded)
+    assert uploaded <= chunking.MAX_CHUNK_SIZE
+    transferred += uploaded
+
+    # Downloads only fetch the chunks missing in the local cache, and
+    # verify the spliced blob
+    fetched_content = _content(8 * 1024 * 1024, seed=1)
+    fetched_digest = server_cas.add(fetched_content)
+    cache.fetch_blobs(remote, [fetched_digest])
+
+    with open(cache.objpath(fetched_digest), "rb") as f:
+        assert f.read() == fetched_content
+    assert sum(chunk_digest.size_bytes for chunk_digest in server_cas.downloaded) == len(fetched_content)
+    transferred += len(fetched_content)
+
+    server_cas.downloaded.clear()
+    changed_content = fetched_content[: -len(b"appended")] + b"appended"
+    changed_digest = server_cas.add(changed_content)
+    cache.fetch_blobs(remote, [changed_digest])
+
+    with open(cache.objpath(changed_digest), "rb") as f:
+        assert f.read() == changed_content
+    downloaded = sum(chunk_digest.size_bytes for chunk_digest in server_cas.downloaded)
+    assert downloaded <= chunking.MAX_CHUNK_SIZE
+    transferred += downloaded
+
+    assert cache.get_chunked_transfers() == (4, transferred, 2 * len(content) + 2 * len(fetched_content) + 8)
+
+
+def test_chunked_transfer_unimplemented(chunked_transfer):
+    cache, server_cas, remote = chunked_transfer
+    server_cas.split_supported = False
+    server_cas.splice_supported = False
+
+    digest = cache.add_object(buffer=_content(8 * 1024 * 1024))
+    fetched_digest = server_cas.add(_content(8 * 1024 * 1024, seed=1))
+
+    # Blobs are left to be transferred whole, and the remote is not
+    # asked again for the rest of the session
+    for _ in range(2):
+        assert cache._send_large_blobs(remote, [digest]) == [digest]
+        assert cache._fetch_large_blobs(remote, [fetched_digest]) == [fetched_digest]
+
+    assert not remote.split_supported
+    assert not remote.splice_supported
+    assert not server_cas.spliced
+    assert cache.get_chunked_transfers() == (0, 0, 0)
+
+
+def test_chunked_transfer_digest_mismatch(chunked_transfer):
+    cache, server_cas, remote = chunked_transfer
+    server_cas.corrupt_splice = True
+    server_cas.corrupt_split = True
+
+    digest = cache.add_object(buffer=_content(8 * 1024 * 1024))
+    with pytest.raises(CASRemoteError, match="Failed to splice blob"):
+        cache.send_blobs(remote, [digest])
+
+    fetched_digest = server_cas.add(_content(8 * 1024 * 1024, seed=1))
+    with pytest.raises(CASCacheError, match="the chunks do not match the blob"):
+        cache.fetch_blobs(remote, [fetched_digest])
+    assert not os.path.exists(cache.objpath(fetched_digest))
@@ -0,0 +1,56 @@
+import io
+import random
+
+from buildstream._cas import chunking
+
+
+def _content(size, seed=0):
+    return random.Random(seed).getrandbits(size * 8).to_bytes(size, "little")
+
+
+def _split(content):
+    return list(chunking.split(io.BytesIO(content)))
+
+
+# The number of bytes which need to be transferred for the new content,
+# when the chunks of the old content are already present
+def _transferred(old, new):
+    old_chunks = set(_split(old))
+    return sum(len(chunk) for chunk in _split(new) if chunk not in old_chunks)
+
+
+def test_split_bounds():
+    content = _content(16 * 1024 * 1024)
+    chunks = _split(content)
+
+    assert b"".join(chunks) == content
+    assert all(len(chunk) <= chunking.MAX_CHUNK_SIZE for chunk in chunks)
+    assert all(len(chunk) >= chunking.MIN_CHUNK_SIZE for chunk in chunks[:-1])
+
+
+def test_split_degenerate_content():
+    # No anchors at all, and nothing but anchors
+    for content in (bytes(4 * 1024 * 1024), b"\x9e" * 4 * 1024 * 1024):
+        chunks = _split(content)
+        assert b"".join(chunks) == content
+        assert all(len(chunk) == chunking.MAX_CHUNK_SIZE for chunk in chunks)
+
+
+def test_transfer_savings():
+    size = 32 * 1024 * 1024
+    content = _content(size)
+    offset = size // 2
+
+    # Changing, inserting or removing bytes only changes the chunks around the change
+    changed = content[:offset] + b"x" + content[offset + 1 :]
+    inserted = content[:offset] + b"inserted" + content[offset:]
+    removed = content[:offset] + content[offset + 100 :]
+
+    for new in (changed, inserted, removed):
+        transferred = _transferred(content, new)
+        assert 0 < transferred <= 2 * chunking.MAX_CHUNK_SIZE
+        assert transferred < len(new) / 8
+
+    # Appending to a blob only changes the last chunk
+    appended = content + _content(1024 * 1024, seed=1)
+    assert _transferred(content, appended) <= chunking.MAX_CHUNK_SIZE + 1024 * 1024
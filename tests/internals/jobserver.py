@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+
+from buildstream._jobserver import JobServer, JOBSERVER_SANDBOX_PATH
+
+
+# A minimal make-like client, which acquires as many job slots
+# as it can from the jobserver without blocking, holds them for a
+# moment, and reports how many it got before releasing them.
+CLIENT = """
+import os, sys, time
+fd = os.open(sys.argv[1], os.O_RDWR | os.O_NONBLOCK)
+tokens = b""
+try:
+    while True:
+        tokens += os.read(fd, 1)
+except BlockingIOError:
+    pass
+time.sleep(0.5)
+print(len(tokens))
+os.write(fd, tokens)
+"""
+
+
+def test_tokens(tmpdir):
+    jobserver = JobServer(3, str(tmpdir))
+    try:
+        clients = [
+            subprocess.Popen([sys.executable, "-c", CLIENT, jobserver.path], stdout=subprocess.PIPE) for _ in range(4)
+        ]
+        acquired = [int(client.communicate()[0]) for client in clients]
+
+        # The clients never hold more tokens than available in total
+        assert sum(acquired) <= 3
+
+        # All tokens have been returned
+        fd = os.open(jobserver.path, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            assert os.read(fd, 16) == b"+++"
+        finally:
+            os.close(fd)
+    finally:
+        jobserver.close()
+
+    assert not os.path.exists(jobserver.path)
+
+
+def test_makeflags(tmpdir):
+    jobserver = JobServer(0, str(tmpdir))
+    try:
+        auth = "--jobserver-auth=fifo:{}".format(JOBSERVER_SANDBOX_PATH)
+        assert jobserver.get_makeflags("-j8") == "-j8 " + auth
+        assert jobserver.get_makeflags("-j 8") == "-j 8 " + auth
+        assert jobserver.get_makeflags("--jobs=8") == "--jobs=8 " + auth
+        assert jobserver.get_makeflags("-k -j") == "-k -j " + auth
+        assert jobserver.get_makeflags("-j1 -j4") == "-j1 -j4 " + auth
+
+        # Builds requesting a single job must not use the jobserver
+        assert jobserver.get_makeflags("-j1") is None
+        assert jobserver.get_makeflags("-j 1") is None
+        assert jobserver.get_makeflags("--jobs=1") is None
+        assert jobserver.get_makeflags("-j4 -j1") is None
+    finally:
+        jobserver.close()
+
+
+def test_makeflags_not_parallel(tmpdir):
+    jobserver = JobServer(0, str(tmpdir))
+    try:
+        # Builds which do not ask for parallel jobs are left alone, make
+        # would otherwise run their jobs in parallel
+        assert jobserver.get_makeflags(None) is None
+        assert jobserver.get_makeflags("") is None
+        assert jobserver.get_makeflags("-k") is None
+        assert jobserver.get_makeflags("--no-print-directory") is None
+    finally:
+        jobserver.close()
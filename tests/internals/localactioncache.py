@@ -0,0 +1,60 @@
+import os
+
+from buildstream._localactioncache import LocalActionCache
+from buildstream._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
+from buildstream import utils
+
+
+# A minimal stand-in for the CASCache, storing objects in a directory
+class _CAS:
+    def __init__(self, path):
+        self.path = path
+        self.expired = False
+
+    def add(self, message):
+        buffer = message.SerializeToString()
+        digest = utils._message_digest(buffer)
+        with open(self.objpath(digest), "wb") as f:
+            f.write(buffer)
+        return digest
+
+    def objpath(self, digest):
+        return os.path.join(self.path, digest.hash)
+
+    def contains_files(self, digests):
+        return all(os.path.exists(self.objpath(digest)) for digest in digests)
+
+    def contains_directory(self, digest, *, with_files):
+        return not self.expired
+
+
+def _action_result(cas, exit_code=0):
+    tree = remote_execution_pb2.Tree(root=remote_execution_pb2.Directory())
+    result = remote_execution_pb2.ActionResult(exit_code=exit_code)
+    result.output_directories.add(path="", tree_digest=cas.add(tree))
+    return result
+
+
+def test_cached_result(tmpdir):
+    cas = _CAS(str(tmpdir))
+    cache = LocalActionCache(os.path.join(str(tmpdir), "action-cache"), cas)
+    action_digest = remote_execution_pb2.Digest(hash="a" * 64, size_bytes=10)
+
+    assert cache.get(action_digest) is None
+
+    result = _action_result(cas)
+    cache.update(action_digest, result)
+    assert cache.get(action_digest) == result
+
+    # Results with expired outputs are not reused
+    cas.expired = True
+    assert cache.get(action_digest) is None
+
+
+def test_failed_result_not_cached(tmpdir):
+    cas = _CAS(str(tmpdir))
+    cache = LocalActionCache(os.path.join(str(tmpdir), "action-cache"), cas)
+    action_digest = remote_execution_pb2.Digest(hash="a" * 64, size_bytes=10)
+
+    cache.update(action_digest, _action_result(cas, exit_code=1))
+    assert cache.get(action_digest) is None
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from buildstream._frontend.app import App
+from buildstream._frontend.messagebuffer import MessageBuffer
+from buildstream._message import Message, MessageType
+from buildstream._scheduler.scheduler import Scheduler
+
+
+# Set this to run the message throughput benchmark
+BENCHMARK = os.environ.get("BST_TEST_BENCHMARK")
+
+# Number of synthetic messages pushed by the benchmark
+BENCHMARK_MESSAGES = 100000
+
+
+def _message(message_type, text, *, action_name="build", task="task.bst", element=None):
+    return Message(
+        message_type,
+        text,
+        action_name=action_name,
+        task_element_name=task,
+        element_name=element or task,
+    )
+
+
+def test_order_preserved():
+    buffer = MessageBuffer()
+    messages = [_message(MessageType.INFO, str(n), task="task-{}.bst".format(n % 3)) for n in range(10)]
+    for message in messages:
+        buffer.push(message)
+
+    assert buffer.drain() == messages
+    assert buffer.drain() == []
+
+
+def test_status_coalesced():
+    buffer = MessageBuffer()
+    buffer.push(_message(MessageType.STATUS, "first"))
+    buffer.push(_message(MessageType.STATUS, "other task", task="other.bst"))
+    buffer.push(_message(MessageType.STATUS, "second"))
+    buffer.push(_message(MessageType.INFO, "info"))
+    buffer.push(_message(MessageType.STATUS, "third"))
+    buffer.push(_message(MessageType.STATUS, "fourth"))
+
+    assert [message.message for message in buffer.drain()] == ["other task", "second", "info", "fourth"]
+    assert buffer.coalesced == 2
+
+
+def test_status_not_coalesced_across_elements():
+    buffer = MessageBuffer()
+    buffer.push(_message(MessageType.STATUS, "Staging foo.bst", element="foo.bst"))
+    buffer.push(_message(MessageType.STATUS, "Staging bar.bst", element="bar.bst"))
+
+    # Messages which do not originate from a task are never coalesced
+    buffer.push(Message(MessageType.STATUS, "loading"))
+    buffer.push(Message(MessageType.STATUS, "loading"))
+
+    assert len(buffer.drain()) == 4
+    assert buffer.coalesced == 0
+
+
+# An App which records where its messages would be rendered, with a
+# stand-in for the stream of a running scheduler
+def _app(*, running=True):
+    app = App.__new__(App)
+    app.context = SimpleNamespace(log_verbose=True)
+    app._fail_messages = {}
+    app._message_buffer = MessageBuffer()
+    app._cache_messages = False
+    app.stream = SimpleNamespace(running=running, ticks=[], tick_soon=lambda: app.stream.ticks.append(1) or running)
+    app.renders = []
+    app._render = lambda messages=False: app.renders.append(threading.current_thread())
+    return app
+
+
+def _message_from_thread(app, message):
+    thread = threading.Thread(target=app._message_handler, args=(message, False))
+    thread.start()
+    thread.join()
+
+
+def test_unthrottled_messages_rendered_from_main_thread():
+    app = _app()
+
+    # Messages of jobs are rendered from the scheduler's loop
+    _message_from_thread(app, _message(MessageType.INFO, "from a job"))
+    assert app.stream.ticks == [1]
+    assert not app.renders
+
+    # Messages of the main thread are rendered right away
+    app._message_handler(_message(MessageType.INFO, "from the main thread"), False)
+    assert app.renders == [threading.main_thread()]
+    assert app.stream.ticks == [1]
+
+
+def test_unthrottled_messages_rendered_without_scheduler():
+    app = _app(running=False)
+
+    # Without a running scheduler, there is no loop to render from
+    _message_from_thread(app, _message(MessageType.INFO, "from a thread"))
+    assert len(app.renders) == 1
+    assert app.renders[0] is not threading.main_thread()
+
+
+def test_scheduler_tick_soon():
+    ticks = []
+    scheduler = Scheduler.__new__(Scheduler)
+    scheduler.loop = None
+    scheduler._tick_pending = False
+    scheduler._ticker_callback = lambda: ticks.append(threading.current_thread())
+
+    # Nothing to tick from without a running loop
+    assert not scheduler.tick_soon()
+
+    loop = asyncio.new_event_loop()
+    scheduler.loop = loop
+
+    def request_ticks():
+        for _ in range(3):
+            assert scheduler.tick_soon()
+        loop.call_soon_threadsafe(loop.stop)
+
+    # Block the loop until all ticks are requested
+    def run_thread():
+        thread = threading.Thread(target=request_ticks)
+        thread.start()
+        thread.join()
+
+    try:
+        loop.call_soon(run_thread)
+        loop.run_forever()
+    finally:
+        loop.close()
+
+    # Requests before the tick result in a single tick from the loop
+    assert ticks == [threading.main_thread()]
+    assert not scheduler.tick_soon()
+
+
+# Push messages from many threads while draining them once per tick,
+# like the frontend does while the scheduler is running.
+#
+@pytest.mark.skipif(BENCHMARK is None, reason="BST_TEST_BENCHMARK is not set")
+def test_throughput_benchmark():
+    buffer = MessageBuffer()
+    threads = 16
+    per_thread = BENCHMARK_MESSAGES // threads
+    drained = []
+    done = threading.Event()
+
+    def produce(index):
+        task = "task-{}.bst".format(index)
+        for n in range(per_thread):
+            message_type = MessageType.STATUS if n % 4 else MessageType.INFO
+            buffer.push(_message(message_type, "{}".format(n), task=task))
+
+    def consume():
+        while not done.is_set():
+            drained.extend(buffer.drain())
+            time.sleep(0.01)
+        drained.extend(buffer.drain())
+
+    consumer = threading.Thread(target=consume)
+    producers = [threading.Thread(target=produce, args=(index,)) for index in range(threads)]
+
+    consumer.start()
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    done.set()
+    consumer.join()
+
+    # No messages were lost, other than coalesced STATUS messages
+    assert len(drained) + buffer.coalesced == threads * per_thread
+
+    # INFO messages of every task were received in order
+    for index in range(threads):
+        task = "task-{}.bst".format(index)
+        infos = [int(m.message) for m in drained if m.task_element_name == task and m.message_type == MessageType.INFO]
+        assert infos == list(range(0, per_thread, 4))
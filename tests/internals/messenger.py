@@ -0,0 +1,80 @@
+import datetime
+import os
+import time
+
+from buildstream import _messenger as _messenger_module
+from buildstream._messenger import Messenger
+from buildstream._message import Message, MessageType
+
+
+def _read_log(filename):
+    with open(filename, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _messenger():
+    messenger = Messenger()
+    messenger.set_message_handler(lambda message, is_silenced: None)
+    return messenger
+
+
+def test_messages_buffered(tmpdir):
+    messenger = _messenger()
+
+    with messenger.recorded_messages("task", str(tmpdir)) as filename:
+        messenger.message(Message(MessageType.INFO, "first message"))
+
+        # Messages are not written out one line at a time
+        assert os.path.getsize(filename) == 0
+
+        # Requesting the filename writes out buffered messages, such
+        # that the log can be read
+        assert messenger.get_log_filename() == filename
+        assert "first message" in _read_log(filename)
+
+        messenger.message(Message(MessageType.INFO, "second message"))
+
+    # Messages are written out when the task completes
+    assert "second message" in _read_log(filename)
+
+
+def test_log_handle_ordering(tmpdir):
+    messenger = _messenger()
+
+    with messenger.recorded_messages("task", str(tmpdir)) as filename:
+        messenger.message(Message(MessageType.INFO, "before"))
+
+        # Messages remain buffered while the handle is used in the process
+        log = messenger.get_log_handle()
+        log.write("running command\n")
+        assert os.path.getsize(filename) == 0
+
+        # Write to the file descriptor directly, like a subprocess would
+        os.write(log.fileno(), b"command output\n")
+
+        messenger.message(Message(MessageType.INFO, "after"))
+
+    content = _read_log(filename)
+    assert (
+        content.index("before")
+        < content.index("running command")
+        < content.index("command output")
+        < content.index("after")
+    )
+
+
+def test_quiet_log_flushed(tmpdir, monkeypatch):
+    monkeypatch.setattr(_messenger_module, "_LOG_FLUSH_INTERVAL", datetime.timedelta(seconds=0.1))
+    messenger = _messenger()
+
+    with messenger.recorded_messages("task", str(tmpdir)) as filename:
+        messenger.message(Message(MessageType.INFO, "only message"))
+
+        # The message is written out without any further messages
+        # being recorded
+        deadline = time.monotonic() + 30
+        while os.path.getsize(filename) == 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+
+        assert "only message" in _read_log(filename)
@@ -0,0 +1,56 @@
+import os
+import threading
+
+import pytest
+
+from buildstream._exceptions import ProfileError
+from buildstream._profile import _Profiler, _SampledProfile, Topics
+
+
+def _busy_loop(event):
+    while not event.is_set():
+        sum(range(1000))
+
+
+def test_sampled_profile(tmpdir):
+    with tmpdir.as_cwd():
+        profile = _SampledProfile("scheduler-test", "A test profile", 1)
+
+        stop = threading.Event()
+        thread = threading.Thread(target=_busy_loop, args=(stop,), name="worker")
+        thread.start()
+        try:
+            with profile:
+                # Consume CPU time in the main thread, samples are taken
+                # at intervals of the CPU time consumed by the process
+                while profile.samples < 20:
+                    sum(range(1000))
+        finally:
+            stop.set()
+            thread.join()
+
+        with open(profile.folded_filename, encoding="utf-8") as f:
+            stacks = [line.rsplit(" ", 1) for line in f.read().splitlines()]
+
+        # Both the main thread and the worker thread were sampled,
+        # the root of each collapsed stack is the thread name
+        roots = {stack.split(";", 1)[0] for stack, _ in stacks}
+        assert {"MainThread", "worker"} <= roots
+        assert any("_busy_loop" in stack for stack, _ in stacks)
+        assert sum(int(count) for _, count in stacks) == profile.samples
+
+        assert os.path.exists(profile.log_filename)
+
+
+def test_invalid_mode():
+    profiler = _Profiler(Topics.SCHEDULER, "tracing")
+    with pytest.raises(ProfileError):
+        with profiler.profile(Topics.SCHEDULER, "test"):
+            pass
+
+
+def test_invalid_interval():
+    profiler = _Profiler(Topics.SCHEDULER, "sample", "0")
+    with pytest.raises(ProfileError):
+        with profiler.profile(Topics.SCHEDULER, "test"):
+            pass
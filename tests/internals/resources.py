@@ -0,0 +1,177 @@
+import asyncio
+import heapq
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from buildstream._scheduler import resources as resources_module
+from buildstream._scheduler.jobs.job import Job, JobStatus, _ReturnCode
+from buildstream._scheduler.resources import ConcurrencyController, Resources, ResourceType
+
+
+# Durations of a mix of small and large jobs
+MIXED_DURATIONS = [0.1, 5.0, 0.3, 2.0, 8.0, 0.2, 1.0]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(resources_module, "time", clock)
+    return clock
+
+
+# Run jobs with the specified durations, cycling through them, as many at
+# a time as the limit of the controller allows.
+#
+# A remote with a `capacity` serves that many jobs at full speed, more
+# concurrent jobs take proportionally longer. `congested` tells, by job
+# index, which jobs had to be retried.
+#
+# Returns the limit after every completed job.
+#
+def _simulate(controller, clock, jobs, *, durations=None, capacity=None, congested=None):
+    durations = itertools.cycle(durations or MIXED_DURATIONS)
+    running = []
+    limits = []
+
+    for index in range(jobs):
+        while len(running) >= controller.limit:
+            clock.now, finished = heapq.heappop(running)
+            controller.record(bool(congested and congested(finished)))
+            limits.append(controller.limit)
+
+        duration = next(durations)
+        if capacity and len(running) >= capacity:
+            duration *= (len(running) + 1) / capacity
+        heapq.heappush(running, (clock.now + duration, index))
+
+    return limits
+
+
+def test_increase_with_throughput(clock):
+    controller = ConcurrencyController(16)
+    assert controller.limit == 8
+
+    # Larger jobs following smaller ones do not decrease the limit, as
+    # long as more concurrent jobs complete more jobs per second
+    limits = _simulate(controller, clock, 2000)
+    assert limits[-1] == 16
+    assert min(limits[-500:]) >= 15
+
+
+def test_decrease_without_throughput(clock):
+    # The limit settles where more concurrent jobs stop paying off
+    controller = ConcurrencyController(16)
+    limits = _simulate(controller, clock, 1000, durations=[1.0], capacity=4)
+    assert set(limits[-100:]) == {4, 5}
+    assert controller.reason in ("increase", "throughput")
+
+    controller = ConcurrencyController(16)
+    limits = _simulate(controller, clock, 2000, capacity=4)
+    assert sum(limits[-500:]) / 500 < 8
+
+
+def test_decrease_on_congestion(clock):
+    controller = ConcurrencyController(8)
+
+    # A single retried job in the window halves the limit
+    for _ in range(controller.limit - 1):
+        assert not controller.record()
+    assert controller.record(congested=True)
+    assert controller.limit == 2
+    assert controller.reason == "congestion"
+
+    # The limit never drops below one
+    limits = _simulate(controller, clock, 100, congested=lambda index: True)
+    assert set(limits[-50:]) == {1}
+
+
+def test_keep_limit_when_idle(clock):
+    controller = ConcurrencyController(8)
+
+    # Jobs completing while the resource is not fully used tell nothing
+    # about the limit
+    for _ in range(controller.limit):
+        clock.now += 1.0
+        assert not controller.record(saturated=False)
+    assert controller.limit == 4
+    assert controller.reason == "idle"
+
+
+class _Job(Job):
+    def parent_complete(self, status, result):
+        self.status = status
+
+
+@pytest.mark.parametrize(
+    "returncode,failed_temporarily",
+    [(_ReturnCode.OK, False), (_ReturnCode.FAIL, True), (_ReturnCode.PERM_FAIL, False)],
+    ids=["ok", "temporary", "permanent"],
+)
+def test_job_failed_temporarily(returncode, failed_temporarily):
+    scheduler = SimpleNamespace(
+        context=SimpleNamespace(messenger=None), tracer=None, terminated=False, job_completed=lambda job, status: None
+    )
+    job = _Job(scheduler, "Fetch", "fetch.log")
+    job._tries = 1
+
+    asyncio.run(job._parent_child_completed(returncode))
+    assert job.get_failed_temporarily() == failed_temporarily
+    assert (job.status == JobStatus.OK) == (returncode == _ReturnCode.OK)
+
+
+def test_resources_adaptive_limits(clock):
+    changes = []
+    resources = Resources(4, 10, 0, adaptive=True, limits_changed_cb=lambda: changes.append(resources.get_limits()))
+
+    # Unlimited resources are not adapted
+    assert resources.get_limits() == {ResourceType.DOWNLOAD: (5, 10)}
+    assert resources.get_max_jobs() == 14
+
+    for _ in range(5):
+        assert resources.reserve([ResourceType.DOWNLOAD])
+    assert not resources.reserve([ResourceType.DOWNLOAD], peek=True)
+
+    # Permanently failed jobs are no sign of congestion
+    for _ in range(5):
+        clock.now += 1.0
+        resources.release([ResourceType.DOWNLOAD])
+        resources.job_completed([ResourceType.DOWNLOAD], False)
+        assert resources.reserve([ResourceType.DOWNLOAD])
+
+    assert changes == [{ResourceType.DOWNLOAD: (6, 10)}]
+    assert resources.reserve([ResourceType.DOWNLOAD])
+    assert not resources.reserve([ResourceType.DOWNLOAD], peek=True)
+
+
+def test_resources_idle_limits(clock):
+    resources = Resources(4, 10, 0, adaptive=True)
+
+    # Jobs complete one at a time, the limit of 5 is never reached
+    for _ in range(5):
+        clock.now += 1.0
+        assert resources.reserve([ResourceType.DOWNLOAD])
+        resources.release([ResourceType.DOWNLOAD])
+        resources.job_completed([ResourceType.DOWNLOAD], False)
+
+    assert resources.get_limits() == {ResourceType.DOWNLOAD: (5, 10)}
+
+
+def test_resources_static_limits():
+    resources = Resources(4, 10, 4)
+    assert resources.get_limits() == {}
+    assert resources.get_max_jobs() == 18
+
+    # Outcomes are ignored without adaptive concurrency
+    resources.job_completed([ResourceType.DOWNLOAD], True)
+    for _ in range(10):
+        assert resources.reserve([ResourceType.DOWNLOAD])
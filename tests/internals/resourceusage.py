@@ -0,0 +1,87 @@
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+
+from buildstream.sandbox._resourceusage import ProcessTreeMonitor
+
+
+# A parent process which spawns a busy child holding some memory
+BUSY_TREE = """
+import subprocess, sys
+child = subprocess.Popen([sys.executable, "-c", "data = bytearray(32 * 1024 * 1024)\\nwhile True: pass"])
+child.wait()
+"""
+
+
+def test_process_tree_usage():
+    process = subprocess.Popen([sys.executable, "-c", BUSY_TREE])
+    monitor = ProcessTreeMonitor(process.pid)
+    try:
+
+        # Wait for the child to allocate its memory and burn some CPU
+        deadline = time.monotonic() + 30
+        while monitor.peak_rss < 32 * 1024 * 1024 or monitor.cpu_time < 0.2:
+            assert time.monotonic() < deadline
+            time.sleep(0.1)
+            assert monitor.sample()
+
+        assert monitor.rss <= monitor.peak_rss
+        assert monitor.cpu_percent > 0
+    finally:
+        for child in psutil.Process(process.pid).children(recursive=True):
+            child.kill()
+        process.kill()
+        process.wait()
+
+    # The totals are kept once the tree is gone
+    cpu_time = monitor.cpu_time
+    assert not monitor.sample()
+    assert monitor.cpu_time == cpu_time
+
+
+# A command exiting before it could ever be sampled
+SHORT_COMMAND = """
+import time
+data = bytearray(16 * 1024 * 1024)
+end = time.process_time() + 0.1
+while time.process_time() < end:
+    pass
+"""
+
+
+def test_short_command_usage():
+    process = subprocess.Popen([sys.executable, "-c", SHORT_COMMAND])
+    monitor = ProcessTreeMonitor(process.pid)
+    assert not monitor.measured
+
+    while True:
+        try:
+            returncode = monitor.wait(process, timeout=5)
+            break
+        except subprocess.TimeoutExpired:
+            continue
+
+    assert returncode == 0
+    assert process.returncode == 0
+    assert monitor.measured
+    assert monitor.peak_rss >= 16 * 1024 * 1024
+    assert monitor.cpu_time >= 0.1
+
+
+def test_wait_returncode():
+    process = subprocess.Popen([sys.executable, "-c", "import os, signal; os.kill(os.getpid(), signal.SIGTERM)"])
+    monitor = ProcessTreeMonitor(process.pid)
+    assert monitor.wait(process, timeout=30) == -15
+    assert process.wait() == -15
+
+    process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    monitor = ProcessTreeMonitor(process.pid)
+    try:
+        with pytest.raises(subprocess.TimeoutExpired):
+            monitor.wait(process, timeout=0.1)
+    finally:
+        process.kill()
+    assert monitor.wait(process, timeout=30) == -9
@@ -0,0 +1,131 @@
+import contextlib
+import threading
+import time
+from types import SimpleNamespace
+
+import grpc
+import pytest
+
+from buildstream._exceptions import SandboxError
+from buildstream._protos.build.bazel.remote.execution.v2 import remote_execution_pb2_grpc
+from buildstream._protos.google.longrunning import operations_pb2
+from buildstream._signals import TerminateException
+from buildstream._utils import terminate_thread
+from buildstream.sandbox import _sandboxremote
+from buildstream.sandbox._sandboxremote import SandboxRemote
+
+
+class _Unavailable(grpc.RpcError):
+    def code(self):
+        return grpc.StatusCode.UNAVAILABLE
+
+    def details(self):
+        return "Connection lost"
+
+
+# A stand-in for the Execution service, which drops the operation stream
+# the given number of times. The first stream sends an update before it
+# is dropped, the resumed streams are dropped without any update.
+class _DroppingExecution:
+    def __init__(self, drops):
+        self.drops = drops
+        self.requests = []
+
+    def Execute(self, request):
+        self.requests.append("Execute")
+        return self._stream(update=True)
+
+    def WaitExecution(self, request):
+        self.requests.append("WaitExecution " + request.name)
+        return self._stream(update=False)
+
+    def _stream(self, *, update):
+        if update:
+            yield operations_pb2.Operation(name="operation")
+        if self.drops:
+            self.drops -= 1
+            raise _Unavailable()
+        yield operations_pb2.Operation(name="operation", done=True)
+
+
+# A stand-in for a channel, which reconnects immediately unless told otherwise
+class _Channel:
+    def __init__(self, *, reconnects=True):
+        self.reconnects = reconnects
+        self.callbacks = []
+
+    def subscribe(self, callback, try_to_connect=False):
+        self.callbacks.append(callback)
+        if self.reconnects:
+            callback(grpc.ChannelConnectivity.READY)
+
+    def unsubscribe(self, callback):
+        self.callbacks.remove(callback)
+
+
+def _sandbox():
+    sandbox = SandboxRemote.__new__(SandboxRemote)
+    sandbox.exec_spec = SimpleNamespace(url="http://execution.example.com:50051", instance_name="")
+    sandbox.operation_name = None
+
+    messenger = SimpleNamespace(timed_activity=lambda *args, **kwargs: contextlib.nullcontext())
+    sandbox._get_context = lambda: SimpleNamespace(messenger=messenger)
+    sandbox._get_element_name = lambda: "element.bst"
+    return sandbox
+
+
+@pytest.fixture
+def execution(monkeypatch):
+    stub = _DroppingExecution(drops=0)
+    monkeypatch.setattr(remote_execution_pb2_grpc, "ExecutionStub", lambda channel: stub)
+    return stub
+
+
+def test_resume_after_connection_loss(execution):
+    execution.drops = 1
+    channel = _Channel()
+
+    operation = _sandbox().run_remote_command(channel, None)
+
+    assert operation.done
+    assert execution.requests == ["Execute", "WaitExecution operation"]
+    assert not channel.callbacks
+
+
+def test_give_up_after_reconnects(execution):
+    execution.drops = _sandboxremote._MAX_RECONNECTS + 1
+
+    with pytest.raises(SandboxError, match="UNAVAILABLE"):
+        _sandbox().run_remote_command(_Channel(), None)
+
+    assert execution.requests == ["Execute"] + ["WaitExecution operation"] * _sandboxremote._MAX_RECONNECTS
+
+
+def test_wait_for_channel_timeout():
+    channel = _Channel(reconnects=False)
+
+    start = time.monotonic()
+    assert not _sandboxremote._wait_for_channel(channel, 0.3)
+    assert time.monotonic() - start >= 0.3
+    assert not channel.callbacks
+
+
+# Terminating a job raises TerminateException in its thread, which must
+# not wait for the whole reconnection delay to be delivered
+def test_wait_for_channel_terminate():
+    terminated = threading.Event()
+
+    def wait():
+        try:
+            _sandboxremote._wait_for_channel(_Channel(reconnects=False), 60)
+        except TerminateException:
+            terminated.set()
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    time.sleep(0.2)
+
+    terminate_thread(thread.ident)
+    thread.join(5)
+
+    assert terminated.is_set()
@@ -0,0 +1,93 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from buildstream import utils
+from buildstream._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
+from buildstream._splitrules import (
+    compile_split_rules,
+    filter_split_paths,
+    list_split_paths,
+    split_filter,
+    _list_relative_paths,
+)
+
+
+SPLIT_RULES = (
+    ("runtime", ("/usr/bin", "/usr/bin/*", "/usr/lib/*.so.*")),
+    ("devel", ("/usr/include", "/usr/include/**", "/usr/lib/*.so", "/usr/lib/*.a")),
+    ("doc", ("/usr/share/doc", "/usr/share/doc/**")),
+)
+
+PATHS = [
+    "usr",
+    "usr/bin",
+    "usr/bin/hello",
+    "usr/include",
+    "usr/include/hello.h",
+    "usr/lib",
+    "usr/lib/libhello.so",
+    "usr/lib/libhello.so.1",
+    "usr/share",
+    "usr/share/doc",
+    "usr/share/doc/README",
+    "etc/hello.conf",
+]
+
+
+@pytest.mark.parametrize(
+    "include,exclude,orphans,expected",
+    [
+        (["runtime"], [], False, ["usr/bin", "usr/bin/hello", "usr/lib/libhello.so.1"]),
+        (["devel"], [], False, ["usr/include", "usr/include/hello.h", "usr/lib/libhello.so"]),
+        (
+            ["runtime", "devel", "doc"],
+            ["devel", "doc"],
+            True,
+            ["usr", "usr/bin", "usr/bin/hello", "usr/lib", "usr/lib/libhello.so.1", "usr/share", "etc/hello.conf"],
+        ),
+    ],
+    ids=["runtime", "devel", "orphans"],
+)
+def test_filter_split_paths(include, exclude, orphans, expected):
+    assert filter_split_paths(SPLIT_RULES, include, exclude, orphans, PATHS) == expected
+
+
+# Write the Directory objects of a tree with the specified paths to a CAS
+# directory, paths which are a prefix of other paths are directories
+def _write_tree(casdir, paths, prefix=""):
+    directory = remote_execution_pb2.Directory()
+    for name in sorted({path[len(prefix) :].split("/")[0] for path in paths if path.startswith(prefix)}):
+        path = prefix + name
+        if any(other.startswith(path + "/") for other in paths):
+            node = directory.directories.add(name=name)
+            node.digest.CopyFrom(_write_tree(casdir, paths, prefix=path + "/"))
+        else:
+            directory.files.add(name=name)
+
+    data = directory.SerializeToString()
+    digest = utils._message_digest(data)
+    os.makedirs(os.path.join(casdir, "objects", digest.hash[:2]), exist_ok=True)
+    with open(os.path.join(casdir, "objects", digest.hash[:2], digest.hash[2:]), "wb") as f:
+        f.write(data)
+    return digest
+
+
+def test_list_split_paths(tmp_path):
+    casdir = str(tmp_path)
+    digest = _write_tree(casdir, PATHS)
+
+    # Files are listed before the subdirectories of their directory
+    paths = list(_list_relative_paths(casdir, digest.hash))
+    assert paths[:4] == ["etc", "etc/hello.conf", "usr", "usr/bin"]
+    assert sorted(paths) == sorted(PATHS + ["etc"])
+
+    splits = compile_split_rules(SPLIT_RULES)
+    expected = [path for path in paths if split_filter(splits, ["runtime"], ["doc"], True, path)]
+    assert list_split_paths(casdir, digest.hash, SPLIT_RULES, ["runtime"], ["doc"], True) == expected
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("forkserver")) as pool:
+        future = pool.submit(list_split_paths, casdir, digest.hash, SPLIT_RULES, ["runtime"], ["doc"], True)
+        assert future.result() == expected
@@ -0,0 +1,110 @@
+# Pylint doesn't play well with fixtures and dependency injection from pytest
+# pylint: disable=redefined-outer-name
+
+import os
+import time
+
+import pytest
+
+from buildstream.utils import copy_files, safe_copy, FileListResult, _copy_file_data
+
+
+# Set this to the path of a directory on a reflink capable filesystem,
+# e.g. a loopback mounted btrfs or XFS image, to run the reflink tests.
+REFLINK_DIR = os.environ.get("BST_TEST_REFLINK_DIR")
+
+# Size of the file used to compare copy strategies
+BENCHMARK_FILE_SIZE = 256 * 1024 * 1024
+
+
+@pytest.fixture
+def src(tmp_path):
+    src = tmp_path.joinpath("src")
+    src.mkdir()
+    src.joinpath("subdir").mkdir()
+
+    src.joinpath("file").write_bytes(os.urandom(1024 * 1024))
+    src.joinpath("subdir", "empty").write_bytes(b"")
+
+    return src
+
+
+def test_copy_file_data(src, tmp_path):
+    dest = str(tmp_path.joinpath("dest"))
+    strategy = _copy_file_data(str(src.joinpath("file")), dest)
+
+    assert strategy in ("reflink", "copy_file_range", "copy")
+    with open(dest, "rb") as f:
+        assert f.read() == src.joinpath("file").read_bytes()
+
+
+def test_copy_file_data_misreported_size(tmp_path):
+    # Files in /proc report a size of zero, make sure we still copy
+    # all of their content
+    dest = str(tmp_path.joinpath("dest"))
+    _copy_file_data("/proc/self/mounts", dest)
+
+    assert os.path.getsize(dest) > 0
+
+
+def test_safe_copy_records_strategy(src, tmp_path):
+    result = FileListResult()
+    safe_copy(str(src.joinpath("file")), str(tmp_path.joinpath("dest")), result=result)
+
+    assert sum(result._copy_strategies.values()) == 1
+    assert result._describe_copy_strategies()
+
+
+def test_copy_files_records_strategies(src, tmp_path):
+    dest = tmp_path.joinpath("dest")
+    result = copy_files(str(src), str(dest))
+
+    assert sum(result._copy_strategies.values()) == 2
+    assert dest.joinpath("file").read_bytes() == src.joinpath("file").read_bytes()
+    assert dest.joinpath("subdir", "empty").read_bytes() == b""
+
+
+@pytest.mark.skipif(REFLINK_DIR is None, reason="BST_TEST_REFLINK_DIR is not set")
+def test_copy_file_data_reflink(tmp_path):
+    filename = os.path.join(REFLINK_DIR, "reflink-source")
+    with open(filename, "wb") as f:
+        f.write(os.urandom(1024 * 1024))
+
+    try:
+        assert _copy_file_data(filename, filename + "-copy") == "reflink"
+    finally:
+        os.unlink(filename)
+        os.unlink(filename + "-copy")
+
+
+# Compares the time taken to materialize a large file with a reflink
+# against a userspace copy on the same filesystem.
+#
+@pytest.mark.skipif(REFLINK_DIR is None, reason="BST_TEST_REFLINK_DIR is not set")
+def test_copy_file_data_reflink_benchmark():
+    filename = os.path.join(REFLINK_DIR, "reflink-benchmark")
+    with open(filename, "wb") as f:
+        for _ in range(BENCHMARK_FILE_SIZE // (1024 * 1024)):
+            f.write(os.urandom(1024 * 1024))
+
+    try:
+        start = time.perf_counter()
+        assert _copy_file_data(filename, filename + "-reflink") == "reflink"
+        reflink_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(filename, "rb") as fsrc, open(filename + "-copy", "wb") as fdest:
+            while True:
+                buf = fsrc.read(1024 * 1024)
+                if not buf:
+                    break
+                fdest.write(buf)
+            fdest.flush()
+            os.fsync(fdest.fileno())
+        copy_time = time.perf_counter() - start
+
+        assert reflink_time < copy_time
+    finally:
+        for name in (filename, filename + "-reflink", filename + "-copy"):
+            if os.path.exists(name):
+                os.unlink(name)
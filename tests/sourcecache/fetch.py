@@ -20,6 +20,7 @@
 # pylint: disable=redefined-outer-name
 from contextlib import contextmanager
 import os
+import re
 import shutil
 import pytest
 
@@ -244,3 +245,29 @@ def test_source_pull_partial_fallback_fetch(cli, tmpdir, datafiles):
             res.assert_success()
 
             assert ("SUCCESS Fetching {}".format(repo.source_config(ref=ref)["url"])) in res.stderr
+
+
+@pytest.mark.datafiles(DATA_DIR)
+def test_shared_source_fetched_once(cli, tmpdir, datafiles):
+    project_dir = str(datafiles)
+    repo = create_repo("tar", str(tmpdir))
+    ref = repo.create(os.path.join(project_dir, "files"))
+    url = repo.source_config(ref=ref)["url"]
+
+    # Two elements sharing the same tarball, along with a source of their
+    # own, such that only the individual tarball source is shared
+    element_path = os.path.join(project_dir, "elements")
+    for name, files in (("shared-1.bst", "bin-files"), ("shared-2.bst", "dev-files")):
+        element = {
+            "kind": "import",
+            "sources": [repo.source_config(ref=ref), {"kind": "local", "path": os.path.join("files", files)}],
+        }
+        _yaml.roundtrip_dump(element, os.path.join(element_path, name))
+
+    cli.configure({"scheduler": {"fetchers": 2}})
+    res = cli.run(project=project_dir, args=["source", "fetch", "shared-1.bst", "shared-2.bst"])
+    res.assert_success()
+
+    # The tarball was only fetched once, and the second element shared it
+    assert res.stderr.count("SUCCESS Fetching {}".format(url)) == 1
+    assert re.search(r"Shared Sources:\s+fetched 3, shared 1", res.stderr)